@@ -0,0 +1,14 @@
+"""
+基準腳本共用設定
+python benchmarks/X.py 執行時 benchmarks/ 在 sys.path 上，各腳本先 `from _common import ROOT`
+(或 `import _common`)，再 import 上層目錄的模組；假裝置 / 假核心見
+shuttle_hid.FakeHidBackend、shuttle_core.RecordingCore、shuttle_inject.RecordingSink。
+"""
+import os
+import sys
+
+# 模組所在的上層目錄 (子行程腳本也以此為 cwd / sys.path)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
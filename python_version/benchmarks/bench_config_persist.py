@@ -0,0 +1,116 @@
+"""
+設定檔寫入的基準
+1. 連續編輯：舊版每次編輯同步寫整個 JSON vs ConfigWriter 延遲合併寫入
+   (呼叫端花費的時間、實際寫檔次數)
+2. 讀寫競爭：另一個執行緒不停讀取 / 解析檔案時，原地覆寫與暫存檔 + rename
+   各會讀到幾次不完整的 JSON
+
+執行: python benchmarks/bench_config_persist.py
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+
+import _common  # noqa: F401 (把模組目錄加入 sys.path)
+
+from shuttle_config import compile_config
+from shuttle_persist import ConfigWriter, dump_config, write_atomic
+
+EDITS = 30
+EDIT_INTERVAL = 0.01
+PROFILES = 300
+RACE_SECONDS = 2.0
+
+
+def make_config(n, version=0):
+    return {"profiles": [{"name": f"P{i}", "apps": [f"App {i}"],
+                          "speeds": [800, 600, 333, 200, 100, 50, 20 + version],
+                          "buttons": {str(b): "command+t" for b in range(1, 16)}}
+                         for i in range(n)]}
+
+
+def write_in_place(path, config):
+    """舊版 save_config_safe"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=4, ensure_ascii=False)
+
+
+def bench_burst(directory):
+    path = os.path.join(directory, "burst.json")
+    snapshots = [compile_config(make_config(PROFILES, v)) for v in range(EDITS)]
+
+    t_sync = 0.0
+    for snap in snapshots:
+        t0 = time.perf_counter()
+        write_in_place(path, snap.to_dict())
+        t_sync += time.perf_counter() - t0
+        time.sleep(EDIT_INTERVAL)
+
+    writer = ConfigWriter(path, delay=0.1)
+    writer.start()
+    t_async = 0.0
+    for snap in snapshots:
+        t0 = time.perf_counter()
+        writer.save(snap)
+        t_async += time.perf_counter() - t0
+        time.sleep(EDIT_INTERVAL)
+    writer.stop()
+    st = writer.stats()
+
+    with open(path, encoding="utf-8") as f:
+        last = json.load(f)
+    assert last == snapshots[-1].to_dict(), "最後寫入的不是最新的設定"
+
+    print(f"{'Mode':<18} | {'Writes':>6} | {'Coalesced':>9} | {'Caller ms / edit':>16}")
+    print("-" * 60)
+    print(f"{'sync in-place':<18} | {EDITS:>6} | {0:>9} | {t_sync / EDITS * 1000.0:>16.3f}")
+    print(f"{'write-behind':<18} | {st['writes']:>6} | {st['coalesced']:>9} | {t_async / EDITS * 1000.0:>16.3f}")
+
+
+def bench_race(directory, name, write):
+    path = os.path.join(directory, f"race-{name}.json")
+    configs = [dump_config(make_config(PROFILES, v)) for v in range(2)]
+    write(path, configs[0])
+    stop = threading.Event()
+    result = {"reads": 0, "torn": 0, "writes": 0}
+
+    def reader():
+        while not stop.is_set():
+            try:
+                with open(path, encoding="utf-8") as f:
+                    json.load(f)
+            except (ValueError, FileNotFoundError):
+                result["torn"] += 1
+            result["reads"] += 1
+
+    t = threading.Thread(target=reader)
+    t.start()
+    end = time.monotonic() + RACE_SECONDS
+    while time.monotonic() < end:
+        write(path, configs[result["writes"] % 2])
+        result["writes"] += 1
+    stop.set()
+    t.join()
+    return result
+
+
+def plain_write(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        bench_burst(directory)
+        print()
+        print(f"{'Write mode':<18} | {'Writes':>6} | {'Reads':>7} | {'Torn reads':>10}")
+        print("-" * 52)
+        for name, write in (("in-place", plain_write), ("temp + rename", write_atomic)):
+            r = bench_race(directory, name.replace(" ", ""), write)
+            print(f"{name:<18} | {r['writes']:>6} | {r['reads']:>7} | {r['torn']:>10}")
+
+
+if __name__ == "__main__":
+    main()
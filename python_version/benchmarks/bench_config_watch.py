@@ -0,0 +1,157 @@
+"""
+設定檔監看的基準
+1. 常見的存檔方式下，舊版 (每秒比對 mtime) 與 ConfigWatcher (檔案事件 / 輪詢備援)
+   各觸發幾次重載，以及從存檔完成到收到通知的延遲
+2. 大型設定只改一個 Profile 時，完整編譯與沿用上一個快照的增量編譯耗時
+
+執行: python benchmarks/bench_config_watch.py
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+
+import _common  # noqa: F401 (把模組目錄加入 sys.path)
+
+from shuttle_config import compile_config
+from shuttle_persist import dump_config, write_atomic
+from shuttle_watch import ConfigWatcher, PollingSource, create_event_source
+
+SETTLE = 1.6  # 每種存檔方式之後等待通知的時間 (需大於輪詢間隔 + 去抖動)
+PROFILES = 1000
+
+
+class LegacyMtimeWatcher:
+    """舊版 check_config_file_changes：每秒比對 st_mtime"""
+
+    def __init__(self, path, on_change):
+        self.path = path
+        self.on_change = on_change
+        self.last_mtime = os.stat(path).st_mtime
+        self._stop = threading.Event()
+
+    def start(self):
+        def run():
+            while not self._stop.wait(1.0):
+                mtime = os.stat(self.path).st_mtime
+                if mtime > self.last_mtime:
+                    self.last_mtime = mtime
+                    with open(self.path, encoding="utf-8") as f:
+                        self.on_change(f.read())
+        threading.Thread(target=run, daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+
+def config_text(version):
+    return dump_config({"profiles": [{"name": "P", "apps": ["*"], "speeds": [version] * 7}]})
+
+
+def save_rename(path, version):
+    write_atomic(path, config_text(version))
+
+
+def save_multi_write(path, version):
+    text = config_text(version)
+    third = len(text) // 3
+    with open(path, "w", encoding="utf-8") as f:
+        for chunk in (text[:third], text[third:2 * third], text[2 * third:]):
+            f.write(chunk)
+            f.flush()
+            time.sleep(0.02)
+
+
+def save_touch(path, version):
+    os.utime(path)
+
+
+def save_same_content(path, version):
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def save_two_quick_edits(path, version):
+    save_rename(path, version)
+    time.sleep(0.05)
+    save_rename(path, version + 1000)
+
+
+PATTERNS = [
+    ("rename-over", save_rename, True),
+    ("3 partial writes", save_multi_write, True),
+    ("touch only", save_touch, False),
+    ("same content", save_same_content, False),
+    ("2 edits, 50 ms", save_two_quick_edits, True),
+]
+
+
+def bench_patterns(directory):
+    path = os.path.join(directory, "shuttle_config.json")
+    write_atomic(path, config_text(0))
+
+    watchers = {}
+    records = {}
+
+    def make(name, factory):
+        records[name] = []
+        watcher = factory(lambda text, name=name: records[name].append(time.monotonic()))
+        watchers[name] = watcher
+        watcher.start()
+
+    make("legacy mtime 1s", lambda cb: LegacyMtimeWatcher(path, cb))
+    make(f"events ({create_event_source(path).name})", lambda cb: ConfigWatcher(path, cb))
+    make("polling fallback", lambda cb: ConfigWatcher(path, cb, source_factory=PollingSource))
+    time.sleep(0.3)
+
+    print(f"{'Save pattern':<18} | {'Watcher':<18} | {'Reloads':>7} | {'Latency ms':>10}")
+    print("-" * 64)
+    for i, (pattern, save, expected) in enumerate(PATTERNS):
+        for r in records.values():
+            r.clear()
+        save(path, i + 1)
+        saved_at = time.monotonic()
+        time.sleep(SETTLE)
+        for name, r in records.items():
+            latency = f"{(r[0] - saved_at) * 1000.0:.0f}" if r else "-"
+            print(f"{pattern:<18} | {name:<18} | {len(r):>7} | {latency:>10}")
+        print(f"{'':<18} | {'(expected)':<18} | {int(expected):>7} |")
+    for w in watchers.values():
+        w.stop()
+
+
+def bench_incremental():
+    config = {"profiles": [{"name": f"P{i}", "apps": [f"App {i}"],
+                            "speeds": [800, 600, 333, 200, 100, 50, 20],
+                            "buttons": {str(b): "command+t" for b in range(1, 16)}}
+                           for i in range(PROFILES)]}
+    base = compile_config(config)
+    edited = json.loads(json.dumps(config))
+    edited["profiles"][PROFILES // 2]["buttons"]["1"] = "command+w"
+
+    t0 = time.perf_counter()
+    full = compile_config(edited)
+    t_full = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    inc = compile_config(edited, 1, base)
+    t_inc = time.perf_counter() - t0
+
+    print(f"{'Compile':<12} | {'Profiles':>8} | {'Recompiled':>10} | {'ms':>8} | matcher reused")
+    print("-" * 62)
+    print(f"{'full':<12} | {PROFILES:>8} | {full.recompiled:>10} | {t_full * 1000.0:>8.2f} | no")
+    print(f"{'incremental':<12} | {PROFILES:>8} | {inc.recompiled:>10} | {t_inc * 1000.0:>8.2f} | "
+          f"{'yes' if inc.matcher is base.matcher else 'no'}")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        bench_patterns(directory)
+    print()
+    bench_incremental()
+
+
+if __name__ == "__main__":
+    main()
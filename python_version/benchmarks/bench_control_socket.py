@@ -0,0 +1,150 @@
+"""
+控制 socket 基準
+1. 往返延遲：另一個行程以 ControlClient 連線，量測各指令的往返時間 (p50 / p99 / max)。
+   status / ping 在 socket 執行緒直接回應；profile / toggle / press 經由 daemon 的工作佇列
+   (call_soon -> 控制執行緒) 執行完才回應
+2. 對 HID 的影響：假裝置以約 1 kHz 送出報告，比較沒有 client 與 client 連續送出
+   status / profile / press 時，HID 執行緒處理的報告數與每個報告的處理時間
+
+執行: python benchmarks/bench_control_socket.py
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from _common import ROOT
+
+from shuttle_controller_cli import ShuttleDaemon
+from shuttle_focus import FakeFocusProvider
+from shuttle_hid import FakeHidBackend, make_report
+from shuttle_inject import RecordingSink
+from shuttle_log import log
+
+REQUESTS = 2000
+PHASE = 2.0
+REPORT_INTERVAL = 0.001
+
+LATENCY_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+from shuttle_control import ControlClient
+
+commands = [
+    ("ping", {{}}),
+    ("status", {{}}),
+    ("profile", {{"name": "Chrome / Browser"}}),
+    ("profile", {{"name": None}}),
+    ("toggle", {{}}),
+    ("press", {{"buttons": [1]}}),
+]
+result = {{}}
+with ControlClient({socket!r}) as client:
+    for cmd, fields in commands:
+        key = cmd if cmd != "profile" else f"profile {{fields['name']}}"
+        samples = []
+        for _ in range({requests}):
+            t0 = time.perf_counter()
+            reply = client.request(cmd, **fields)
+            samples.append((time.perf_counter() - t0) * 1e6)
+            if not reply["ok"] and cmd != "press":
+                raise SystemExit(reply)
+        samples.sort()
+        result[key] = [samples[len(samples) // 2], samples[int(len(samples) * 0.99)], samples[-1]]
+        if cmd == "toggle" and not client.request("status")["enabled"]:
+            client.request("enable")
+print(json.dumps(result))
+"""
+
+HAMMER_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+from shuttle_control import ControlClient
+
+count = 0
+end = time.monotonic() + {seconds}
+with ControlClient({socket!r}) as client:
+    while time.monotonic() < end:
+        client.request("status")
+        client.request("profile", name="Chrome / Browser" if count % 2 else None)
+        client.request("press", buttons=[13])
+        count += 3
+print(count)
+"""
+
+
+class TimedDaemon(ShuttleDaemon):
+    """記錄 HID 執行緒處理報告的時間"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.busy_ns = 0
+
+    def process_reports(self, data):
+        t0 = time.perf_counter_ns()
+        super().process_reports(data)
+        self.busy_ns += time.perf_counter_ns() - t0
+
+
+def run_client(script, **fields):
+    code = script.format(root=ROOT, **fields)
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr or result.stdout)
+    return json.loads(result.stdout)
+
+
+def feed(daemon, fake, seconds, client=None):
+    """約 1 kHz 推送報告 seconds 秒；client 為同時執行的子行程 (可為 None)"""
+    busy, reports = daemon.busy_ns, daemon.reports_read
+    end = time.monotonic() + seconds
+    pushed = 0
+    while time.monotonic() < end:
+        fake.push(make_report(jog=pushed & 0xFF))
+        pushed += 1
+        time.sleep(REPORT_INTERVAL)
+    time.sleep(0.05)
+    count = daemon.reports_read - reports
+    extra = client.communicate()[0].strip() if client else ""
+    return pushed, count, (daemon.busy_ns - busy) / max(count, 1) / 1000.0, extra
+
+
+def main():
+    directory = tempfile.mkdtemp(prefix="shuttle-control-")
+    config_path = os.path.join(directory, "shuttle_config.json")
+    socket_path = os.path.join(directory, "control.sock")
+    fake = FakeHidBackend()
+    sink = RecordingSink()
+    daemon = TimedDaemon(config_path, backend_factory=lambda: fake, key_sink=sink, scroll_sink=sink)
+    log.configure(level="warning")  # 每次 toggle / press 的紀錄不印出
+    daemon.start_services(FakeFocusProvider("Safari"), control_socket=socket_path)
+    # 控制執行緒 (一般是主執行緒) 在背景跑，主執行緒用來推送報告
+    control_thread = threading.Thread(target=daemon.run, daemon=True)
+    control_thread.start()
+
+    print(f"round trip from another process ({REQUESTS} requests each, microseconds):")
+    print(f"{'command':<26} | {'p50':>7} | {'p99':>7} | {'max':>7}")
+    print("-" * 56)
+    for key, (p50, p99, worst) in run_client(LATENCY_SCRIPT, socket=socket_path, requests=REQUESTS).items():
+        print(f"{key:<26} | {p50:7.0f} | {p99:7.0f} | {worst:7.0f}")
+
+    print(f"\nHID thread with reports at ~1 kHz for {PHASE:.0f} s:")
+    pushed, count, us, _ = feed(daemon, fake, PHASE)
+    print(f"no client       : pushed {pushed:>5}, HID read {count:>5}, {us:.1f} us / report")
+    client = subprocess.Popen([sys.executable, "-c", HAMMER_SCRIPT.format(root=ROOT, socket=socket_path, seconds=PHASE)],
+                              cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    pushed, count, us, requests = feed(daemon, fake, PHASE, client)
+    print(f"client hammering: pushed {pushed:>5}, HID read {count:>5}, {us:.1f} us / report "
+          f"({int(requests) / PHASE:.0f} requests/s)")
+
+    daemon.request_stop()
+    control_thread.join(2.0)
+    st = daemon.control.stats() if daemon.control else None
+    print(f"\nvirtual key presses injected: {len(sink.events)}; server stats: {st}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Headless daemon 基準 (每次量測都啟動新的 Python 行程)
+1. import 成本：shuttle_controller_cli vs mac_shuttle 的 import 時間、模組數、最大 RSS，
+   以及是否載入了 GUI / 注入套件 (rumps、AppKit、pynput、Quartz、objc)
+2. 實際執行：假裝置 + 記錄用 sink 跑 daemon，依序送 SIGUSR2 (狀態)、改設定檔 + SIGHUP (重載)、
+   SIGUSR1 (停用)、SIGTERM (結束)，確認每個 signal 都生效並量測結束所需時間與閒置 CPU
+
+執行: python benchmarks/bench_daemon_footprint.py
+"""
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+from _common import ROOT
+
+RUNS = 5
+IDLE_SECONDS = 2.0
+
+GUI_MODULES = ["rumps", "AppKit", "Foundation", "pynput", "Quartz", "objc", "http.server"]
+
+IMPORT_SCRIPT = """
+import json, resource, sys, time
+t0 = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - t0
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+rss_kb = rss // 1024 if sys.platform == "darwin" else rss
+print(json.dumps({{"ms": elapsed * 1000, "modules": len(sys.modules), "rss_kb": rss_kb,
+                  "gui": [m for m in {gui!r} if m in sys.modules]}}))
+"""
+
+DAEMON_SCRIPT = """
+import json, os, resource, sys, time
+sys.path.insert(0, {root!r})
+from shuttle_controller_cli import ShuttleDaemon
+from shuttle_focus import FakeFocusProvider
+from shuttle_hid import FakeHidBackend, make_report
+from shuttle_inject import RecordingSink
+
+# 開啟後送出：按鍵 1、Jog 轉 5 格、Shuttle +3 停 0.3 秒後歸零
+script = [(0.05, make_report(buttons=1)), (0.06, make_report())]
+script += [(0.1 + 0.01 * i, make_report(jog=i + 1)) for i in range(5)]
+script += [(0.2, make_report(shuttle=3, jog=5)), (0.5, make_report(jog=5))]
+fake = FakeHidBackend(script)
+sink = RecordingSink()
+daemon = ShuttleDaemon({config!r}, backend_factory=lambda: fake, key_sink=sink, scroll_sink=sink)
+daemon.install_signal_handlers()
+daemon.start_services(FakeFocusProvider("Google Chrome"), control_socket={socket!r})
+print("READY", flush=True)
+cpu0 = os.times()
+daemon.run()
+cpu1 = os.times()
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print("RESULT " + json.dumps({{
+    "keys": len(sink.events), "scrolls": len(sink.scrolls), "enabled": daemon.is_enabled,
+    "profile": daemon.active_profile.name, "config_version": daemon.snapshot.version,
+    "cpu_s": (cpu1.user + cpu1.system) - (cpu0.user + cpu0.system),
+    "rss_kb": rss // 1024 if sys.platform == "darwin" else rss,
+    "threads": __import__("threading").active_count(),
+    "gui": [m for m in {gui!r} if m in sys.modules],
+}}), flush=True)
+"""
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def bench_imports():
+    print(f"{'Module':<24} | {'import ms':>9} | {'modules':>7} | {'max RSS':>9} | GUI / injection modules loaded")
+    print("-" * 92)
+    for module in ("shuttle_controller_cli", "mac_shuttle"):
+        samples = []
+        for _ in range(RUNS):
+            result = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT.format(module=module, gui=GUI_MODULES)],
+                                    cwd=ROOT, capture_output=True, text=True)
+            if result.returncode != 0:
+                print(f"{module:<24} | failed: {result.stderr.strip().splitlines()[-1]}")
+                samples = None
+                break
+            samples.append(json.loads(result.stdout))
+        if not samples: continue
+        ms = median([s["ms"] for s in samples])
+        rss = median([s["rss_kb"] for s in samples]) / 1024.0
+        gui = ", ".join(samples[0]["gui"]) or "none"
+        print(f"{module:<24} | {ms:9.1f} | {samples[0]['modules']:>7} | {rss:6.1f} MB | {gui}")
+
+
+def wait_for(proc, prefix):
+    while True:
+        line = proc.stdout.readline()
+        if not line:
+            return None
+        if line.startswith(prefix):
+            return line
+
+
+def bench_daemon():
+    with tempfile.TemporaryDirectory() as directory:
+        config_path = os.path.join(directory, "shuttle_config.json")
+        code = DAEMON_SCRIPT.format(root=ROOT, config=config_path, gui=GUI_MODULES,
+                                   socket=os.path.join(directory, "control.sock"))
+        proc = subprocess.Popen([sys.executable, "-c", code], cwd=ROOT, stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT, text=True)
+        if wait_for(proc, "READY") is None:
+            print("daemon failed to start")
+            proc.kill()
+            return
+        time.sleep(IDLE_SECONDS)  # 送出腳本中的報告後閒置
+
+        proc.send_signal(signal.SIGUSR2)
+        time.sleep(0.1)
+        # 外部修改設定檔後以 SIGHUP 重載 (檔案監看通常也會自動套用，兩者都只會套用一次相同內容)
+        with open(config_path, encoding="utf-8") as f:
+            config = json.load(f)
+        config["profiles"][1]["buttons"]["1"] = "command+n"
+        with open(config_path, "w", encoding="utf-8") as f:
+            json.dump(config, f, indent=4, ensure_ascii=False)
+        proc.send_signal(signal.SIGHUP)
+        time.sleep(0.2)
+        proc.send_signal(signal.SIGUSR1)
+        time.sleep(0.1)
+        t0 = time.monotonic()
+        proc.send_signal(signal.SIGTERM)
+        out, _ = proc.communicate(timeout=10)
+        stop_ms = (time.monotonic() - t0) * 1000
+
+    lines = out.splitlines()
+    result = json.loads(next(l for l in lines if l.startswith("RESULT "))[len("RESULT "):])
+    def seen(text): return "yes" if any(text in l for l in lines) else "NO"
+    print(f"keys injected {result['keys']}, scroll ticks {result['scrolls']}, profile {result['profile']!r}")
+    print(f"SIGUSR2 status line logged : {seen('📊')}")
+    print(f"SIGHUP reload applied      : {seen('已重新編譯')} (config version {result['config_version']})")
+    print(f"SIGUSR1 disabled           : {'yes' if not result['enabled'] else 'NO'}")
+    print(f"SIGTERM -> exit            : {stop_ms:.0f} ms, return code {proc.returncode}")
+    print(f"CPU while running          : {result['cpu_s'] * 1000:.0f} ms over ~{IDLE_SECONDS + 0.4:.1f} s")
+    print(f"max RSS {result['rss_kb'] / 1024:.1f} MB, {result['threads']} threads at exit, "
+          f"GUI / injection modules loaded: {', '.join(result['gui']) or 'none'}")
+
+
+def main():
+    bench_imports()
+    print()
+    bench_daemon()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+shuttle_diag 擷取分析的基準 (需要 NumPy)
+1. 合成 10 分鐘、1 kHz 的擷取 (60 萬筆，含 Shuttle 換段、Jog 轉動、重複報告、偶發延遲)，
+   量測 NumPy 向量化分析的耗時，並與逐筆的純 Python 計算比對結果與速度
+2. 存成 .shtr 後以 --analyze 的路徑 (mmap -> NumPy) 讀回分析
+3. 以假裝置確認 capture() 不 sleep、每個報告都有時間戳記
+
+執行: python benchmarks/bench_diag_analysis.py
+"""
+import os
+import tempfile
+import time
+
+import _common  # noqa: F401 (把模組目錄加入 sys.path)
+
+from shuttle_diag import analyze, capture, format_analysis, load_trace_arrays, save_capture
+from shuttle_hid import FakeHidBackend, make_report
+from shuttle_record import MAX_REPORT_BYTES
+
+MINUTES = 10
+RATE_HZ = 1000
+
+
+def synthesize(np, n, seed=1):
+    rng = np.random.default_rng(seed)
+    # 1 ms 間隔 + 抖動，約 0.1% 的報告延遲 5~40 ms
+    intervals = rng.normal(1_000_000, 30_000, n).clip(200_000, None)
+    late = rng.random(n) < 0.001
+    intervals[late] += rng.integers(5_000_000, 40_000_000, late.sum())
+    times = np.cumsum(intervals).astype(np.int64)
+
+    # Shuttle：每段停留 50~2000 個報告
+    lengths = rng.integers(50, 2000, n // 50)
+    values = rng.integers(-7, 8, len(lengths))
+    shuttle = np.repeat(values, lengths)[:n]
+    shuttle = np.pad(shuttle, (0, n - len(shuttle)))
+    # Jog：大部分報告不動，轉動時每報告 1~4 步
+    steps = np.where(rng.random(n) < 0.2, rng.integers(-4, 5, n), 0)
+    jog = np.cumsum(steps) % 256
+
+    reports = np.zeros((n, MAX_REPORT_BYTES), dtype=np.uint8)
+    reports[:, 0] = shuttle.astype(np.int8).view(np.uint8)
+    reports[:, 1] = jog
+    reports[:, 3] = np.where(rng.random(n) < 0.001, 1, 0)
+    return times, reports
+
+
+def reference(times, reports):
+    """逐筆純 Python 版本 (用來比對向量化結果)"""
+    duplicates = 0
+    total = abs_total = 0
+    dwell = {}
+    prev = reports[0]
+    seg_level, seg_start = (prev[0] - 256 if prev[0] > 127 else prev[0]), times[0]
+    for i in range(1, len(times)):
+        row = reports[i]
+        if row == prev:
+            duplicates += 1
+        d = (row[1] - prev[1] + 128) % 256 - 128
+        total += d
+        abs_total += abs(d)
+        level = row[0] - 256 if row[0] > 127 else row[0]
+        if level != seg_level:
+            dwell[seg_level] = dwell.get(seg_level, 0) + (times[i] - seg_start)
+            seg_level, seg_start = level, times[i]
+        prev = row
+    dwell[seg_level] = dwell.get(seg_level, 0) + (times[-1] - seg_start)
+    return duplicates, total, abs_total, {k: v / 1e6 for k, v in dwell.items()}
+
+
+def bench_analysis(np):
+    n = MINUTES * 60 * RATE_HZ
+    times, reports = synthesize(np, n)
+    analyze(times[:1000], reports[:1000])  # 暖機 (第一次 import 與配置)
+
+    t0 = time.perf_counter()
+    result = analyze(times, reports)
+    vector_s = time.perf_counter() - t0
+    print(f"{n} reports ({MINUTES} min at {RATE_HZ} Hz): NumPy analysis {vector_s * 1000:.1f} ms")
+
+    py_times, py_reports = times.tolist(), [bytes(r) for r in reports]
+    t0 = time.perf_counter()
+    duplicates, total, abs_total, dwell = reference(py_times, py_reports)
+    python_s = time.perf_counter() - t0
+    print(f"pure-Python reference loop: {python_s * 1000:.1f} ms ({python_s / vector_s:.0f}x slower)")
+
+    jog = result["jog"]
+    vector_dwell = {row["level"]: row["total_ms"] for row in result["shuttle_dwell"]}
+    ok = (duplicates == result["duplicates"] and total == jog["total_steps"]
+          and abs_total == jog["abs_steps"] and vector_dwell.keys() == dwell.keys()
+          and all(abs(vector_dwell[k] - dwell[k]) < 1e-3 for k in dwell))
+    print(f"matches reference: {'yes' if ok else 'NO'}")
+    return times, reports, result
+
+
+def bench_trace_file(np, times, reports):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "capture.shtr")
+        t0 = time.perf_counter()
+        save_capture(path, times.tolist(), reports.tobytes())
+        save_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        loaded_times, loaded_reports = load_trace_arrays(path)
+        result = analyze(loaded_times, loaded_reports)
+        load_s = time.perf_counter() - t0
+        size = os.path.getsize(path)
+    print(f".shtr round trip: {size / 1e6:.1f} MB, save {save_s:.2f} s, mmap load + analyze {load_s * 1000:.1f} ms")
+    return result
+
+
+def bench_capture():
+    count = 2000
+    script = [(0.0005 * i, make_report(shuttle=(i // 200) % 8, jog=i & 0xFF)) for i in range(count)]
+    fake = FakeHidBackend(script)
+    fake.open(0, 0)
+    t0 = time.perf_counter()
+    times, reports, empty = capture(fake, count * 0.0005 + 0.05)
+    elapsed = time.perf_counter() - t0
+    print(f"capture() from fake device: {len(times)}/{count} reports in {elapsed:.2f} s, "
+          f"{empty} empty reads, {len(reports) // MAX_REPORT_BYTES} rows stored")
+
+
+def main():
+    try:
+        import numpy as np
+    except ImportError:
+        print("需要 NumPy: pip install numpy")
+        return
+    times, reports, result = bench_analysis(np)
+    loaded = bench_trace_file(np, times, reports)
+    print(f"loaded trace matches: {'yes' if loaded == result else 'NO'}")
+    print()
+    bench_capture()
+    print()
+    print(format_analysis(result))
+
+
+if __name__ == "__main__":
+    main()
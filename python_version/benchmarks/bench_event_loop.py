@@ -0,0 +1,86 @@
+"""
+量測 HID 迴圈的閒置喚醒次數與「報告 -> 動作」延遲
+比較舊版 (非阻塞讀取 + 5ms sleep 輪詢) 與目前的期限驅動阻塞讀取。
+
+執行: python benchmarks/bench_event_loop.py
+"""
+import time
+
+import _common  # noqa: F401 (把模組目錄加入 sys.path)
+
+from shuttle_core import RecordingCore, ReportBatch
+from shuttle_hid import FakeHidBackend, make_report
+
+IDLE_SECONDS = 2.0
+PRESS_COUNT = 40
+PRESS_INTERVAL = 0.05
+
+PROFILE = {"name": "Bench", "apps": ["*"], "speeds": [800, 600, 333, 200, 100, 50, 20],
+           "buttons": {"1": "q"}}
+
+
+class LegacyPollingCore(RecordingCore):
+    """舊版迴圈：非阻塞讀取 + time.sleep(0.005)"""
+
+    def run_logic_loop(self):
+        while self.is_running:
+            if not self.device:
+                self._connect_hid_backend()
+            data = self.device.read(64, 0)
+            self.loop_wakeups += 1
+            if data:
+                batch = ReportBatch()
+                self.merge_report(batch, data)
+                self.handle_batch(batch)
+            self.run_due_timers()
+            time.sleep(0.005)
+
+
+def measure_idle(core_cls):
+    fake = FakeHidBackend()
+    core = core_cls(lambda: fake, profile=PROFILE)
+    core.start()
+    time.sleep(0.2)
+    start = core.loop_wakeups
+    time.sleep(IDLE_SECONDS)
+    wakeups = core.loop_wakeups - start
+    core.stop()
+    return wakeups / IDLE_SECONDS
+
+
+def measure_latency(core_cls):
+    script = []
+    for i in range(PRESS_COUNT):
+        t = 0.2 + i * PRESS_INTERVAL
+        script.append((t, make_report(buttons=0x0001)))
+        script.append((t + PRESS_INTERVAL / 2, make_report(buttons=0)))
+    fake = FakeHidBackend(script)
+    core = core_cls(lambda: fake, profile=PROFILE)
+    core.start()
+    time.sleep(0.2 + PRESS_COUNT * PRESS_INTERVAL + 0.2)
+    core.stop()
+
+    press_times = [fake.start_time + 0.2 + i * PRESS_INTERVAL for i in range(PRESS_COUNT)]
+    latencies = sorted((k - p) * 1000.0 for (k, _), p in zip(core.actions, press_times))
+    return latencies
+
+
+def percentile(values, pct):
+    if not values:
+        return float("nan")
+    idx = min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))
+    return values[idx]
+
+
+def main():
+    print(f"{'Loop':<22} | {'Idle wakeups/s':>14} | {'p50 ms':>7} | {'p99 ms':>7} | {'max ms':>7}")
+    print("-" * 70)
+    for name, cls in (("legacy (5ms polling)", LegacyPollingCore), ("deadline-driven", RecordingCore)):
+        wakeups = measure_idle(cls)
+        lat = measure_latency(cls)
+        print(f"{name:<22} | {wakeups:>14.1f} | {percentile(lat, 50):>7.3f} | "
+              f"{percentile(lat, 99):>7.3f} | {max(lat) if lat else float('nan'):>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+App 切換 -> Profile 套用的延遲
+比較事件驅動 (FakeFocusProvider，模擬 NSWorkspace 通知) 與舊的 1 秒輪詢。
+
+執行: python benchmarks/bench_focus_switch.py
+"""
+import random
+import time
+
+import _common  # noqa: F401 (把模組目錄加入 sys.path)
+
+from shuttle_core import ShuttleInputCore
+from shuttle_focus import FakeFocusProvider, PollingFocusProvider
+
+CONFIG = {
+    "profiles": [
+        {"name": "Windows Remote", "apps": ["Windows App"], "buttons": {"1": "q"}},
+        {"name": "Browser", "apps": ["Google Chrome", "Safari"], "buttons": {"1": "command+t"}},
+        {"name": "Default", "apps": ["*"], "buttons": {}},
+    ]
+}
+SWITCHES = ["Google Chrome", "Windows App", "Finder", "Safari", "Windows App"]
+EXPECTED = {"Google Chrome": "Browser", "Safari": "Browser", "Windows App": "Windows Remote", "Finder": "Default"}
+
+
+def measure(provider_factory, app_state):
+    core = ShuttleInputCore()
+    core.apply_config(CONFIG)
+    provider = provider_factory()
+    core.attach_focus_provider(provider)
+    latencies = []
+    for app in SWITCHES:
+        time.sleep(random.uniform(0.05, 0.3))
+        t0 = time.monotonic()
+        app_state[0] = app
+        if isinstance(provider, FakeFocusProvider):
+            provider.push(app)
+        while getattr(core.active_profile, "name", None) != EXPECTED[app]:
+            time.sleep(0.0005)
+        latencies.append((time.monotonic() - t0) * 1000.0)
+    provider.stop()
+    return latencies
+
+
+def main():
+    random.seed(1)
+    app_state = ["Finder"]
+    rows = (
+        ("event (notification)", lambda: FakeFocusProvider(app_state[0])),
+        ("polling 1.0 s", lambda: PollingFocusProvider(lambda: app_state[0], 1.0)),
+    )
+    print(f"{'Provider':<22} | {'avg ms':>8} | {'max ms':>8}")
+    print("-" * 44)
+    for name, factory in rows:
+        lat = measure(factory, app_state)
+        print(f"{name:<22} | {sum(lat) / len(lat):>8.3f} | {max(lat):>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
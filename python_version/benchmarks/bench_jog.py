@@ -0,0 +1,87 @@
+"""
+Jog 批次滾動的微型基準
+比較舊版「每一格呼叫一次 scroll」與目前「每批次一次合併滾動 (+ jog_max_rate 上限)」
+在合成的快速旋轉下送出的滾動事件數，以及花在 scroll 呼叫上的時間 (以 SCROLL_COST 模擬 pynput)。
+
+執行: python benchmarks/bench_jog.py
+"""
+import time
+
+import _common  # noqa: F401 (把模組目錄加入 sys.path)
+
+from shuttle_core import RecordingCore, ReportBatch
+from shuttle_hid import make_report
+
+# 模擬 pynput 每次 scroll 呼叫的成本 (秒)
+SCROLL_COST = 0.0002
+
+
+class CountingCore(RecordingCore):
+    """每次 scroll 花 SCROLL_COST 秒"""
+
+    def __init__(self, profile):
+        super().__init__(profile=profile, record=False)
+        self.scroll_time = 0.0
+
+    def perform_scroll(self, direction, multiplier):
+        RecordingCore.perform_scroll(self, direction, multiplier)
+        t0 = time.perf_counter()
+        end = t0 + SCROLL_COST
+        while time.perf_counter() < end:
+            pass
+        self.scroll_time += time.perf_counter() - t0
+
+
+class LegacyJogCore(CountingCore):
+    def handle_jog(self, diff):
+        if diff == 0: return
+        direction = 1 if diff > 0 else -1
+        for _ in range(abs(diff)):
+            self.perform_scroll(direction, 3)
+
+
+def make_burst(reports, detents_per_report):
+    """產生連續的 Jog 報告 (Jog 值為 0-255 繞回計數器)"""
+    jog = 0
+    out = [make_report(jog=jog)]
+    for _ in range(reports):
+        jog = (jog + detents_per_report) & 0xFF
+        out.append(make_report(jog=jog))
+    return out
+
+
+def run(core, reports, report_interval):
+    start = time.perf_counter()
+    for i, data in enumerate(reports):
+        batch = ReportBatch()
+        core.merge_report(batch, data)
+        core.handle_batch(batch)
+        # 模擬報告之間的時間 (以 busy wait 讓時鐘前進)
+        end = start + (i + 1) * report_interval
+        while time.perf_counter() < end:
+            core.run_due_timers()
+    deadline = time.perf_counter() + 0.1
+    while core.jog_pending and time.perf_counter() < deadline:
+        core.run_due_timers()
+
+
+def main():
+    bursts = (
+        ("20 detents x 1 report", make_burst(1, 20), 0.008),
+        ("5 detents x 50 reports", make_burst(50, 5), 0.008),
+    )
+    print(f"{'Burst':<24} | {'Mode':<18} | {'Events':>6} | {'Scroll sum':>10} | {'Scroll ms':>9}")
+    print("-" * 78)
+    for name, reports, interval in bursts:
+        for mode, core in (
+            ("legacy per-detent", LegacyJogCore({})),
+            ("batched", CountingCore({})),
+            ("batched, 30/s cap", CountingCore({"jog_max_rate": 30})),
+        ):
+            run(core, reports, interval)
+            print(f"{name:<24} | {mode:<18} | {core.scroll_count:>6} | {core.scroll_lines:>10} | "
+                  f"{core.scroll_time * 1000:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+比較每次按鍵的注入成本：
+  subprocess  每次啟動一個 osascript -e (舊作法)
+  persistent  長駐 osascript -i，只寫一行到 pipe
+  recording   RecordingSink (純 Python 下限)
+
+非 macOS 環境沒有 osascript，改用 /bin/true 與 cat 代替，
+量到的是「啟動行程」與「寫 pipe」本身的成本，也就是兩者差距的主因。
+
+執行: python benchmarks/bench_key_injection.py
+"""
+import shutil
+import time
+
+import _common  # noqa: F401 (把模組目錄加入 sys.path)
+
+from shuttle_inject import (
+    parse_key_def, SubprocessOsascriptSink, PersistentOsascriptSink, RecordingSink,
+)
+
+PRESSES = 200
+KEY_DEF = "command+shift+t"
+
+
+def bench(sink, presses):
+    key_code, modifiers = parse_key_def(KEY_DEF)
+    sink.send_key(key_code, modifiers)  # 暖機 (persistent 會在此啟動行程)
+    start = time.perf_counter()
+    for _ in range(presses):
+        sink.send_key(key_code, modifiers)
+    elapsed = time.perf_counter() - start
+    sink.close()
+    return elapsed / presses * 1000.0
+
+
+def main():
+    if shutil.which("osascript"):
+        sub_cmd, persist_cmd = ("osascript", "-e"), ("osascript", "-i")
+    else:
+        print("⚠️ 找不到 osascript，以 /bin/true 與 cat 代替")
+        sub_cmd, persist_cmd = ("true",), ("cat",)
+
+    # subprocess 太慢，只跑少量
+    cases = (
+        ("subprocess", SubprocessOsascriptSink(sub_cmd), max(PRESSES // 10, 1)),
+        ("persistent", PersistentOsascriptSink(persist_cmd), PRESSES),
+        ("recording", RecordingSink(), PRESSES),
+    )
+    print(f"{'Sink':<12} | {'ms / press':>10}")
+    print("-" * 26)
+    for name, sink, presses in cases:
+        print(f"{name:<12} | {bench(sink, presses):>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+事件紀錄基準
+1. 熱路徑成本：print 到 pipe vs RingLogger.info (格式化與寫出都在背景執行緒)
+2. stdout 卡住：pipe 沒有人讀 (log daemon 停住) 時，假裝置以約 1 kHz 送出按鍵報告，
+   比較每次按鍵都 print 與改用 RingLogger (不取樣 / INFO 每 10 筆留 1 筆) 時
+   HID 執行緒處理了多少報告。
+
+執行: python benchmarks/bench_logging.py
+"""
+import os
+import threading
+import time
+
+import _common  # noqa: F401 (把模組目錄加入 sys.path)
+
+from shuttle_core import RecordingCore
+from shuttle_hid import FakeHidBackend, make_report
+from shuttle_log import RingLogger, INFO
+
+CALLS = 100000
+DURATION = 2.0
+REPORT_INTERVAL = 0.001
+PAD = "x" * 120  # 讓 pipe 緩衝 (通常 64 KiB) 很快被填滿
+
+
+class PressCore(RecordingCore):
+    """每個按鍵動作寫一行紀錄 (emit)"""
+
+    def __init__(self, backend_factory, emit):
+        super().__init__(backend_factory, profile={"name": "Bench", "apps": ["*"], "buttons": {"1": "q"}},
+                         record=False)
+        self.emit = emit
+
+    def perform_action(self, action):
+        RecordingCore.perform_action(self, action)
+        self.emit(action.key_def)
+
+
+def drain_forever(fd):
+    while True:
+        try:
+            if not os.read(fd, 65536): return
+        except OSError:
+            return
+
+
+def bench_cost():
+    r, w = os.pipe()
+    reader = threading.Thread(target=drain_forever, args=(r,), daemon=True)
+    reader.start()
+    stream = os.fdopen(w, "w", buffering=1)
+
+    t0 = time.perf_counter()
+    for i in range(CALLS):
+        print(f"   └── 執行按鍵: {i} {PAD}", file=stream)
+    print_ns = (time.perf_counter() - t0) / CALLS * 1e9
+
+    logger = RingLogger(capacity=1 << 14, stream=stream)
+    t0 = time.perf_counter()
+    for i in range(CALLS):
+        logger.info("   └── 執行按鍵: {} {}", i, PAD)
+    ring_ns = (time.perf_counter() - t0) / CALLS * 1e9
+    logger.close()
+    stream.close()
+    st = logger.stats()
+    print(f"print -> pipe     : {print_ns:7.0f} ns / call")
+    print(f"RingLogger.info   : {ring_ns:7.0f} ns / call  (written {st['written']}, lost {st['lost']} "
+          f"while the flusher caught up)")
+
+
+def run_stalled(mode):
+    r, w = os.pipe()  # 沒有人讀
+    stream = os.fdopen(w, "w", buffering=1)
+    logger = None
+    if mode == "print":
+        emit = lambda key: print(f"   └── 執行按鍵: {key} {PAD}", file=stream)
+    else:
+        logger = RingLogger(stream=stream, sampling={INFO: 10} if mode == "ring 1/10" else None)
+        emit = lambda key: logger.info("   └── 執行按鍵: {} {}", key, PAD)
+
+    fake = FakeHidBackend()
+    core = PressCore(lambda: fake, emit)
+    core.start()
+    pushed = 0
+    end = time.monotonic() + DURATION
+    while time.monotonic() < end:
+        fake.push(make_report(buttons=pushed & 1))
+        pushed += 1
+        time.sleep(REPORT_INTERVAL)
+    time.sleep(0.1)
+    reports, presses = core.reports_read, core.key_injections
+
+    # 讓被卡住的執行緒能結束
+    threading.Thread(target=drain_forever, args=(r,), daemon=True).start()
+    core.stop()
+    if logger is not None:
+        logger.close()
+    stream.close()
+    extra = ""
+    if logger is not None:
+        st = logger.stats()
+        extra = f", logged {st['written']}, sampled out {st['sampled_out']}, lost {st['lost']}"
+    print(f"{mode:<9} | pushed {pushed:>5} | HID read {reports:>5} | presses {presses:>4}{extra}")
+
+
+def main():
+    bench_cost()
+    print()
+    print(f"stdout pipe never read, {DURATION:.0f}s at ~1 kHz:")
+    run_stalled("print")
+    run_stalled("ring")
+    run_stalled("ring 1/10")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+監控端點的基準
+假裝置以約 1 kHz 送入報告時，另一個執行緒持續抓取 /metrics：
+列出抓取延遲、HID 執行緒是否仍處理完所有報告，以及一份輸出範例。
+
+執行: python benchmarks/bench_metrics.py
+"""
+import threading
+import time
+import urllib.request
+
+import _common  # noqa: F401 (把模組目錄加入 sys.path)
+
+from shuttle_core import RecordingCore
+from shuttle_hid import FakeHidBackend, make_report
+from shuttle_metrics import MetricsServer
+
+DURATION = 3.0
+REPORT_INTERVAL = 0.001
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))] if values else float("nan")
+
+
+def main():
+    fake = FakeHidBackend()
+    core = RecordingCore(lambda: fake, profile={"name": "Bench", "apps": ["*"], "buttons": {"1": "q"}},
+                         record=False)
+    core.start()
+    server = MetricsServer(core, port=0)
+    server.start()
+    host, port = server.address
+    url = f"http://{host}:{port}/metrics"
+
+    stop = threading.Event()
+    pushed = [0]
+
+    def feeder():
+        i = 0
+        while not stop.is_set():
+            fake.push(make_report(jog=i, buttons=(i // 10) & 1))
+            pushed[0] += 1
+            i += 1
+            time.sleep(REPORT_INTERVAL)
+
+    t = threading.Thread(target=feeder)
+    t.start()
+
+    latencies = []
+    end = time.monotonic() + DURATION
+    while time.monotonic() < end:
+        t0 = time.perf_counter()
+        with urllib.request.urlopen(url) as resp:
+            body = resp.read().decode("utf-8")
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+
+    stop.set()
+    t.join()
+    time.sleep(0.05)
+    core.stop()
+    with urllib.request.urlopen(url + ".json") as resp:
+        final = resp.read().decode("utf-8")
+    server.stop()
+
+    print(f"scrapes        : {len(latencies)} in {DURATION:.0f}s")
+    print(f"scrape latency : p50 {percentile(latencies, 0.5):.3f} ms, p99 {percentile(latencies, 0.99):.3f} ms, "
+          f"max {max(latencies):.3f} ms")
+    print(f"reports pushed : {pushed[0]}, read by core: {core.reports_read}")
+    print()
+    print("\n".join(line for line in body.splitlines() if not line.startswith("#")))
+    print()
+    print(final)
+
+
+if __name__ == "__main__":
+    main()
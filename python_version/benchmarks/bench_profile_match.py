@@ -0,0 +1,72 @@
+"""
+Profile 比對基準：舊的線性掃描 (每個 Profile x 每個 pattern 做子字串比對)
+vs ProfileMatcher (hash + Aho-Corasick) 冷查詢 vs LRU cache 命中。
+
+執行: python benchmarks/bench_profile_match.py
+"""
+import random
+import time
+
+import _common  # noqa: F401 (把模組目錄加入 sys.path)
+
+from shuttle_config import ProfileMatcher
+
+PROFILE_COUNTS = (10, 100, 1000, 5000)
+LOOKUPS = 2000
+
+
+def make_config(n, rng):
+    profiles = []
+    for i in range(n):
+        apps = [f"App{i:05d} {rng.choice(['Pro', 'Studio', 'Editor'])}", f"Tool{i:05d}"]
+        profiles.append({"name": f"P{i}", "apps": apps, "speeds": [], "buttons": {}})
+    profiles.append({"name": "Default", "apps": ["*"], "speeds": [], "buttons": {}})
+    return {"profiles": profiles}
+
+
+def linear_match(config, current_app):
+    """舊版 update_active_profile 的比對方式"""
+    for i, profile in enumerate(config["profiles"]):
+        apps = profile.get("apps", [])
+        if "*" in apps: continue
+        if any(target in current_app for target in apps):
+            return i
+    for i, profile in enumerate(config["profiles"]):
+        if "*" in profile.get("apps", []):
+            return i
+    return None
+
+
+def timed(func, names):
+    start = time.perf_counter()
+    for name in names:
+        func(name)
+    return (time.perf_counter() - start) / len(names) * 1e6
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'Profiles':>8} | {'linear us':>10} | {'matcher us':>10} | {'cached us':>9} | {'build ms':>8}")
+    print("-" * 58)
+    for n in PROFILE_COUNTS:
+        config = make_config(n, rng)
+        # 大部分是使用中的 App，混合未設定的 App (落到 Default)
+        names = [f"Tool{rng.randrange(n):05d}" if rng.random() < 0.8 else f"Unknown {rng.randrange(10**6)}"
+                 for _ in range(LOOKUPS)]
+
+        t0 = time.perf_counter()
+        matcher = ProfileMatcher(config, cache_size=LOOKUPS)
+        build_ms = (time.perf_counter() - t0) * 1000.0
+
+        for name in names[:50]:
+            assert matcher.match(name) == linear_match(config, name)
+
+        linear_us = timed(lambda name: linear_match(config, name), names)
+        matcher.match.cache_clear()
+        cold_us = timed(matcher.match, names)
+        cached_us = timed(matcher.match, names)
+        print(f"{n:>8} | {linear_us:>10.2f} | {cold_us:>10.2f} | {cached_us:>9.2f} | {build_ms:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Shuttle 引擎模擬：以 ManualClock 重播手勢 (比實際時間快)，
+列出每段速度的實際滾動間隔與設定的 speeds 表比較，以及變速後第一次滾動的延遲。
+
+執行: python benchmarks/bench_shuttle_sim.py
+"""
+import time
+
+import _common  # noqa: F401 (把模組目錄加入 sys.path)
+
+from shuttle_engine import simulate, analyze, DEFAULT_SPEEDS
+
+GESTURES = {
+    "0->3->7->2->0": [(0.0, 3), (2.0, 7), (3.0, 2), (5.0, 0)],
+    "0->1->2 (within startup)": [(0.0, 1), (0.03, 2), (2.0, 0)],
+    "5->2 decel": [(0.0, 5), (1.0, 2), (3.0, 0)],
+    "-4->4 reverse": [(0.0, -4), (1.0, 4), (2.0, 0)],
+}
+
+
+def fmt(v):
+    return f"{v:8.2f}" if v is not None else "       -"
+
+
+def main():
+    for name, gesture in GESTURES.items():
+        start = time.perf_counter()
+        events = simulate(gesture, DEFAULT_SPEEDS)
+        elapsed = (time.perf_counter() - start) * 1000.0
+        simulated = gesture[-1][0] * 1000.0
+        print(f"\n== {name}  (模擬 {simulated:.0f} ms，耗時 {elapsed:.2f} ms)")
+        print(f"{'Level':>5} | {'Expect':>8} | {'1st delay':>9} | {'Mean iv':>8} | {'Jitter':>8} | {'Max jit':>8} | {'Scrolls':>7}")
+        for row in analyze(events, DEFAULT_SPEEDS):
+            print(f"{row['value']:>5} | {fmt(row['expected_ms'])} | {fmt(row['first_scroll_delay_ms']):>9} | "
+                  f"{fmt(row['mean_interval_ms'])} | {fmt(row['mean_jitter_ms'])} | "
+                  f"{fmt(row['max_jitter_ms'])} | {row['scrolls']:>7}")
+
+
+if __name__ == "__main__":
+    main()
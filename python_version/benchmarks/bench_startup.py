@@ -0,0 +1,105 @@
+"""
+冷啟動基準 (每次量測都啟動新的 Python 行程)
+1. 各模組的 import 時間：輸入核心、mac_shuttle (GUI 延後載入)、各 GUI / 注入相依套件
+2. 從行程啟動到第一個 HID 報告被處理的時間 (假裝置，開啟後立即送出按鍵報告)，
+   比較「先啟動 HID 執行緒」與舊版「先載入 GUI 模組才啟動」的順序
+
+執行: python benchmarks/bench_startup.py
+"""
+import subprocess
+import sys
+import time
+
+from _common import ROOT
+
+RUNS = 5
+
+MODULES = ["shuttle_core", "mac_shuttle", "rumps", "pynput", "AppKit", "PyObjCTools.AppHelper", "hid"]
+
+# 舊版 mac_shuttle 在建立 HID 執行緒之前就載入的模組
+GUI_MODULES = ["rumps", "pynput.mouse", "pynput.keyboard", "PyObjCTools.AppHelper"]
+
+IMPORT_SCRIPT = """
+import time
+t0 = time.perf_counter()
+import {module}
+print(time.perf_counter() - t0)
+"""
+
+FIRST_REPORT_SCRIPT = """
+import sys, time
+sys.path.insert(0, {root!r})
+for name in {preload!r}:
+    try: __import__(name)
+    except ImportError: pass
+from shuttle_core import RecordingCore
+from shuttle_hid import FakeHidBackend, make_report
+
+class FirstReportCore(RecordingCore):
+    def perform_action(self, action):
+        print("FIRST_REPORT", time.monotonic(), flush=True)
+        self.is_running = False
+
+fake = FakeHidBackend([(0.0, make_report(buttons=1))])
+core = FirstReportCore(lambda: fake, profile={{"name": "Bench", "apps": ["*"], "buttons": {{"1": "q"}}}})
+core.start()
+core.thread.join(5.0)
+"""
+
+
+def run_python(code):
+    start = time.monotonic()
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    return start, result
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2] if values else None
+
+
+def bench_imports():
+    print(f"{'Module':<24} | {'import ms (median)':>18}")
+    print("-" * 46)
+    for module in MODULES:
+        samples = []
+        for _ in range(RUNS):
+            _, result = run_python(IMPORT_SCRIPT.format(module=module))
+            if result.returncode != 0:
+                samples = None
+                break
+            samples.append(float(result.stdout.strip()) * 1000.0)
+        value = f"{median(samples):.1f}" if samples else "not installed"
+        print(f"{module:<24} | {value:>18}")
+
+
+def bench_first_report():
+    installed = [m for m in GUI_MODULES
+                 if run_python(f"import {m}")[1].returncode == 0]
+    variants = [("core first (headless)", [])]
+    variants.append((f"GUI imports first ({len(installed)}/{len(GUI_MODULES)} installed)", GUI_MODULES))
+
+    print(f"{'Startup order':<36} | {'launch -> first report ms':>26}")
+    print("-" * 66)
+    for name, preload in variants:
+        samples = []
+        for _ in range(RUNS):
+            start, result = run_python(FIRST_REPORT_SCRIPT.format(root=ROOT, preload=preload))
+            if result.returncode != 0 or not result.stdout.strip():
+                print(result.stderr)
+                break
+            # 連線訊息由事件紀錄的背景執行緒寫出，順序不固定
+            line = next(l for l in result.stdout.splitlines() if l.startswith("FIRST_REPORT"))
+            samples.append((float(line.split()[1]) - start) * 1000.0)
+        value = f"{median(samples):.1f}" if samples else "failed"
+        print(f"{name:<36} | {value:>26}")
+
+
+def main():
+    bench_imports()
+    print()
+    bench_first_report()
+
+
+if __name__ == "__main__":
+    main()
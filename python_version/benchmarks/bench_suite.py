@@ -0,0 +1,272 @@
+"""
+輸入熱路徑基準組
+所有項目以固定的迴圈次數輪流執行 REPEATS 輪 (期間停用 GC)，取最小值 (最不受干擾) 與中位數，
+並與固定工作量的校正迴圈比較，以比值 (norm) 抵銷機器整體快慢的漂移。
+結果寫成 JSON，可用 --compare 與先前 commit 的結果比較 (比較 norm)。
+
+  decode_report        merge_report：解碼報告 + 按鍵邊緣 + Jog 差值
+  button_edges         handle_buttons：16 格按鍵表分派
+  jog_wrap             merge_report + handle_jog：跨越 255 -> 0 的 Jog 差值
+  profile_resolve_N    update_active_profile：N 個 Profile (快取命中 / 冷查詢)
+  shuttle_engine       ShuttleEngine 狀態機 (ManualClock，每模擬秒的耗時)
+  key_parse            compile_key_action：按鍵字串解析
+
+執行: python benchmarks/bench_suite.py [--out bench_suite.json] [--compare old.json] [--only jog]
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+
+import _common  # noqa: F401 (把模組目錄加入 sys.path)
+
+from shuttle_core import RecordingCore, ReportBatch
+from shuttle_config import compile_config, compile_key_action
+from shuttle_engine import ShuttleEngine, ManualClock, DEFAULT_SPEEDS
+from shuttle_hid import make_report
+
+REPEATS = 15
+PROFILE_COUNTS = (10, 100, 10000)
+CALIBRATION_OPS = 10000
+CALIBRATION_LOOPS = 5
+# 比較時超過這個比例才標示變快 / 變慢
+COMPARE_THRESHOLD = 0.15
+
+KEY_DEFS = ["q", "command+t", "command+shift+z", "ctrl+alt+delete", "f5", "space",
+            "option+left", "!", "Key.down", "cmd+shift+option+control+enter"]
+
+
+BENCH_PROFILE = {"name": "Bench", "apps": ["*"], "buttons": {str(i): "q" for i in range(1, 17)}}
+
+
+def null_core(clock=time.monotonic):
+    """輸出只計數不記錄的核心，只量輸入邏輯本身"""
+    return RecordingCore(clock=clock, profile=BENCH_PROFILE, record=False)
+
+
+# ================= 各項基準 =================
+# 每個函式回傳 (run, ops)：run() 執行一輪，ops 為一輪內的操作數
+
+def case_decode_report():
+    core = null_core()
+    reports = [make_report(shuttle=(i // 50) % 15 - 7 & 0xFF, jog=i & 0xFF,
+                           buttons=(1 << (i % 16)) if i % 3 == 0 else 0)
+               for i in range(1000)]
+    merge = core.merge_report
+
+    def run():
+        for data in reports:
+            merge(ReportBatch(), data)
+    return run, len(reports)
+
+
+def case_button_edges():
+    core = null_core()
+    masks = [(1 << (i % 16)) | (1 << ((i * 7) % 16)) if i % 4 else 0 for i in range(1000)]
+    handle = core.handle_buttons
+
+    def run():
+        for mask in masks:
+            handle(mask)
+    return run, len(masks)
+
+
+def case_jog_wrap():
+    clock = ManualClock()
+    core = null_core(clock=clock)
+    # 在 250 ~ 5 之間來回轉動，每一步都可能跨越 0/255
+    values = [(250 + (i % 12 if (i // 12) % 2 == 0 else 12 - i % 12)) & 0xFF for i in range(1000)]
+    reports = [make_report(jog=v) for v in values]
+    merge, handle = core.merge_report, core.handle_jog
+
+    def run():
+        for data in reports:
+            batch = ReportBatch()
+            merge(batch, data)
+            handle(batch.jog_delta)
+    return run, len(reports)
+
+
+def make_profile_config(n):
+    profiles = [{"name": f"P{i}", "apps": [f"App{i:05d} Studio", f"Tool{i:05d}"], "buttons": {"1": "q"}}
+                for i in range(n - 1)]
+    profiles.append({"name": "Default", "apps": ["*"]})
+    return {"profiles": profiles}
+
+
+def case_profile_resolve(n, cached):
+    core = null_core()
+    core.snapshot = compile_config(make_profile_config(n))
+    # 平均分布在整個 Profile 清單上，另有一個只會落到 Default 的 App
+    step = max(1, (n - 1) // 31)
+    apps = [f"App{i:05d} Studio" for i in range(0, n - 1, step)][:31] + ["Unknown App"]
+    matcher = core.snapshot.matcher
+
+    def run():
+        for app in apps:
+            if not cached:
+                matcher.match.cache_clear()
+            core.current_app = app
+            core.update_active_profile()
+    return run, len(apps)
+
+
+def case_shuttle_engine():
+    """模擬 10 秒的手勢：起步、加速、減速、反向、停止"""
+    gesture = [(0.0, 1), (0.03, 3), (1.0, 7), (3.0, 2), (5.0, -4), (7.0, 5), (9.0, 0)]
+    duration = 10.0
+
+    def run():
+        clock = ManualClock()
+        engine = ShuttleEngine(clock=clock, speeds=DEFAULT_SPEEDS)
+        for t, value in gesture:
+            while True:
+                deadline = engine.next_deadline()
+                if deadline is None or deadline > t: break
+                clock.advance_to(deadline)
+                engine.run_due()
+            clock.advance_to(t)
+            engine.update(value)
+        while True:
+            deadline = engine.next_deadline()
+            if deadline is None or deadline > duration: break
+            clock.advance_to(deadline)
+            engine.run_due()
+    return run, duration
+
+
+def case_key_parse():
+    defs = KEY_DEFS * 100
+
+    def run():
+        for key_def in defs:
+            compile_key_action(key_def)
+    return run, len(defs)
+
+
+CASES = {
+    "decode_report": (case_decode_report, 20, "report"),
+    "button_edges": (case_button_edges, 50, "mask"),
+    "jog_wrap": (case_jog_wrap, 20, "report"),
+    "shuttle_engine": (case_shuttle_engine, 20, "sim s"),
+    "key_parse": (case_key_parse, 20, "key"),
+}
+for _n in PROFILE_COUNTS:
+    CASES[f"profile_resolve_{_n}"] = (lambda n=_n: case_profile_resolve(n, True), 100, "lookup")
+    CASES[f"profile_resolve_{_n}_cold"] = (lambda n=_n: case_profile_resolve(n, False), 20, "lookup")
+
+
+# ================= 執行與比較 =================
+
+def calibration_loop():
+    """固定的純 Python 工作量，用來抵銷整台機器的速度漂移 (CPU 頻率、其他程序)"""
+    total = 0
+    for i in range(CALIBRATION_OPS):
+        total += i & 0xFF
+    return total
+
+
+def timed(func, loops):
+    t0 = time.perf_counter_ns()
+    for _ in range(loops):
+        func()
+    return (time.perf_counter_ns() - t0) / loops
+
+
+def measure(cases):
+    """
+    cases: {名稱: (factory, loops)}。所有項目輪流各取一個樣本、重複 REPEATS 輪，
+    每輪開頭跑一次校正迴圈，讓機器忽快忽慢時每一項受到相同的影響。
+    ns/op 取各輪最小值；norm = 每次操作相當於幾次校正迴圈迭代 (各輪與同輪校正值相除後取中位數)，
+    跨 commit 比較時以 norm 為準。
+    """
+    prepared = {}
+    for name, (factory, loops) in cases.items():
+        run, ops = factory()
+        run()  # 暖機
+        prepared[name] = (run, ops, loops)
+
+    samples = {name: [] for name in prepared}
+    reference = []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(REPEATS):
+            reference.append(timed(calibration_loop, CALIBRATION_LOOPS) / CALIBRATION_OPS)
+            for name, (run, ops, loops) in prepared.items():
+                samples[name].append(timed(run, loops) / ops)
+    finally:
+        gc.enable()
+
+    unit_cost = min(reference)
+    results = {}
+    for name, values in samples.items():
+        best = min(values)
+        _, ops, loops = prepared[name]
+        results[name] = {"min_ns": round(best, 1), "median_ns": round(statistics.median(values), 1),
+                         "stdev_pct": round(statistics.pstdev(values) / statistics.mean(values) * 100.0, 2),
+                         "norm": round(statistics.median(v / r for v, r in zip(values, reference)), 2),
+                         "ops": ops, "loops": loops, "repeats": REPEATS}
+    return results, unit_cost
+
+
+def git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(results, old_path):
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    print(f"\n對照 {old_path} (commit {old.get('commit')})")
+    print(f"{'Case':<28} | {'old norm':>10} | {'new norm':>10} | {'change':>8}")
+    print("-" * 66)
+    for name, new in results.items():
+        before = old.get("results", {}).get(name)
+        if before is None:
+            print(f"{name:<28} | {'-':>10} | {new['norm']:>10.2f} | {'new':>8}")
+            continue
+        ratio = new["norm"] / before["norm"] - 1.0
+        mark = "" if abs(ratio) < COMPARE_THRESHOLD else (" 🐢" if ratio > 0 else " 🚀")
+        print(f"{name:<28} | {before['norm']:>10.2f} | {new['norm']:>10.2f} | {ratio * 100:>+7.1f}%{mark}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="輸入熱路徑基準組")
+    parser.add_argument("--out", default="bench_suite.json", help="JSON 結果檔")
+    parser.add_argument("--compare", help="與先前的 JSON 結果比較")
+    parser.add_argument("--only", help="只執行名稱包含此字串的項目")
+    args = parser.parse_args(argv)
+
+    selected = {name: (factory, loops) for name, (factory, loops, _) in CASES.items()
+                if not args.only or args.only in name}
+    results, unit_cost = measure(selected)
+
+    print(f"{'Case':<28} | {'min ns/op':>10} | {'median':>10} | {'stdev':>6} | {'norm':>8} | unit")
+    print("-" * 83)
+    for name, r in results.items():
+        r["unit"] = CASES[name][2]
+        print(f"{name:<28} | {r['min_ns']:>10.1f} | {r['median_ns']:>10.1f} | {r['stdev_pct']:>5.1f}% | "
+              f"{r['norm']:>8.2f} | {r['unit']}")
+    print(f"(校正迴圈 {unit_cost:.2f} ns / iteration)")
+
+    data = {"commit": git_revision(), "python": platform.python_version(),
+            "platform": platform.platform(), "calibration_ns": round(unit_cost, 3), "results": results}
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    print(f"\n已寫入 {args.out}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+Timer 準確度：以假裝置即時重播 Shuttle 手勢，
+統計每個 timer (啟動緩衝 / 過渡 / tick) 實際執行時間比排定時間晚多少 (overshoot)。
+
+執行: python benchmarks/bench_timer_accuracy.py
+"""
+import time
+
+import _common  # noqa: F401 (把模組目錄加入 sys.path)
+
+from shuttle_core import RecordingCore
+from shuttle_hid import FakeHidBackend, make_report
+
+GESTURE = [(0.1, 7), (2.1, 3), (3.1, 5), (4.1, 0)]
+
+
+def main():
+    fake = FakeHidBackend([(t, make_report(shuttle=v)) for t, v in GESTURE])
+    core = RecordingCore(lambda: fake, record=False)
+    core.start()
+    time.sleep(GESTURE[-1][0] + 0.3)
+    core.stop()
+
+    st = core.timers.overshoot_stats()
+    print(f"timers fired : {st['count']}  (scrolls: {core.scroll_count})")
+    print(f"overshoot p50: {st['p50_ms']:.3f} ms")
+    print(f"overshoot p99: {st['p99_ms']:.3f} ms")
+    print(f"overshoot max: {st['max_ms']:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+延遲追蹤的基準
+1. 額外成本：同一段「解碼 -> 處理 -> 注入」路徑在停用 / 啟用追蹤時每個報告的耗時
+2. 端對端：假裝置 + 實際的輸出佇列執行緒，列出各階段 p50 / p95 / p99 / max 與直方圖
+
+執行: python benchmarks/bench_trace.py
+"""
+import time
+
+import _common  # noqa: F401 (把模組目錄加入 sys.path)
+
+from shuttle_core import RecordingCore
+from shuttle_hid import FakeHidBackend, make_report
+from shuttle_output import OutputDispatcher, PRIORITY_KEY, PRIORITY_SCROLL
+from shuttle_trace import (TRACE_KEY, TRACE_SCROLL, STAGE_INJECT_START, STAGE_INJECT_END,
+                           HISTOGRAM_BOUNDS_MS)
+
+PROFILE = {"name": "Bench", "apps": ["*"], "buttons": {"1": "q"}}
+REPORTS = 200000
+PRESSES = 200
+PRESS_INTERVAL = 0.01
+
+
+class InlineCore(RecordingCore):
+    """與 ShuttleController 相同的追蹤呼叫，但注入 (只計數) 直接在同一執行緒完成"""
+
+    def __init__(self):
+        super().__init__(profile=PROFILE, record=False)
+
+    def _inject(self, trace, inject, *args):
+        if trace is not None: self.trace_mark(trace, STAGE_INJECT_START)
+        inject(self, *args)
+        if trace is not None: self.trace_mark(trace, STAGE_INJECT_END)
+
+    def perform_scroll(self, direction, multiplier):
+        self._inject(self.trace_dispatch(TRACE_SCROLL), RecordingCore.perform_scroll, direction, multiplier)
+
+    def perform_action(self, action):
+        self._inject(self.trace_dispatch(TRACE_KEY), RecordingCore.perform_action, action)
+
+
+class DispatchCore(RecordingCore):
+    """注入排進輸出佇列，由輸出執行緒模擬注入成本"""
+
+    def __init__(self, backend_factory):
+        super().__init__(backend_factory, profile=PROFILE, record=False)
+        self.output = OutputDispatcher()
+        self.output.start()
+
+    def _inject(self, trace):
+        if trace is not None: self.trace_mark(trace, STAGE_INJECT_START)
+        time.sleep(0.0002)  # 模擬注入成本
+        if trace is not None: self.trace_mark(trace, STAGE_INJECT_END)
+
+    def perform_scroll(self, direction, multiplier):
+        self.output.submit(PRIORITY_SCROLL, self._inject, self.trace_dispatch(TRACE_SCROLL))
+
+    def perform_action(self, action):
+        self.output.submit(PRIORITY_KEY, self._inject, self.trace_dispatch(TRACE_KEY))
+
+
+def run_inline(core, reports):
+    """run_logic_loop 中處理單一報告的路徑"""
+    t0 = time.perf_counter()
+    for data in reports:
+        if core.tracer is None:
+            core.handle_batch(core.drain_reports(data))
+        else:
+            core.trace_read = core.clock()
+            batch = core.drain_reports(data)
+            core.trace_decode = core.clock()
+            core.handle_batch(batch)
+            core.trace_read = core.trace_decode = None
+    return time.perf_counter() - t0
+
+
+class EmptyDevice:
+    def read(self, max_length, timeout_ms=0):
+        return []
+
+
+def bench_overhead():
+    reports = [make_report(jog=i, buttons=i & 1) for i in range(REPORTS)]
+    print(f"{'Tracing':<10} | {'ns / report':>11} | {'outputs':>8} | {'traced':>7}")
+    print("-" * 46)
+    for enabled in (False, True):
+        core = InlineCore()
+        core.device = EmptyDevice()
+        if enabled:
+            core.enable_tracing()
+        elapsed = run_inline(core, reports)
+        traced = len(core.tracer) if core.tracer else 0
+        print(f"{'on' if enabled else 'off':<10} | {elapsed / REPORTS * 1e9:>11.0f} | "
+              f"{core.scroll_count + core.key_injections:>8} | {traced:>7}")
+
+
+def bench_end_to_end():
+    script = []
+    for i in range(PRESSES):
+        t = 0.1 + i * PRESS_INTERVAL
+        script.append((t, make_report(jog=i * 2, buttons=1)))
+        script.append((t + PRESS_INTERVAL / 2, make_report(jog=i * 2 + 1, buttons=0)))
+    fake = FakeHidBackend(script)
+    core = DispatchCore(lambda: fake)
+    tracer = core.enable_tracing()
+    core.start()
+    time.sleep(0.2 + PRESSES * PRESS_INTERVAL)
+    core.stop()
+    core.output.stop()
+
+    print(tracer.format_report())
+    print()
+    labels = [f"<={b:g}" for b in HISTOGRAM_BOUNDS_MS] + [f">{HISTOGRAM_BOUNDS_MS[-1]:g}"]
+    print("total (ms)  " + " ".join(f"{label:>7}" for label in labels))
+    for kind, name in ((TRACE_KEY, "key"), (TRACE_SCROLL, "scroll")):
+        hist = tracer.summary(kind)["total"]["histogram"]
+        print(f"{name:<11} " + " ".join(f"{n:>7}" for n in hist))
+
+
+def main():
+    bench_overhead()
+    print()
+    bench_end_to_end()
+
+
+if __name__ == "__main__":
+    main()
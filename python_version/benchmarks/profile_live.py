@@ -0,0 +1,109 @@
+"""
+執行中效能分析示範
+假裝置持續送入報告時，以 SIGUSR1 開始 / 停止 CPU 分析、SIGUSR2 取記憶體快照
+(與選單相同的路徑，不重新啟動核心)，中間故意在 HID 執行緒上累積一些物件，
+確認差異報告抓得到；並比較分析期間 HID 執行緒每個報告的處理時間。
+
+執行: python benchmarks/profile_live.py
+"""
+import os
+import pstats
+import signal
+import tempfile
+import time
+
+import _common  # noqa: F401 (把模組目錄加入 sys.path)
+
+from shuttle_core import RecordingCore
+from shuttle_hid import FakeHidBackend, make_report
+from shuttle_profile import CpuProfiler, MemorySnapshots, install_signal_handlers, GLOBAL_PROFILER
+
+PHASE = 1.5
+REPORT_INTERVAL = 0.001
+
+
+class LeakyCore(RecordingCore):
+    """leak 時每個按鍵動作都留下一份紀錄 (模擬長時間執行後的記憶體成長)"""
+
+    def __init__(self, backend_factory):
+        super().__init__(backend_factory, profile={"name": "Bench", "apps": ["*"], "buttons": {"1": "q"}},
+                         record=False)
+        self.history = []
+        self.leak = False
+        self.busy_ns = 0
+
+    def process_reports(self, data):
+        t0 = time.perf_counter_ns()
+        super().process_reports(data)
+        self.busy_ns += time.perf_counter_ns() - t0
+
+    def perform_action(self, action):
+        RecordingCore.perform_action(self, action)
+        if self.leak:
+            self.history.append({"key": action.key_def, "t": self.clock(), "pad": "x" * 200})
+
+
+def run_phase(core, fake, seconds):
+    busy, reports = core.busy_ns, core.reports_read
+    end = time.monotonic() + seconds
+    i = 0
+    while time.monotonic() < end:
+        fake.push(make_report(jog=i & 0xFF, buttons=i & 1))
+        i += 1
+        time.sleep(REPORT_INTERVAL)
+    time.sleep(0.05)
+    count = core.reports_read - reports
+    return count, (core.busy_ns - busy) / max(count, 1) / 1000.0
+
+
+def main():
+    fake = FakeHidBackend()
+    core = LeakyCore(lambda: fake)
+    core.start()
+    directory = tempfile.mkdtemp(prefix="shuttle-profile-")
+    cpu = CpuProfiler(core, directory)
+    memory = MemorySnapshots(directory)
+    results = {}
+
+    def on_cpu():
+        results["cpu"] = cpu.toggle()
+
+    def on_memory():
+        results.setdefault("memory", []).append(memory.take())
+
+    install_signal_handlers(on_cpu, on_memory)
+    pid = os.getpid()
+
+    count, us = run_phase(core, fake, PHASE)
+    print(f"baseline          : {count} reports, {us:.1f} us / report on HID thread")
+
+    os.kill(pid, signal.SIGUSR2)  # 記憶體基準
+    os.kill(pid, signal.SIGUSR1)  # 開始 CPU 分析
+    core.leak = True
+    count, us = run_phase(core, fake, PHASE)
+    print(f"profiling + leak  : {count} reports, {us:.1f} us / report on HID thread")
+    os.kill(pid, signal.SIGUSR1)  # 停止 CPU 分析
+    os.kill(pid, signal.SIGUSR2)  # 與基準比較
+    core.leak = False
+    memory.stop()
+
+    count, us = run_phase(core, fake, PHASE)
+    print(f"after (stopped)   : {count} reports, {us:.1f} us / report on HID thread")
+    core.stop()
+
+    elapsed, paths = results["cpu"]
+    print(f"\nCPU profile ({elapsed:.2f} s, {'one profiler for all threads' if GLOBAL_PROFILER else 'per thread'}):")
+    for path in paths:
+        print(f"  {path}")
+        stats = pstats.Stats(path)
+        stats.sort_stats("cumulative").print_stats("shuttle_core", 5)
+
+    print("memory diff (top entries):")
+    summary, report = results["memory"][-1]
+    print(summary)
+    print(f"  full report: {report}")
+    print(f"  leaked records: {len(core.history)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+錄製 / 重播示範
+合成一段「Shuttle 5 -> 2 -> 0、Jog 轉動、按 Button 1」的錄製檔，
+以手動時鐘重播兩次確認結果完全相同，再以 1x / 4x 實際時間重播比較時間軸差異。
+
+執行: python benchmarks/replay_gesture.py
+"""
+import os
+import tempfile
+import time
+
+import _common  # noqa: F401 (把模組目錄加入 sys.path)
+
+from shuttle_config import Profile
+from shuttle_hid import make_report
+from shuttle_record import TraceFile, TraceRecorder, replay
+
+PROFILE = Profile({"name": "Replay", "apps": ["*"], "buttons": {"1": "command+t"}})
+
+
+def synthesize(path):
+    """HID 約每 8ms 回報一次，數值改變時才有新報告；這裡照實際裝置的節奏產生"""
+    recorder = TraceRecorder(path, clock_ns=lambda: 0)
+    t = 0.0
+    jog = 0
+
+    def emit(shuttle, buttons=0):
+        recorder.record(make_report(shuttle=shuttle, jog=jog, buttons=buttons), int(t * 1e9))
+
+    for value, hold in ((1, 0.02), (3, 0.02), (5, 0.8), (4, 0.03), (3, 0.03), (2, 1.0), (0, 0.2)):
+        emit(value)
+        t += hold
+    for _ in range(20):
+        jog = (jog + 1) & 0xFF
+        emit(0)
+        t += 0.008
+    emit(0, buttons=1)
+    t += 0.1
+    emit(0)
+    recorder.close()
+    return recorder.count
+
+
+def summarize(actions):
+    scrolls = [a for a in actions if a[1] == "scroll"]
+    keys = [a for a in actions if a[1] == "key"]
+    total = sum(a[2] for a in scrolls)
+    return f"{len(actions)} actions ({len(scrolls)} scroll = {total}, {len(keys)} key)"
+
+
+def timeline_error_ms(reference, other):
+    if len(reference) != len(other):
+        return None
+    diffs = sorted(abs(a[0] - b[0]) * 1000.0 for a, b in zip(reference, other))
+    return diffs[len(diffs) // 2], diffs[-1]
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "gesture.shtr")
+        count = synthesize(path)
+        trace = TraceFile(path)
+        records = list(trace)
+        size = os.path.getsize(path)
+        print(f"recording: {count} reports, {trace.duration():.3f} s, {size} bytes")
+        trace.close()
+
+        t0 = time.perf_counter()
+        first = replay(records, PROFILE)
+        elapsed = time.perf_counter() - t0
+        second = replay(records, PROFILE)
+        print(f"max speed : {summarize(first)} in {elapsed * 1000.0:.1f} ms, "
+              f"deterministic: {'yes' if first == second else 'NO'}")
+
+        for speed in (1.0, 4.0):
+            t0 = time.perf_counter()
+            actions = replay(records, PROFILE, speed)
+            elapsed = time.perf_counter() - t0
+            err = timeline_error_ms(first, actions)
+            # 實際時間重播時，間隔很短的報告可能被合併進同一批次 (滾動總量不變)
+            err_text = f"median {err[0]:.2f} ms, max {err[1]:.2f} ms" if err else "reports merged into fewer batches"
+            print(f"{speed:g}x real   : {summarize(actions)} in {elapsed:.2f} s, vs max-speed timeline: {err_text}")
+
+        print()
+        print("first 12 actions (max speed):")
+        for t, kind, value in first[:12]:
+            print(f"  {t * 1000.0:8.1f} ms  {kind:<6} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Jog 速度感應加速模擬 (ManualClock，不實際等待)
+以固定轉速 (格/秒) 轉動 Jog 2 秒，報告最快每 8 ms 一筆 (同一筆報告內的格數合併)，
+比較固定倍率與 linear / exponential / table 三種曲線的輸出速率 (行/秒)、每格平均行數，
+以及以該轉速捲動 10,000 行需要的時間；並確認加速不會排入任何 timer (沒有額外喚醒)。
+
+執行: python benchmarks/sim_jog_accel.py
+(spin() 也供 tests/test_jog_accel.py 使用)
+"""
+
+import _common  # noqa: F401 (把模組目錄加入 sys.path)
+
+from shuttle_core import RecordingCore
+from shuttle_engine import ManualClock
+
+DURATION = 2.0
+REPORT_INTERVAL = 0.008
+SPIN_RATES = (1, 2, 5, 10, 20, 40, 80, 160)
+ROWS = 10000
+
+PROFILES = (
+    ("fixed x3", {}),
+    ("linear", {"jog_acceleration": {"curve": "linear", "threshold": 10, "slope": 0.1, "max_gain": 8}}),
+    ("exponential", {"jog_acceleration": {"curve": "exponential", "threshold": 10, "factor": 0.03, "max_gain": 8}}),
+    ("table", {"jog_acceleration": {"curve": "table", "table": [[0, 0.34], [8, 0.34], [15, 1], [40, 3], [100, 8]]}}),
+)
+
+
+def spin_reports(rate, duration=DURATION):
+    """[(時間, 本報告的格數)]：每格在 k / rate 秒，落在同一個 8 ms 報告區間的合併"""
+    reports = {}
+    for k in range(1, int(rate * duration) + 1):
+        t = k / rate
+        slot = int(t / REPORT_INTERVAL)
+        reports[slot] = reports.get(slot, 0) + 1
+    return sorted((slot * REPORT_INTERVAL, count) for slot, count in reports.items())
+
+
+def spin(raw, rate, duration=DURATION, record=False):
+    """
+    以 rate 格/秒轉動 duration 秒，回傳 (核心, 總格數, 排入 timer 的報告數)；
+    結束後讓 jog_max_rate 累積的量送完
+    """
+    clock = ManualClock()
+    core = RecordingCore(clock=clock, profile=dict(raw, name="Sim", apps=["*"]), record=record)
+    detents = 0
+    timers_scheduled = 0
+    for t, count in spin_reports(rate, duration):
+        clock.advance_to(t)
+        core.run_due_timers()
+        before = len(core.timers)
+        core.handle_jog(count)
+        timers_scheduled += len(core.timers) > before
+        detents += count
+    clock.advance_to(duration + 1.0)
+    core.run_due_timers()
+    return core, detents, timers_scheduled
+
+
+def main():
+    names = [name for name, _ in PROFILES]
+    print(f"output rate (lines/s) while spinning for {DURATION:.0f} s, reports every {REPORT_INTERVAL * 1000:.0f} ms at most")
+    print(f"{'detents/s':>9} | " + " | ".join(f"{n:>11}" for n in names))
+    print("-" * (12 + 14 * len(names)))
+    results = {}
+    timers = 0
+    for rate in SPIN_RATES:
+        row = []
+        for name, raw in PROFILES:
+            core, detents, scheduled = spin(raw, rate)
+            timers += scheduled
+            results[name, rate] = (core.scroll_lines, detents)
+            row.append(f"{core.scroll_lines / DURATION:11.1f}")
+        print(f"{rate:>9} | " + " | ".join(row))
+
+    print("\nlines per detent")
+    print(f"{'detents/s':>9} | " + " | ".join(f"{n:>11}" for n in names))
+    print("-" * (12 + 14 * len(names)))
+    for rate in SPIN_RATES:
+        row = []
+        for name in names:
+            lines, detents = results[name, rate]
+            row.append(f"{lines / detents:11.2f}")
+        print(f"{rate:>9} | " + " | ".join(row))
+
+    print(f"\nseconds to scroll {ROWS} rows")
+    print(f"{'detents/s':>9} | " + " | ".join(f"{n:>11}" for n in names))
+    print("-" * (12 + 14 * len(names)))
+    for rate in SPIN_RATES[-3:]:
+        row = []
+        for name in names:
+            lines, _ = results[name, rate]
+            row.append(f"{ROWS / (lines / DURATION):11.1f}")
+        print(f"{rate:>9} | " + " | ".join(row))
+
+    print(f"\ntimers scheduled by jog acceleration: {timers}")
+
+
+if __name__ == "__main__":
+    main()
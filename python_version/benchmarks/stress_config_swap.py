@@ -0,0 +1,135 @@
+"""
+設定快照替換的壓力測試
+多個執行緒不停編輯設定 (edit_profile)，同時以假裝置高速送入按鍵 / Jog / Shuttle 報告。
+每次編輯都把 speeds、jog_multiplier、Button 1 設成同一個版本號 n 的對應值，
+HID 執行緒每次輸出時檢查當下讀到的 Profile 是否內部一致 (不會看到編輯到一半的設定)。
+
+執行: python benchmarks/stress_config_swap.py
+(profile_values / version_of / CheckingCore / feeder / writer 也供 tests/test_config_swap.py 使用)
+"""
+import random
+import string
+import sys
+import threading
+import time
+
+import _common  # noqa: F401 (把模組目錄加入 sys.path)
+
+from shuttle_core import RecordingCore
+from shuttle_hid import FakeHidBackend, make_report
+
+DURATION = 3.0
+WRITERS = 4
+REPORT_INTERVAL = 0.0005
+
+LETTERS = string.ascii_lowercase
+
+
+def profile_values(n):
+    return {"speeds": [n] * 7, "jog_multiplier": n, "buttons": {"1": LETTERS[n % 26]}}
+
+
+def version_of(profile):
+    """Profile 內各欄位都是同一個 n 時回傳 n，否則回傳 None (編輯到一半)"""
+    n = profile.jog_multiplier
+    action = profile.buttons[0]
+    if any(s != n for s in profile.speeds):
+        return None
+    if action is None or action.key_def != LETTERS[n % 26] or profile.button_defs.get("1") != action.key_def:
+        return None
+    return n
+
+
+class CheckingCore(RecordingCore):
+    """每次輸出時檢查目前 Profile 與速度表的一致性"""
+
+    def __init__(self, backend_factory):
+        super().__init__(backend_factory, record=False)
+        self.checks = 0
+        self.inconsistent = 0
+
+    def check_profile(self):
+        profile = self.active_profile
+        if profile is None: return
+        self.checks += 1
+        speeds = self.shuttle.speeds
+        if version_of(profile) is None or any(s != speeds[0] for s in speeds):
+            self.inconsistent += 1
+
+    def perform_scroll(self, direction, multiplier):
+        RecordingCore.perform_scroll(self, direction, multiplier)
+        self.check_profile()
+
+    def perform_action(self, action):
+        RecordingCore.perform_action(self, action)
+        self.check_profile()
+
+
+def feeder(fake, stop):
+    """持續送入 按下/放開 Button 1、Jog 轉動、Shuttle 變化"""
+    jog = 0
+    i = 0
+    while not stop.is_set():
+        jog = (jog + 1) & 0xFF
+        shuttle = (i // 50) % 8
+        fake.push(make_report(shuttle=shuttle, jog=jog, buttons=i & 1))
+        i += 1
+        time.sleep(REPORT_INTERVAL)
+
+
+def writer(core, stop, counters, seed):
+    rng = random.Random(seed)
+    while not stop.is_set():
+        n = rng.randint(5, 500)
+        values = profile_values(n)
+
+        def mutate(profile):
+            profile.update(values)
+        target = core.snapshot.profiles[0]
+        core.edit_profile(target, mutate)
+        counters[seed] += 1
+        time.sleep(0)  # 讓出 GIL，避免寫入端完全佔住 HID 執行緒
+
+
+def main():
+    config = {"profiles": [dict(name="Stress", apps=["*"], **profile_values(5))]}
+    fake = FakeHidBackend()
+    core = CheckingCore(lambda: fake)
+    core.apply_config(config)
+    core.on_app_activated("Stress App")
+    core.start()
+
+    stop = threading.Event()
+    counters = [0] * WRITERS
+    threads = [threading.Thread(target=feeder, args=(fake, stop))]
+    threads += [threading.Thread(target=writer, args=(core, stop, counters, i)) for i in range(WRITERS)]
+    for t in threads:
+        t.start()
+
+    # 主執行緒的角色：快照替換後重新套用 Profile
+    t0 = time.monotonic()
+    applies = 0
+    while time.monotonic() - t0 < DURATION:
+        core.update_active_profile()
+        applies += 1
+        time.sleep(0.0002)
+
+    stop.set()
+    for t in threads:
+        t.join()
+    core.stop()
+    elapsed = time.monotonic() - t0
+
+    edits = sum(counters)
+    print(f"edits           : {edits}  ({edits / elapsed:.0f}/s, {WRITERS} writers)")
+    print(f"snapshot version: {core.snapshot.version}")
+    print(f"profile applies : {applies}")
+    print(f"reports merged  : {core.reports_merged} in {core.batch_count} batches")
+    print(f"outputs checked : {core.checks}  (keys {core.key_injections}, scrolls {core.scroll_count})")
+    print(f"inconsistent    : {core.inconsistent}")
+    if core.inconsistent:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
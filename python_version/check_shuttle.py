@@ -1,7 +1,13 @@
 # check_shuttle.py
+import sys
 import hid
 import time
 
+from shuttle_record import TraceRecorder
+
+# python check_shuttle.py [錄製檔.shtr]
+recorder = TraceRecorder(sys.argv[1]) if len(sys.argv) > 1 else None
+
 # ShuttlePro v2 常見 ID，若抓不到請改回你查到的
 VID = 0x0b33
 PID = 0x0030
@@ -15,6 +21,7 @@ try:
     while True:
         data = h.read(64)
         if data:
+            if recorder: recorder.record(data)
             # 將數據轉為帶有索引的 Hex，方便你對照
             # 格式: [index: value]
             formatted = [f"{i}:{hex(x)}" for i, x in enumerate(data)]
@@ -23,3 +30,7 @@ try:
 
 except Exception as e:
     print(f"錯誤: {e}")
+finally:
+    if recorder:
+        recorder.close()
+        print(f"已錄製 {recorder.count} 筆 -> {recorder.path}")
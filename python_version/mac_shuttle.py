@@ -1,320 +1,308 @@
-import hid
 import time
 import subprocess
 import threading
-import rumps
 import sys
 import os
 import json
-from pynput.mouse import Controller as MouseController
-from pynput.keyboard import Controller as KeyboardController, Key
-from AppKit import NSWorkspace
-# 引入必要的 PyObjC 工具，用於將背景執行緒的操作轉發回主執行緒
-from PyObjCTools.AppHelper import callAfter
+# rumps / pynput / PyObjC 都在第一次用到時才載入，
+# HID 執行緒不必等 GUI 模組載入與選單建立就能開始處理報告
+
+from shuttle_core import ShuttleInputCore
+from shuttle_inject import create_default_sink
+from shuttle_output import OutputDispatcher, PRIORITY_KEY, PRIORITY_SCROLL
+from shuttle_config import ConfigError, compile_key_action
+from shuttle_focus import NSWorkspaceFocusProvider
+from shuttle_persist import (ConfigWriter, CONFIG_FILE, DEFAULT_CONFIG,
+                             load_config_safe, save_config_safe)
+from shuttle_watch import ConfigWatcher
+from shuttle_record import TraceRecorder
+from shuttle_log import log
+from shuttle_profile import ProfilerError, install_signal_handlers
+from shuttle_trace import TRACE_KEY, TRACE_SCROLL, STAGE_INJECT_START, STAGE_INJECT_END
 
 # ================= 常數設定 =================
 
-VID = 0x0b33
-PID = 0x0030
-
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 ASSETS_DIR = os.path.join(SCRIPT_DIR, "assets")
-CONFIG_FILE = os.path.join(SCRIPT_DIR, "shuttle_config.json")
+TRACE_FILE = os.path.join(SCRIPT_DIR, "shuttle_latency.json")
+RECORDINGS_DIR = os.path.join(SCRIPT_DIR, "recordings")
+PROFILES_DIR = os.path.join(SCRIPT_DIR, "profiles")
+EVENTS_FILE = os.path.join(SCRIPT_DIR, "shuttle_events.log")
+# 「匯出最近事件」寫出的筆數 / 對話框顯示的筆數
+DUMP_EVENTS = 500
+ALERT_EVENTS = 15
 
 ICON_ACTIVE = os.path.join(ASSETS_DIR, "icon-active-Template.png")
 ICON_INACTIVE = os.path.join(ASSETS_DIR, "icon-inactive-Template.png")
 ICON_DISCONNECTED = os.path.join(ASSETS_DIR, "icon-disconnected-Template.png")
 
-SHUTTLE_INDEX = 0
-JOG_INDEX = 1
-BUTTON_LOW_INDEX = 3
-BUTTON_HIGH_INDEX = 4
-
-# 新版預設設定
-DEFAULT_CONFIG = {
-    "profiles": [
-        {
-            "name": "Windows Remote",
-            "apps": ["Windows App", "Microsoft Remote Desktop", "WindowsApp", "rdp"],
-            "speeds": [800, 600, 333, 200, 100, 50, 20],
-            "buttons": {
-                "1": "q", "2": "7", "3": "5", "4": "6", "5": "d",
-                "6": "8", "7": "1", "8": "9", "9": "4", "10": "x",
-                "11": "f", "12": "", "13": "w", "14": "o", "15": "down"
-            }
-        },
-        {
-            "name": "Chrome / Browser",
-            "apps": ["Google Chrome", "Safari", "Microsoft Edge", "Arc"],
-            "speeds": [500, 300, 150, 80, 40, 20, 10],
-            "buttons": {
-                "1": "command+t",
-                "2": "command+w",
-                "3": "command+r",
-                "13": "space"
-            }
-        },
-        {
-            "name": "Default (Global)",
-            "apps": ["*"],
-            "speeds": [800, 600, 333, 200, 100, 50, 20],
-            "buttons": {}
-        }
-    ]
-}
-
-MAC_KEY_CODES = {
-    "a": 0, "s": 1, "d": 2, "f": 3, "h": 4, "g": 5, "z": 6, "x": 7, "c": 8, "v": 9,
-    "b": 11, "q": 12, "w": 13, "e": 14, "r": 15, "y": 16, "t": 17, "1": 18, "2": 19,
-    "3": 20, "4": 21, "6": 22, "5": 23, "=": 24, "9": 25, "7": 26, "-": 27, "8": 28,
-    "0": 29, "]": 30, "o": 31, "u": 32, "[": 33, "i": 34, "p": 35, "l": 37, "j": 38,
-    "'": 39, "k": 40, ";": 41, "\\": 42, ",": 43, "/": 44, "n": 45, "m": 46, ".": 47,
-    "tab": 48, "space": 49, "`": 50, "delete": 51, "enter": 36, "escape": 53,
-    "down": 125, "up": 126, "left": 123, "right": 124, "f1": 122, "f2": 120, "f3": 99,
-    "f4": 118, "f5": 96, "f6": 97, "f7": 98, "f8": 100, "f9": 101, "f10": 109,
-    "f11": 103, "f12": 111, "command": 55, "shift": 56, "capslock": 57, "option": 58,
-    "control": 59, "right_command": 54, "right_shift": 60, "right_option": 61,
-    "right_control": 62, "fn": 63
-}
-
-# ================= 設定檔管理 =================
-
-def load_config_safe():
-    if not os.path.exists(CONFIG_FILE):
-        save_config_safe(DEFAULT_CONFIG)
-        return DEFAULT_CONFIG
-    try:
-        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-            if "profiles" not in config:
-                new_config = {"profiles": DEFAULT_CONFIG["profiles"]}
-                os.rename(CONFIG_FILE, CONFIG_FILE + ".bak")
-                save_config_safe(new_config)
-                return new_config
-            return config
-    except Exception as e:
-        print(f"❌ Config Error: {e}")
-        return DEFAULT_CONFIG
-
-def save_config_safe(config):
-    try:
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=4, ensure_ascii=False)
-        return True
-    except Exception as e:
-        print(f"Save Error: {e}")
-        return False
+def callAfter(func, *args, **kwargs):
+    """把背景執行緒的操作轉發回主執行緒 (PyObjCTools.AppHelper.callAfter)"""
+    from PyObjCTools.AppHelper import callAfter as call_after
+    call_after(func, *args, **kwargs)
 
 # ================= 主控制器 =================
 
-class ShuttleController(rumps.App):
-    def __init__(self):
-        init_icon = None
-        init_title = "🎛️"
-
-        # 啟動時先檢查一次 Icon 狀態
-        if os.path.exists(ICON_DISCONNECTED):
-            init_icon = ICON_DISCONNECTED
-            init_title = None
+class ShuttleController(ShuttleInputCore):
+    """
+    __init__ 只建立輸入核心並立即啟動 HID 執行緒 (headless)，
+    run() 才載入 rumps、建立選單並進入主迴圈。
+    """
 
-        super(ShuttleController, self).__init__("MacShuttle", title=init_title, icon=init_icon, quit_button=None)
+    def __init__(self, backend_factory=None):
+        ShuttleInputCore.__init__(self, backend_factory)
+        self.app = None  # rumps.App，run() 時建立
 
-        self.config = load_config_safe()
+        # 無效的項目只停用該項，run() 建立選單後再提示；讀取失敗時暫用預設設定 (不會寫回)
+        self.startup_problems = self.load_initial_config(load_config_safe(), DEFAULT_CONFIG)
 
-        # 狀態變數
-        self.is_running = True
-        self.is_enabled = True
-        self.device = None
+        self.apply_log_settings()
 
         # 記錄上一次的連線狀態，用於比較是否需要更新 UI
         self.last_device_connected = False
 
-        self.mouse = MouseController()
-        self.keyboard = KeyboardController()
-        self.current_app = ""
-        self.active_profile = None
+        # pynput 在輸出執行緒第一次滾動 / 按鍵時才建立
+        self.mouse = None
+        self.keyboard = None
+        # 長駐的按鍵注入 (第一次按鍵時才啟動 osascript)
+        self.key_sink = create_default_sink()
+        # 輸出佇列：注入與滾動不在 HID 執行緒上執行
+        self.output = OutputDispatcher()
+        self.output.start()
+        # 設定檔延遲寫入 (連續編輯只寫一次，不在 UI / HID 執行緒寫檔)
+        self.config_writer = ConfigWriter(CONFIG_FILE, on_error=self.on_config_write_error)
+        self.config_writer.start()
+        # 設定檔外部變更以檔案事件監看 (取代每秒比對 mtime)
+        self.config_watcher = ConfigWatcher(CONFIG_FILE, self.on_config_file_changed)
+
+        self.btn_menu_items = []
+        self.speed_menu_items = []
 
-        self.last_shuttle_val = 0
-        self.shuttle_active = False
-        self.next_scroll_time = 0
-        self.last_jog_val = None
-        self.last_button_mask = 0
-        self.last_config_mtime = 0
+        # 先套用預設 Profile 並啟動背景執行緒 (只處理 HID 邏輯)，裝置越早可用越好
+        self.update_active_profile()
+        self.start()
 
-        # [新增/修改] 用於處理加速平滑過渡與啟動緩衝的屬性
-        self.target_period = 0      # 記錄目標循環時間 (秒)
-        self.is_transitioning = False # 標記是否正處於加速過渡期
+        # 訂閱前景 App 切換通知 (取代每秒輪詢)
+        self.attach_focus_provider(NSWorkspaceFocusProvider())
 
-        # [新增] 啟動緩衝相關
-        self.is_startup_pending = False  # 是否正處於「剛起步觀察期」
-        self.startup_check_time = 0      # 觀察期結束的時間點 (timestamp)
-        self.STARTUP_DELAY = 0.08        # 觀察期秒數 (對應 AHK 的 80ms)
+        self.config_watcher.start()
 
-        self.btn_menu_items = []
-        self.speed_menu_items = []
+        self.metrics = None
+        self.start_metrics_server()
 
+        self.control = None
+        self.start_control_server()
+
+        # 執行中的效能分析：選單或 kill -USR1 (CPU) / kill -USR2 (記憶體快照)
+        # 分析器 (以及 cProfile / tracemalloc) 第一次用到時才建立
+        self.cpu_profiler = None
+        self.memory_snapshots = None
+        install_signal_handlers(self.toggle_cpu_profile, self.take_memory_snapshot)
+
+    def start_metrics_server(self):
+        """本機監控端點 (127.0.0.1)，預設開啟；設定檔 "metrics_port" 指定 port，0 / false 關閉"""
+        port = self.snapshot.setting("metrics_port", True)
+        if port is False or port == 0: return
+        # http.server 只有要開監控端點時才載入
+        from shuttle_metrics import MetricsServer, DEFAULT_METRICS_PORT
+        if port is True:
+            port = DEFAULT_METRICS_PORT
+        try:
+            self.metrics = MetricsServer(self, port)
+            self.metrics.start()
+        except (OSError, TypeError, ValueError) as e:
+            log.warning("⚠️ Metrics 端點無法啟動 (port {}): {}", port, e)
+            self.metrics = None
+
+    def start_control_server(self):
+        """本機控制 socket (設定檔 "control_socket": "" 可關閉)；會改變狀態的指令轉到主執行緒執行"""
+        path = self.snapshot.setting("control_socket", None)
+        if path is not None and not path: return
+        # socket / selectors 只有要開控制 socket 時才載入
+        from shuttle_control import ControlServer, CONTROL_SOCKET
+        try:
+            self.control = ControlServer(self, path or CONTROL_SOCKET, dispatch=callAfter)
+            self.control.start()
+        except OSError as e:
+            log.warning("⚠️ 控制 socket 無法啟動: {}", e)
+            self.control = None
+
+    def run(self):
+        """[主執行緒] 載入 rumps、建立選單，進入 App 主迴圈"""
+        import rumps
+
+        init_icon = None
+        init_title = "🎛️"
+
+        # 啟動時先檢查一次 Icon 狀態
+        if os.path.exists(ICON_DISCONNECTED):
+            init_icon = ICON_DISCONNECTED
+            init_title = None
+
+        self.app = rumps.App("MacShuttle", title=init_title, icon=init_icon, quit_button=None)
         self.build_menu()
 
         # 初始 UI 更新
         self.update_icon()
+        self.update_menu_state()
 
-        # 啟動背景執行緒 (只處理 HID 邏輯)
-        self.thread = threading.Thread(target=self.run_logic_loop)
-        self.thread.daemon = True
-        self.thread.start()
+        rumps.Timer(self.watchdog, 1.0).start()
+        if self.startup_problems:
+            # osascript 對話框會阻塞，不擋住主迴圈啟動
+            threading.Thread(target=self.show_config_problems, args=(self.startup_problems,)).start()
+        self.app.run()
 
-    @rumps.timer(1.0)
     def watchdog(self, _):
         """
         [主執行緒 Watchdog]
-        負責所有週期性的 UI 更新與 App 檢查。
+        負責所有週期性的 UI 更新 (App 切換改由 NSWorkspace 通知處理，
+        設定檔變更改由 ConfigWatcher 通知)。
         替代原本在 run_logic_loop 裡的 UI 操作，避免 Crash。
         """
-        # 1. 檢查設定檔變更
-        self.check_config_file_changes()
-
-        # 2. 檢查連線狀態是否改變 -> 更新 Icon
+        # 檢查連線狀態是否改變 -> 更新 Icon
         is_connected = (self.device is not None)
         if is_connected != self.last_device_connected:
             self.last_device_connected = is_connected
             self.update_connection_ui()
             self.update_icon()
 
-        # 3. 檢查目前 App -> 更新 Menu 文字
-        new_app = self.get_active_app()
-        ignore_apps = ["System Events", "loginwindow", "Control Center", "Notification Center"]
-
-        if new_app != self.current_app and new_app not in ignore_apps:
-            self.current_app = new_app
-            self.shuttle_active = False # 切換軟體時重置滾動
-            self.update_active_profile()
-
     def update_connection_ui(self):
         """更新連線狀態的 Menu 項目 (主執行緒)"""
+        menu = self.app.menu
         if self.device:
             try:
                 prod = self.device.get_product_string()
-                self.menu["狀態: 未連接"].title = f"已連接: {prod}"
+                menu["狀態: 未連接"].title = f"已連接: {prod}"
             except:
-                self.menu["狀態: 未連接"].title = "已連接: Unknown"
+                menu["狀態: 未連接"].title = "已連接: Unknown"
         else:
-            self.menu["狀態: 未連接"].title = "狀態: 找不到裝置"
+            menu["狀態: 未連接"].title = "狀態: 找不到裝置"
 
     def update_icon(self):
         """更新 Menu Bar 圖示狀態"""
         # 注意: 這裡的邏輯只讀取狀態，不執行耗時操作
+        app = self.app
+        if app is None: return
         if not self.device:
             if os.path.exists(ICON_DISCONNECTED):
-                self.icon = ICON_DISCONNECTED
-                self.title = None
-                self.template = True
+                app.icon = ICON_DISCONNECTED
+                app.title = None
+                app.template = True
             else:
-                self.icon = None
-                self.title = "⚠️"
+                app.icon = None
+                app.title = "⚠️"
         elif not self.is_enabled:
             if os.path.exists(ICON_INACTIVE):
-                self.icon = ICON_INACTIVE
-                self.title = None
-                self.template = True
+                app.icon = ICON_INACTIVE
+                app.title = None
+                app.template = True
             else:
-                self.icon = None
-                self.title = "⚪"
+                app.icon = None
+                app.title = "⚪"
         else:
             if os.path.exists(ICON_ACTIVE):
-                self.icon = ICON_ACTIVE
-                self.title = None
-                self.template = True
+                app.icon = ICON_ACTIVE
+                app.title = None
+                app.template = True
             else:
-                self.icon = None
-                self.title = "🎛️"
+                app.icon = None
+                app.title = "🎛️"
 
     def build_menu(self):
-        self.menu.clear()
+        import rumps
+        menu = self.app.menu
+        menu.clear()
         self.btn_menu_items = []
         self.speed_menu_items = []
 
-        self.menu.add(rumps.MenuItem("狀態: 未連接", callback=None))
-        self.menu.add(rumps.MenuItem("當前 App: 未知", callback=None))
-        self.menu.add(rumps.MenuItem("使用設定: 無", callback=None))
-        self.menu.add(rumps.separator)
+        menu.add(rumps.MenuItem("狀態: 未連接", callback=None))
+        menu.add(rumps.MenuItem("當前 App: 未知", callback=None))
+        menu.add(rumps.MenuItem("使用設定: 無", callback=None))
+        menu.add(rumps.separator)
 
-        self.menu.add(rumps.MenuItem("啟用中 (Enabled)", callback=self.toggle_active, key="e"))
-        self.menu.get("啟用中 (Enabled)").state = True
+        menu.add(rumps.MenuItem("啟用中 (Enabled)", callback=self.toggle_active, key="e"))
+        menu.get("啟用中 (Enabled)").state = True
 
-        self.menu.add(rumps.separator)
+        menu.add(rumps.separator)
 
-        self.menu.add(rumps.MenuItem("設定當前 Profile 的 App...", callback=self.ui_set_apps))
+        menu.add(rumps.MenuItem("設定當前 Profile 的 App...", callback=self.ui_set_apps))
 
         btn_menu = rumps.MenuItem("按鍵設定 (Current Profile)")
         for i in range(1, 16):
             item = rumps.MenuItem(f"Button {i:02d}", callback=self.make_set_button_callback(str(i)))
             self.btn_menu_items.append(item)
             btn_menu.add(item)
-        self.menu.add(btn_menu)
+        menu.add(btn_menu)
 
         speed_menu = rumps.MenuItem("速度設定 (Current Profile)")
         for i in range(7):
             item = rumps.MenuItem(f"Level {i+1}", callback=self.make_set_speed_callback(i))
             self.speed_menu_items.append(item)
             speed_menu.add(item)
-        self.menu.add(speed_menu)
-
-        self.menu.add(rumps.separator)
-
-        self.menu.add(rumps.MenuItem("開啟設定檔 (JSON)...", callback=self.open_json_file))
-        self.menu.add(rumps.MenuItem("強制重新載入 (Reload)", callback=self.manual_reload))
-        self.menu.add(rumps.MenuItem("重新連接裝置", callback=self.trigger_reconnect))
-        self.menu.add(rumps.separator)
-        self.menu.add(rumps.MenuItem("離開 (Quit)", callback=rumps.quit_application))
+        menu.add(speed_menu)
+
+        menu.add(rumps.separator)
+
+        menu.add(rumps.MenuItem("開啟設定檔 (JSON)...", callback=self.open_json_file))
+        menu.add(rumps.MenuItem("強制重新載入 (Reload)", callback=self.manual_reload))
+        menu.add(rumps.MenuItem("重新連接裝置", callback=self.trigger_reconnect))
+        menu.add(rumps.MenuItem("輸出佇列狀態...", callback=self.show_output_stats))
+
+        trace_menu = rumps.MenuItem("延遲追蹤")
+        trace_menu.add(rumps.MenuItem("啟用延遲追蹤", callback=self.toggle_tracing))
+        trace_menu.add(rumps.MenuItem("顯示延遲統計...", callback=self.show_latency_stats))
+        trace_menu.add(rumps.MenuItem("匯出延遲紀錄...", callback=self.dump_latency_trace))
+        menu.add(trace_menu)
+        menu.add(rumps.MenuItem("錄製 HID 報告", callback=self.toggle_recording))
+
+        profile_menu = rumps.MenuItem("效能分析")
+        profile_menu.add(rumps.MenuItem("CPU 分析 (cProfile)", callback=self.toggle_cpu_profile))
+        profile_menu.add(rumps.MenuItem("記憶體快照 (與上次比較)...", callback=self.take_memory_snapshot))
+        profile_menu.add(rumps.MenuItem("停止記憶體追蹤", callback=self.stop_memory_tracking))
+        menu.add(profile_menu)
+        menu.add(rumps.MenuItem("匯出最近事件紀錄...", callback=self.dump_recent_events))
+        menu.add(rumps.separator)
+        menu.add(rumps.MenuItem("離開 (Quit)", callback=self.quit_app))
 
     def update_menu_state(self):
-        self.menu["當前 App: 未知"].title = f"當前 App: {self.current_app}"
+        # GUI 尚未建立 (啟動中) 時略過，run() 會再更新一次
+        if self.app is None: return
+        menu = self.app.menu
+        menu["當前 App: 未知"].title = f"當前 App: {self.current_app}"
 
-        if self.active_profile:
-            p_name = self.active_profile.get("name", "Unknown")
-            self.menu["使用設定: 無"].title = f"使用設定: {p_name}"
+        profile = self.active_profile
+        if profile:
+            menu["使用設定: 無"].title = f"使用設定: {profile.name}"
 
-            buttons = self.active_profile.get("buttons", {})
+            buttons = profile.button_defs
             for i, item in enumerate(self.btn_menu_items):
                 btn_id = str(i + 1)
                 key_val = buttons.get(btn_id, "")
                 item.title = f"Button {btn_id.zfill(2)}: {key_val}" if key_val else f"Button {btn_id.zfill(2)}: (無)"
 
-            speeds = self.active_profile.get("speeds", [])
-            if len(speeds) >= 7:
-                for i, item in enumerate(self.speed_menu_items):
-                    val = speeds[i]
-                    item.title = f"Level {i+1} (目前: {val}ms)"
+            for i, item in enumerate(self.speed_menu_items):
+                val = profile.speeds[i]
+                item.title = f"Level {i+1} (目前: {val}ms)"
         else:
-            self.menu["使用設定: 無"].title = "使用設定: 無 (未匹配)"
+            menu["使用設定: 無"].title = "使用設定: 無 (未匹配)"
             for i, item in enumerate(self.btn_menu_items):
                 item.title = f"Button {i+1:02d}: (無)"
             for i, item in enumerate(self.speed_menu_items):
                 item.title = f"Level {i+1}"
 
-    def update_active_profile(self):
-        if not self.config or "profiles" not in self.config:
-            self.active_profile = None
-            self.update_menu_state()
-            return
+    def on_profile_changed(self):
+        self.update_menu_state()
 
-        matched_profile = None
-        for profile in self.config["profiles"]:
-            apps = profile.get("apps", [])
-            if "*" in apps: continue
-            if any(target in self.current_app for target in apps):
-                matched_profile = profile
-                break
+    def on_config_error(self, error):
+        log.error("❌ Config Error: {}", error)
+        self.show_alert("設定檔錯誤", f"{error}\n\n已保留原本的設定。")
 
-        if not matched_profile:
-            for profile in self.config["profiles"]:
-                if "*" in profile.get("apps", []):
-                    matched_profile = profile
-                    break
+    def on_config_problems(self, problems):
+        ShuttleInputCore.on_config_problems(self, problems)
+        self.show_config_problems(problems)
 
-        if matched_profile != self.active_profile:
-            self.active_profile = matched_profile
-            self.update_menu_state()
+    def show_config_problems(self, problems):
+        self.show_alert("設定檔錯誤", "\n".join(problems) + "\n\n以上項目已停用，其餘設定照常使用。")
 
     def make_set_button_callback(self, btn_id):
         def callback(sender):
@@ -396,7 +384,7 @@ class ShuttleController(rumps.App):
         if not target_app or target_app == "Unknown":
             return None
 
-        print(f"正在為 {target_app} 建立新設定檔...")
+        log.info("正在為 {} 建立新設定檔...", target_app)
         default_speeds = list(DEFAULT_CONFIG["profiles"][-1]["speeds"])
         new_profile = {
             "name": target_app,
@@ -404,15 +392,16 @@ class ShuttleController(rumps.App):
             "speeds": default_speeds,
             "buttons": {}
         }
-        self.config["profiles"].insert(0, new_profile)
-        if save_config_safe(self.config):
-            # 重要：使用 callAfter 確保在主執行緒更新
-            callAfter(self.update_active_profile)
-            callAfter(self.show_notification, "MacShuttle", "設定檔建立成功", f"已為 {target_app} 建立設定檔")
-            return new_profile
-        else:
-            callAfter(self.show_alert, "錯誤", "無法寫入設定檔，請檢查權限。")
+        try:
+            snapshot = self.edit_config(lambda config: config["profiles"].insert(0, new_profile))
+        except ConfigError as e:
+            callAfter(self.show_alert, "錯誤", str(e))
             return None
+        saved = self.save_snapshot(snapshot)
+        # 重要：使用 callAfter 確保在主執行緒更新
+        callAfter(self.update_active_profile)
+        if saved: callAfter(self.show_notification, "MacShuttle", "設定檔建立成功", f"已為 {target_app} 建立設定檔")
+        return new_profile
 
     def ui_set_apps(self, sender):
         current_app_snapshot = self.current_app
@@ -420,30 +409,31 @@ class ShuttleController(rumps.App):
 
     def _thread_set_apps_logic(self, app_name_snapshot):
         target_profile = self.active_profile
-        is_default = False
-        if target_profile:
-            if "*" in target_profile.get("apps", []):
-                is_default = True
-
-        if not target_profile or is_default:
+        if not target_profile or target_profile.is_default:
             msg = f"應用程式: {app_name_snapshot}\n目前使用預設設定 (Default)。\n\n是否要為此 App 建立專屬設定檔？"
             if self.show_confirmation_dialog("建立新設定檔", msg):
                 self.create_new_profile_for_current_app(app_name_snapshot)
             return
 
-        current = ",".join(target_profile.get("apps", []))
+        current = ",".join(target_profile.apps)
         new_val = self.show_input_dialog(
-            title=f"設定 App ({target_profile.get('name')})",
+            title=f"設定 App ({target_profile.name})",
             message="請輸入目標 App 名稱 (以逗號分隔)",
             default_text=current
         )
 
         if new_val is not None:
             new_list = [x.strip() for x in new_val.split(",") if x.strip()]
-            target_profile["apps"] = new_list
-            if save_config_safe(self.config):
-                callAfter(self.update_active_profile)
-                callAfter(self.show_notification, "MacShuttle", "儲存成功", "App 清單已更新")
+            def mutate(profile):
+                profile["apps"] = new_list
+            try:
+                snapshot = self.edit_profile(target_profile, mutate)
+            except ConfigError as e:
+                callAfter(self.show_alert, "錯誤", str(e))
+                return
+            saved = self.save_snapshot(snapshot)
+            callAfter(self.update_active_profile)
+            if saved: callAfter(self.show_notification, "MacShuttle", "儲存成功", "App 清單已更新")
 
     def ui_set_button(self, btn_id, sender):
         current_app_snapshot = self.current_app
@@ -451,24 +441,32 @@ class ShuttleController(rumps.App):
 
     def _thread_set_button_logic(self, btn_id, sender, app_name_snapshot):
         target_profile = self.active_profile
-        is_default = False
-        if target_profile and "*" in target_profile.get("apps", []):
-            is_default = True
-
         if not target_profile: return
 
-        current = target_profile["buttons"].get(btn_id, "")
-        p_name = target_profile.get("name")
+        current = target_profile.button_defs.get(btn_id, "")
+        p_name = target_profile.name
         new_val = self.show_input_dialog(
             title=f"設定 Button {btn_id} ({p_name})",
             message=f"請輸入按鍵 (例如: q, enter, command+c)\n留空則清除功能。",
             default_text=current
         )
         if new_val is not None:
-            target_profile["buttons"][btn_id] = new_val.strip()
-            if save_config_safe(self.config):
-                callAfter(self.update_menu_state)
-                callAfter(self.show_notification, "MacShuttle", "儲存成功", f"Button {btn_id} 已更新")
+            # 按鍵名稱在儲存前就驗證，不留到按下時才失敗
+            try:
+                compile_key_action(new_val)
+            except ConfigError as e:
+                callAfter(self.show_alert, "錯誤", str(e))
+                return
+            def mutate(profile):
+                profile.setdefault("buttons", {})[btn_id] = new_val.strip()
+            try:
+                snapshot = self.edit_profile(target_profile, mutate)
+            except ConfigError as e:
+                callAfter(self.show_alert, "錯誤", str(e))
+                return
+            saved = self.save_snapshot(snapshot)
+            callAfter(self.update_active_profile)
+            if saved: callAfter(self.show_notification, "MacShuttle", "儲存成功", f"Button {btn_id} 已更新")
 
     def ui_set_speed(self, index, sender):
         current_app_snapshot = self.current_app
@@ -477,45 +475,74 @@ class ShuttleController(rumps.App):
     def _thread_set_speed_logic(self, index, sender, app_name_snapshot):
         target_profile = self.active_profile
         if not target_profile: return
-        current = str(target_profile["speeds"][index])
+        current = str(target_profile.speeds[index])
         new_val = self.show_input_dialog(
             title=f"設定速度 Level {index+1}",
-            message=f"請輸入滾動間隔 (毫秒)\n當前設定檔: {target_profile.get('name')}",
+            message=f"請輸入滾動間隔 (毫秒)\n當前設定檔: {target_profile.name}",
             default_text=current
         )
         if new_val is not None:
             try:
                 val = int(new_val.strip())
-                target_profile["speeds"][index] = val
-                if save_config_safe(self.config):
-                    callAfter(self.update_menu_state)
-                    callAfter(self.show_notification, "MacShuttle", "儲存成功", "速度已更新")
             except ValueError:
                 callAfter(self.show_alert, "錯誤", "請輸入有效的整數數字")
+                return
+            if val <= 0:
+                callAfter(self.show_alert, "錯誤", "滾動間隔必須大於 0 毫秒")
+                return
 
-    def check_config_file_changes(self):
-        """檢查設定檔是否有外部變更 (由 watchdog 呼叫)"""
-        if not os.path.exists(CONFIG_FILE): return
-        try:
-            mtime = os.stat(CONFIG_FILE).st_mtime
-            if self.last_config_mtime == 0:
-                self.last_config_mtime = mtime
+            def mutate(profile):
+                # 設定檔缺少 speeds 時以目前使用的速度表為基礎
+                speeds = profile.get("speeds")
+                if not isinstance(speeds, list) or len(speeds) < 7:
+                    speeds = profile["speeds"] = list(target_profile.speeds)
+                speeds[index] = val
+            try:
+                snapshot = self.edit_profile(target_profile, mutate)
+            except ConfigError as e:
+                callAfter(self.show_alert, "錯誤", str(e))
                 return
-            if mtime > self.last_config_mtime:
-                print("偵測到設定檔變更，正在重新載入...")
-                self.last_config_mtime = mtime
-                new_config = load_config_safe()
-                if new_config:
-                    self.config = new_config
-                    self.update_active_profile()
-                    self.show_notification("MacShuttle", "設定已重載", "JSON 檔案變更已自動套用")
-        except Exception: pass
+            saved = self.save_snapshot(snapshot)
+            callAfter(self.update_active_profile)
+            if saved: callAfter(self.show_notification, "MacShuttle", "儲存成功", "速度已更新")
+
+    def save_snapshot(self, snapshot):
+        """[背景執行緒] 排入延遲寫入；不可寫回的快照 (暫用預設設定) 只在記憶體中生效"""
+        if self.config_writer.save(snapshot):
+            return True
+        callAfter(self.show_alert, "未儲存",
+                  "設定檔無法完整載入，這次修改只在本次執行有效，不會寫回設定檔。\n請先修正設定檔後重新載入。")
+        return False
+
+    def on_config_write_error(self, error):
+        """[寫入執行緒] 延遲寫入失敗"""
+        callAfter(self.show_alert, "錯誤", "無法寫入設定檔，請檢查權限。")
+
+    def on_config_file_changed(self, text):
+        """[監看執行緒] 設定檔內容已改變 (已去抖動並比對過 hash)"""
+        callAfter(self.reload_config_text, text)
+
+    def reload_config_text(self, text):
+        """套用外部變更的設定檔內容，只重新編譯內容有變的 Profile"""
+        # 還有編輯尚未寫入時不重載，避免讀回較舊的檔案蓋掉記憶體中的設定
+        if self.config_writer.pending(): return
+        try:
+            new_config = json.loads(text)
+        except ValueError as e:
+            self.on_config_error(ConfigError(f"JSON 格式錯誤: {e}"))
+            return
+        # 自己寫入的內容 (ConfigWriter) 與目前設定相同，不需要重載
+        if new_config == self.snapshot.to_dict(): return
+        log.info("偵測到設定檔變更，正在重新載入...")
+        if self.apply_config(new_config):
+            self.apply_log_settings()
+            log.info("已重新編譯 {}/{} 個 Profile", self.snapshot.recompiled, len(self.snapshot.profiles))
+            self.show_notification("MacShuttle", "設定已重載", "JSON 檔案變更已自動套用")
 
     def manual_reload(self, sender):
         new_config = load_config_safe()
-        if new_config:
-            self.config = new_config
-            self.update_active_profile()
+        if new_config and self.apply_config(new_config):
+            self.apply_log_settings()
             self.show_notification("MacShuttle", "重載成功", "設定已更新")
 
     def open_json_file(self, sender):
@@ -524,299 +551,217 @@ class ShuttleController(rumps.App):
         subprocess.run(["open", "-e", CONFIG_FILE])
 
     def toggle_active(self, sender):
-        sender.state = not sender.state
-        self.is_enabled = not self.is_enabled
+        self.set_enabled(not self.is_enabled)
+
+    def set_enabled(self, enabled):
+        """[主執行緒] 選單或控制 socket 切換啟用，同步選單勾選與圖示"""
+        ShuttleInputCore.set_enabled(self, enabled)
+        if self.app is not None:
+            self.app.menu["啟用中 (Enabled)"].state = self.is_enabled
         self.update_icon()
-        print(f"功能開關: {self.is_enabled}")
 
-    def trigger_reconnect(self, sender):
-        """手動觸發重連 (只做標記，由背景 thread 執行)"""
-        if self.device:
-            try: self.device.close()
-            except: pass
-            self.device = None
-        # Background loop will detect self.device is None and try to reconnect
+    def show_output_stats(self, sender):
+        """顯示輸出佇列深度與等待時間，用來判斷輸出是否為瓶頸"""
+        st = self.output.stats()
+        lines = [f"佇列深度: {st['depth']} (最大 {st['max_depth']})", f"錯誤: {st['errors']}"]
+        for name in ("key", "scroll"):
+            w = st[name]
+            lines.append(f"{name}: {w['count']} 筆, 平均等待 {w['avg_ms']:.2f}ms, 最大 {w['max_ms']:.2f}ms")
+        ws = self.config_writer.stats()
+        lines.append(f"設定寫入: {ws['writes']} 次 (合併省下 {ws['coalesced']} 次, 失敗 {ws['errors']})")
+        self.show_alert("輸出佇列狀態", "\n".join(lines))
+
+    def toggle_tracing(self, sender):
+        sender.state = not sender.state
+        if sender.state:
+            self.enable_tracing()
+        else:
+            self.disable_tracing()
 
-    def get_active_app(self):
-        try:
-            app = NSWorkspace.sharedWorkspace().activeApplication()
-            return app.get('NSApplicationName', "Unknown")
-        except:
-            return "Unknown"
+    def show_latency_stats(self, sender):
+        """各階段延遲 (HID 讀取 -> 解碼 -> 排入 -> 注入開始 -> 注入完成)"""
+        if self.tracer is None:
+            self.show_alert("延遲統計", "請先啟用延遲追蹤")
+            return
+        self.show_alert("延遲統計", self.tracer.format_report())
 
-    def to_signed(self, n):
-        return n - 256 if n > 127 else n
+    def dump_latency_trace(self, sender):
+        if self.tracer is None:
+            self.show_alert("延遲統計", "請先啟用延遲追蹤")
+            return
+        try:
+            count = self.tracer.dump(TRACE_FILE)
+        except OSError as e:
+            self.show_alert("錯誤", f"無法寫入延遲紀錄: {e}")
+            return
+        self.show_notification("MacShuttle", "延遲紀錄已匯出", f"{count} 筆 -> {TRACE_FILE}")
 
-    def perform_scroll(self, direction, multiplier):
-        dy = -1 if direction > 0 else 1
-        self.mouse.scroll(0, dy * multiplier)
-
-    def perform_key(self, key_def):
-        if not key_def: return
-        print(f"   └── 執行按鍵: {key_def}")
-
-        key_code = None
-        key_lower = key_def.lower()
-        modifiers = []
-        base_key = key_lower
-
-        if "+" in key_lower:
-            parts = key_lower.split("+")
-            base_key = parts[-1]
-            if "command" in parts or "cmd" in parts: modifiers.append("command down")
-            if "shift" in parts: modifiers.append("shift down")
-            if "control" in parts or "ctrl" in parts: modifiers.append("control down")
-            if "option" in parts or "alt" in parts: modifiers.append("option down")
-
-        if base_key in MAC_KEY_CODES:
-            key_code = MAC_KEY_CODES[base_key]
-        elif key_def == Key.down or key_def == "Key.down":
-            key_code = 125
-
-        if key_code is not None:
+    def toggle_recording(self, sender):
+        """開始 / 停止把原始 HID 報告錄製成 .shtr 檔 (可用 shuttle_record.py replay 重播)"""
+        if self.recorder is None:
+            os.makedirs(RECORDINGS_DIR, exist_ok=True)
+            path = os.path.join(RECORDINGS_DIR, time.strftime("shuttle-%Y%m%d-%H%M%S.shtr"))
             try:
-                mod_str = ""
-                if modifiers:
-                    mod_str = " using {" + ", ".join(modifiers) + "}"
-                cmd = f'tell application "System Events" to key code {key_code}{mod_str}'
-                subprocess.run(["osascript", "-e", cmd], check=False)
+                self.recorder = TraceRecorder(path)
+            except OSError as e:
+                self.show_alert("錯誤", f"無法建立錄製檔: {e}")
                 return
-            except Exception: pass
-
-        try:
-            target_key = Key.down if (base_key == "down") else key_def
-            if target_key:
-                self.keyboard.press(target_key)
-                time.sleep(0.15)
-                self.keyboard.release(target_key)
-        except Exception: pass
-
-    def handle_buttons(self, data):
-        if len(data) <= BUTTON_HIGH_INDEX: return
-        try:
-            current_mask = (data[BUTTON_HIGH_INDEX] << 8) | data[BUTTON_LOW_INDEX]
-        except IndexError: return
-
-        pressed_mask = current_mask & ~self.last_button_mask
-        self.last_button_mask = current_mask
-
-        if pressed_mask == 0: return
-
-        if not self.active_profile: return
-
-        for i in range(16):
-            if (pressed_mask >> i) & 1:
-                action = self.active_profile["buttons"].get(str(i + 1))
-                if action: self.perform_key(action)
-
-    def get_period_by_speed(self, speed_val):
-        """根據速度值 (1-7) 取得設定檔中的週期時間 (秒)"""
-        # [修正] 增加安全檢查：如果 active_profile 為 None，使用預設值
-        if self.active_profile:
-            speeds = self.active_profile.get("speeds", DEFAULT_CONFIG["profiles"][-1]["speeds"])
-        else:
-            # Fallback 到預設設定 (Global)
-            speeds = DEFAULT_CONFIG["profiles"][-1]["speeds"]
-
-        idx = min(max(abs(speed_val) - 1, 0), 6)
-        return speeds[idx] / 1000.0
-
-    def execute_startup(self):
+            sender.state = True
+            log.info("⏺️ 開始錄製: {}", path)
+            return
+        recorder = self.recorder
+        self.recorder = None
+        recorder.close()
+        sender.state = False
+        self.show_notification("MacShuttle", "錄製完成", f"{recorder.count} 筆 -> {recorder.path}")
+
+    def load_profilers(self):
+        """[主執行緒] 第一次開始分析 (選單或 signal) 時建立分析器"""
+        if self.cpu_profiler is None:
+            from shuttle_profile import CpuProfiler, MemorySnapshots
+            self.cpu_profiler = CpuProfiler(self, PROFILES_DIR)
+            self.memory_snapshots = MemorySnapshots(PROFILES_DIR)
+
+    def toggle_cpu_profile(self, sender=None):
         """
-        [新增] 啟動緩衝結束後執行的函式 (對應 AHK: ExecuteStartup)
+        [主執行緒] 開始 / 停止 CPU 分析，.pstats 寫到 profiles/。
+        由 SIGUSR1 觸發時 sender 為 None，結果只用通知顯示 (不開對話框)。
         """
-        # 1. 緩衝期結束，標記解除
-        self.is_startup_pending = False
-
-        # 2. 檢查當前速度 (如果在等待期間使用者又停下來了)
-        s_val = self.last_shuttle_val
-        if s_val == 0:
+        self.load_profilers()
+        try:
+            result = self.cpu_profiler.toggle()
+        except (ProfilerError, OSError) as e:
+            log.error("❌ CPU 分析失敗: {}", e)
+            if sender is not None: self.show_alert("錯誤", f"CPU 分析失敗: {e}")
             return
-
-        # 3. 計算週期
-        final_period = self.get_period_by_speed(s_val)
-        if final_period == 0:
+        if self.app is not None:
+            self.app.menu["效能分析"]["CPU 分析 (cProfile)"].state = self.cpu_profiler.running
+        if result is None:
+            log.info("⏺️ 開始 CPU 分析")
             return
+        elapsed, paths = result
+        log.info("⏹️ CPU 分析 {:.1f} 秒: {}", elapsed, ", ".join(paths))
+        self.show_notification("MacShuttle", f"CPU 分析完成 ({elapsed:.0f} 秒)", "\n".join(paths))
 
-        # 4. 立即執行第一槍 (達成無延遲感的啟動)
-        self.perform_scroll(s_val, 2)
-
-        # 5. 設定循環 Timer 進入穩定狀態
-        self.shuttle_active = True
-        self.next_scroll_time = time.time() + final_period
-        self.is_transitioning = False # 確保不會誤判為過渡
-
-    def handle_shuttle(self, value):
-        s_val = self.to_signed(value)
-
-        # =================================================================
-        # 1. 狀態變化偵測 (對應 AHK: HandleOuterRing)
-        # =================================================================
-        if s_val != self.last_shuttle_val:
-
-            # [Step A] 歸零處理：立刻停止
-            if s_val == 0:
-                self.shuttle_active = False
-                self.is_transitioning = False
-                self.is_startup_pending = False
-                self.last_shuttle_val = s_val
-                return
-
-            # [Step B] 啟動緩衝邏輯
-
-            # 情況 1: 正在觀察期內 (例如 0->1 剛發生，尚未觸發，馬上又變成 2)
-            if self.is_startup_pending:
-                # 只更新數值，不執行動作，等待 execute_startup 抓取最新值
-                self.last_shuttle_val = s_val
-                return
-
-            # 情況 2: 從靜止啟動 (0 -> X)
-            if self.last_shuttle_val == 0:
-                self.is_startup_pending = True
-                self.startup_check_time = time.time() + self.STARTUP_DELAY
-                self.last_shuttle_val = s_val
-                return
-
-            # =================================================================
-            # 以下為「已經在轉動中」的變速邏輯 (1 -> 2 或 2 -> 1)
-            # =================================================================
-
-            # 先重置過渡狀態
-            self.is_transitioning = False
+    def take_memory_snapshot(self, sender=None):
+        """[主執行緒] tracemalloc 快照並與上一次比較 (由 SIGUSR2 觸發時 sender 為 None)"""
+        self.load_profilers()
+        try:
+            summary, report = self.memory_snapshots.take()
+        except OSError as e:
+            log.error("❌ 記憶體快照失敗: {}", e)
+            if sender is not None: self.show_alert("錯誤", f"記憶體快照失敗: {e}")
+            return
+        log.info("{}\n   └── 完整報告: {}", summary, report)
+        if sender is None:
+            self.show_notification("MacShuttle", "記憶體快照完成", report)
+        else:
+            self.show_alert("記憶體快照", f"{summary}\n\n完整報告: {report}")
 
-            new_period = self.get_period_by_speed(s_val)
-            old_period = self.get_period_by_speed(self.last_shuttle_val)
+    def stop_memory_tracking(self, sender):
+        if self.memory_snapshots is not None:
+            self.memory_snapshots.stop()
+        log.info("⏹️ 已停止記憶體追蹤")
 
-            current_abs = abs(s_val)
-            old_abs = abs(self.last_shuttle_val)
+    def dump_recent_events(self, sender):
+        """把環狀緩衝中最近的事件寫到 shuttle_events.log (含尚未寫到 stdout 的)"""
+        try:
+            count = log.dump(EVENTS_FILE, DUMP_EVENTS)
+        except OSError as e:
+            self.show_alert("錯誤", f"無法寫入事件紀錄: {e}")
+            return
+        st = log.stats()
+        lines = log.last(ALERT_EVENTS)
+        lines.append(f"\n共 {count} 筆 -> {EVENTS_FILE}")
+        lines.append(f"覆蓋遺失 {st['lost']} 筆, 取樣略過 {st['sampled_out']} 筆")
+        self.show_alert("最近事件", "\n".join(lines))
 
-            wait_delay = 0.0
+    def trigger_reconnect(self, sender):
+        """手動觸發重連 (只做標記，由背景 thread 關閉並重新連接)"""
+        # 不在主執行緒直接 close，避免與背景執行緒的阻塞讀取互相干擾
+        self.reconnect_requested = True
+        self.wake_event.set()
 
-            if current_abs > old_abs:
-                # --- 加速邏輯 ---
-                # 延遲 = 差值的一半 (避免太快暴衝)
-                wait_delay = abs(old_period - new_period) / 2.0
-            elif current_abs < old_abs:
-                # --- 減速邏輯 ---
-                # 延遲 = 兩者平均值 (填補時間空隙，模擬慣性)
-                wait_delay = (old_period + new_period) / 2.0
-            else:
-                # 穩定狀態
-                wait_delay = 0.0
-
-            # 更新記錄
-            self.last_shuttle_val = s_val
-
-            # [Step C] 執行過渡 Timer 設定
-            now = time.time()
-            # 人類感知閾值 (約 40ms = 0.04s)
-            if wait_delay < 0.04:
-                # 立即執行一次滾動
-                self.perform_scroll(s_val, 2)
-                # 設定下一次觸發時間為標準週期
-                self.next_scroll_time = now + new_period
-                self.shuttle_active = True
-            else:
-                # 設定過渡期
-                self.is_transitioning = True
-                self.target_period = new_period
-                self.next_scroll_time = now + wait_delay
-                self.shuttle_active = True
-
-        # =================================================================
-        # 2. 持續滾動檢查 (對應 AHK: AutoScroll Timer)
-        # =================================================================
-        elif self.shuttle_active:
-            # 注意：如果在 Startup Pending 期間，shuttle_active 會是 False，不會進來這裡
-            now = time.time()
-            if now >= self.next_scroll_time:
-                # 執行滾動
-                self.perform_scroll(s_val, 2)
-
-                # [新增] 如果剛剛是執行「過渡的一次性 Timer」
-                # 執行完這次動作後，立刻將 Timer 設回目標的穩定循環週期
-                if self.is_transitioning:
-                    self.next_scroll_time = now + self.target_period
-                    self.is_transitioning = False
-                else:
-                    # 穩定狀態，使用當前速度的週期
-                    current_period = self.get_period_by_speed(s_val)
-                    self.next_scroll_time = now + current_period
-
-    def handle_jog(self, current_val):
-        if self.last_jog_val is None:
-            self.last_jog_val = current_val
+    def perform_scroll(self, direction, multiplier):
+        """[HID 執行緒] 排入一個滾動 tick"""
+        dy = -1 if direction > 0 else 1
+        self.output.submit(PRIORITY_SCROLL, self._scroll, dy * multiplier, self.trace_dispatch(TRACE_SCROLL))
+
+    def _scroll(self, dy, trace=None):
+        """[輸出執行緒] 送出滾動 (第一次才載入 pynput)"""
+        if trace is not None: self.trace_mark(trace, STAGE_INJECT_START)
+        if self.mouse is None:
+            from pynput.mouse import Controller as MouseController
+            self.mouse = MouseController()
+        self.mouse.scroll(0, dy)
+        if trace is not None: self.trace_mark(trace, STAGE_INJECT_END)
+
+    def perform_action(self, action):
+        """[HID 執行緒] 排入按鍵動作，優先於滾動執行"""
+        log.info("   └── 執行按鍵: {}", action.key_def)
+        self.output.submit(PRIORITY_KEY, self._inject_action, action, self.trace_dispatch(TRACE_KEY))
+
+    def _inject_action(self, action, trace=None):
+        """[輸出執行緒] 送出按鍵，啟用追蹤時記錄注入開始 / 結束"""
+        if trace is None:
+            self._send_action(action)
             return
+        self.trace_mark(trace, STAGE_INJECT_START)
+        self._send_action(action)
+        self.trace_mark(trace, STAGE_INJECT_END)
 
-        diff = current_val - self.last_jog_val
-        if diff > 127: diff -= 256
-        elif diff < -127: diff += 256
-        self.last_jog_val = current_val
-
-        if diff == 0: return
+    def _send_action(self, action):
+        """[輸出執行緒] 實際送出已編譯的按鍵動作 (KeyAction)"""
+        if action.key_code is not None:
+            try:
+                self.key_sink.send_key(action.key_code, action.modifiers)
+                self.key_injections += 1
+                return
+            except Exception:
+                self.injection_failures += 1
+
+        if self.keyboard is None:
+            from pynput.keyboard import Controller as KeyboardController
+            self.keyboard = KeyboardController()
+        if action.key_code == 125:
+            from pynput.keyboard import Key
+            target_key = Key.down
+        else:
+            target_key = action.char
+        if target_key:
+            try:
+                self.keyboard.press(target_key)
+            except Exception:
+                self.injection_failures += 1
+                raise
+            self.key_injections += 1
+            # 放開改為排程，不佔用輸出執行緒 sleep
+            self.output.submit_later(0.15, PRIORITY_KEY, self.keyboard.release, target_key)
+
+    def quit_app(self, sender):
+        self.stop()
+        if self.focus: self.focus.stop()
+        self.output.stop()
+        self.key_sink.close()
+        self.config_writer.stop()  # 寫入尚未存檔的編輯
+        self.config_watcher.stop()
+        if self.metrics: self.metrics.stop()
+        if self.control: self.control.stop()
+        if self.recorder: self.recorder.close()
+        if self.cpu_profiler is not None and self.cpu_profiler.running:
+            try:
+                self.cpu_profiler.stop()
+            except (ProfilerError, OSError):
+                pass
+        log.close()
+        import rumps
+        rumps.quit_application()
 
-        direction = 1 if diff > 0 else -1
-        steps = abs(diff)
-        for _ in range(steps):
-            self.perform_scroll(direction, 3)
 
-    def _connect_hid_backend(self):
-        """[背景執行緒] 嘗試連接 HID 裝置"""
-        try:
-            self.device = hid.device()
-            self.device.open(VID, PID)
-            self.device.set_nonblocking(1)
-            print(f"✅ HID 裝置已連接")
-        except IOError:
-            self.device = None
-
-    def run_logic_loop(self):
-        """
-        [背景執行緒] 主邏輯迴圈
-        """
-        while self.is_running:
-            if not self.is_enabled:
-                time.sleep(1)
-                continue
-
-            # 裝置連線邏輯
-            if not self.device:
-                self._connect_hid_backend()
-                if not self.device:
-                    time.sleep(2.0)
-                    continue
+def main():
+    app = ShuttleController()
+    app.run()
 
-            try:
-                # [新增] 檢查啟動緩衝 Timer 是否到期
-                if self.is_startup_pending:
-                    if time.time() >= self.startup_check_time:
-                        self.execute_startup()
-
-                # 讀取 HID
-                data = self.device.read(64)
-                if data:
-                    self.handle_buttons(data)
-                    if len(data) > SHUTTLE_INDEX:
-                        self.handle_shuttle(data[SHUTTLE_INDEX])
-                    if len(data) > JOG_INDEX:
-                        self.handle_jog(data[JOG_INDEX])
-
-                # 如果處於滾動狀態，即使沒有新數據也要持續呼叫 handle_shuttle
-                # 以便觸發 AutoScroll 的時間檢查邏輯
-                # 注意：如果正在 startup pending，shuttle_active 為 False，這行不會執行，這是正確的
-                if self.shuttle_active:
-                    self.handle_shuttle(self.last_shuttle_val)
-
-            except Exception as e:
-                print(f"Read Error: {e}")
-                try: self.device.close()
-                except: pass
-                self.device = None
-                time.sleep(1)
-                continue
-
-            time.sleep(0.005)
 
 if __name__ == "__main__":
-    app = ShuttleController()
-    app.run()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,396 @@
+"""
+設定檔編譯
+載入 / 修改設定時把整份 JSON 編譯成不可變的 ConfigSnapshot：
+每個 Profile 的按鍵定義編譯成 16 格的動作表，App 名稱比對編譯成 ProfileMatcher。
+編輯時建立新快照再整個替換，HID 執行緒讀取時不需要上鎖；
+內容沒變的 Profile 直接沿用上一個快照的物件，不重新編譯。
+"""
+import copy
+from functools import lru_cache
+from types import MappingProxyType
+
+from shuttle_inject import parse_key_def
+from shuttle_engine import DEFAULT_SPEEDS
+from shuttle_jog import JogCurve
+
+BUTTON_SLOTS = 16
+
+# Jog 每一格的滾動量 (Profile 可用 "jog_multiplier" 覆寫)
+DEFAULT_JOG_MULTIPLIER = 3
+
+
+class ConfigError(ValueError):
+    """設定內容無效 (例如無法辨識的按鍵名稱)"""
+
+
+class KeyAction:
+    """已編譯好的按鍵動作"""
+    __slots__ = ("key_def", "key_code", "modifiers", "char")
+
+    def __init__(self, key_def, key_code, modifiers=(), char=None):
+        self.key_def = key_def      # 原始設定字串 (顯示 / log 用)
+        self.key_code = key_code    # Mac Key Code，None 代表改用 pynput 輸入 char
+        self.modifiers = modifiers  # ("command", "shift", ...)
+        self.char = char
+
+    def __repr__(self):
+        return f"KeyAction({self.key_def!r})"
+
+
+def compile_key_action(key_def):
+    """
+    "command+t" -> KeyAction；空字串回傳 None。
+    無法辨識的按鍵名稱丟出 ConfigError。
+    """
+    key_def = key_def.strip() if isinstance(key_def, str) else key_def
+    if not key_def:
+        return None
+    if not isinstance(key_def, str):
+        raise ConfigError(f"按鍵設定必須是字串: {key_def!r}")
+
+    parsed = parse_key_def(key_def)
+    if parsed is not None:
+        key_code, modifiers = parsed
+        return KeyAction(key_def, key_code, modifiers)
+
+    # 不在 Key Code 表內的單一字元 (例如 "!")，交給 pynput 直接輸入
+    if len(key_def) == 1:
+        return KeyAction(key_def, None, (), key_def)
+
+    raise ConfigError(f"無法辨識的按鍵: {key_def}")
+
+
+def report_error(message, errors):
+    """errors 為 None 時丟出 ConfigError；否則記下訊息，由呼叫端停用該項目後繼續編譯"""
+    if errors is None:
+        raise ConfigError(message)
+    errors.append(message)
+
+
+def compile_buttons(buttons, errors=None):
+    """
+    {"1": "q", ...} -> 16 格動作表 (index 0 = Button 1)
+    有 errors 時無效的按鈕只停用該格 (None)，其餘照常編譯
+    """
+    table = [None] * BUTTON_SLOTS
+    for btn_id, key_def in (buttons or {}).items():
+        try:
+            slot = int(btn_id) - 1
+        except (TypeError, ValueError):
+            report_error(f"無效的按鈕編號: {btn_id}", errors)
+            continue
+        if not 0 <= slot < BUTTON_SLOTS:
+            report_error(f"按鈕編號超出範圍 (1-{BUTTON_SLOTS}): {btn_id}", errors)
+            continue
+        try:
+            table[slot] = compile_key_action(key_def)
+        except ConfigError as e:
+            report_error(f"Button {btn_id}: {e}", errors)
+    return tuple(table)
+
+
+# ================= Profile 比對 =================
+
+class _SubstringAutomaton:
+    """Aho-Corasick 多模式子字串比對，回傳命中的最小 Profile index"""
+
+    def __init__(self, patterns):
+        # patterns: [(pattern, profile_index)]
+        self.goto = [{}]
+        self.fail = [0]
+        self.best = [None]  # 該節點 (含 fail 鏈) 命中的最小 index
+
+        for pattern, index in patterns:
+            node = 0
+            for ch in pattern:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.best.append(None)
+                node = nxt
+            if self.best[node] is None or index < self.best[node]:
+                self.best[node] = index
+
+        # BFS 建立 fail link，並沿 fail 鏈合併命中結果
+        queue = list(self.goto[0].values())
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(ch, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                inherited = self.best[self.fail[nxt]]
+                if inherited is not None and (self.best[nxt] is None or inherited < self.best[nxt]):
+                    self.best[nxt] = inherited
+
+    def search(self, text):
+        goto, fail, best = self.goto, self.fail, self.best
+        node = 0
+        result = None
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            hit = best[node]
+            if hit is not None and (result is None or hit < result):
+                result = hit
+                if result == 0: break
+        return result
+
+
+class ProfileMatcher:
+    """
+    設定載入時編譯的 App -> Profile 比對器，優先順序：
+    1. App 名稱與某個 apps 項目完全相同 (hash 查詢)
+    2. apps 項目為 App 名稱的子字串 (單一 Aho-Corasick automaton)
+    3. apps 含 "*" 的預設 Profile
+    同一層內以 profiles 陣列中較前面的為優先。結果以 LRU cache 保存，
+    設定重載時會建立新的 matcher，cache 也隨之失效。
+    """
+
+    def __init__(self, config, cache_size=256):
+        self.exact = {}
+        self.wildcard = None
+        patterns = []
+        for index, profile in enumerate(config.get("profiles", [])):
+            apps = profile.get("apps", [])
+            # 預設 Profile 只作為最後的備援，其餘項目不參與比對
+            if "*" in apps:
+                if self.wildcard is None:
+                    self.wildcard = index
+                continue
+            for target in apps:
+                if not target:
+                    continue
+                self.exact.setdefault(target, index)
+                patterns.append((target, index))
+        self.automaton = _SubstringAutomaton(patterns)
+        self.match = lru_cache(maxsize=cache_size)(self._match)
+
+    def _match(self, app_name):
+        """回傳符合的 Profile index，沒有則回傳 None"""
+        index = self.exact.get(app_name)
+        if index is not None:
+            return index
+        index = self.automaton.search(app_name)
+        if index is not None:
+            return index
+        return self.wildcard
+
+
+# ================= 不可變快照 =================
+
+def _freeze_error(self, name, value):
+    raise AttributeError(f"{type(self).__name__} 為唯讀，請建立新的快照")
+
+
+class Profile:
+    """
+    已編譯的 Profile，建立後所有欄位皆不可修改。
+    strict=False 時無效的按鈕 / 速度 / Jog 設定只停用該項 (改用預設值)，訊息記在 errors；
+    原始內容仍保留在 _raw，寫回設定檔時不會遺失。apps 無效時一律丟出 ConfigError。
+    """
+    __slots__ = ("name", "apps", "speeds", "buttons", "button_defs",
+                 "jog_multiplier", "jog_max_rate", "jog_curve", "is_default", "errors", "_raw")
+
+    __setattr__ = _freeze_error
+
+    def __init__(self, raw, strict=True):
+        init = object.__setattr__
+        name = raw.get("name", "Unknown")
+        apps = raw.get("apps", [])
+        if not isinstance(apps, list) or not all(isinstance(a, str) for a in apps):
+            raise ConfigError(f"[{name}] apps 必須是字串陣列")
+
+        problems = None if strict else []
+
+        def invalid(message):
+            report_error(f"[{name}] {message}", problems)
+
+        speeds = raw.get("speeds")
+        if isinstance(speeds, list) and len(speeds) >= 7:
+            try:
+                speeds = tuple(int(v) for v in speeds[:7])
+            except (TypeError, ValueError):
+                invalid("speeds 必須是整數 (毫秒)")
+                speeds = tuple(DEFAULT_SPEEDS)
+            if any(v <= 0 for v in speeds):
+                invalid("speeds 必須大於 0 (毫秒)")
+                speeds = tuple(DEFAULT_SPEEDS)
+        else:
+            speeds = tuple(DEFAULT_SPEEDS)
+
+        buttons = raw.get("buttons", {}) or {}
+        if not isinstance(buttons, dict):
+            invalid("buttons 必須是物件")
+            buttons = {}
+        button_errors = None if strict else []
+        try:
+            table = compile_buttons(buttons, button_errors)
+        except ConfigError as e:
+            raise ConfigError(f"[{name}] {e}")
+        for message in button_errors or ():
+            invalid(message)
+
+        try:
+            jog_multiplier = int(raw.get("jog_multiplier", DEFAULT_JOG_MULTIPLIER))
+            jog_max_rate = float(raw.get("jog_max_rate", 0))
+        except (TypeError, ValueError):
+            invalid("jog_multiplier / jog_max_rate 必須是數字")
+            jog_multiplier, jog_max_rate = DEFAULT_JOG_MULTIPLIER, 0.0
+        if jog_multiplier <= 0:
+            invalid("jog_multiplier 必須大於 0")
+            jog_multiplier = DEFAULT_JOG_MULTIPLIER
+        if not 0 <= jog_max_rate < float("inf"):
+            # 0 = 不限制
+            invalid("jog_max_rate 不可為負 (0 代表不限制)")
+            jog_max_rate = 0.0
+
+        # Jog 速度感應加速 (shuttle_jog)，沒有設定時維持固定的 jog_multiplier
+        acceleration = raw.get("jog_acceleration")
+        jog_curve = None
+        if acceleration:
+            if not isinstance(acceleration, dict):
+                invalid("jog_acceleration 必須是物件")
+            else:
+                try:
+                    jog_curve = JogCurve(acceleration)
+                except (TypeError, ValueError) as e:
+                    invalid(f"jog_acceleration: {e}")
+
+        init(self, "name", name)
+        init(self, "apps", tuple(apps))
+        init(self, "speeds", speeds)
+        init(self, "buttons", table)
+        init(self, "button_defs", MappingProxyType({str(k): v for k, v in buttons.items()}))
+        init(self, "jog_multiplier", jog_multiplier)
+        init(self, "jog_max_rate", jog_max_rate)
+        init(self, "jog_curve", jog_curve)
+        init(self, "is_default", "*" in apps)
+        init(self, "errors", tuple(problems or ()))
+        init(self, "_raw", copy.deepcopy(raw))
+
+    def to_dict(self):
+        """回傳可寫回 JSON 的 dict (複本，修改不影響此 Profile)"""
+        return copy.deepcopy(self._raw)
+
+    def __repr__(self):
+        return f"Profile({self.name!r})"
+
+
+class ConfigSnapshot:
+    """整份設定的不可變快照 (Profile 列表 + App 比對器)"""
+    __slots__ = ("profiles", "matcher", "version", "recompiled", "errors", "persistable", "_extra")
+
+    __setattr__ = _freeze_error
+
+    def __init__(self, profiles, matcher, version=0, extra=None, recompiled=None, errors=(),
+                 persistable=True):
+        init = object.__setattr__
+        init(self, "profiles", tuple(profiles))
+        init(self, "matcher", matcher)
+        init(self, "version", version)
+        # 建立此快照時重新編譯的 Profile 數 (其餘沿用上一個快照)
+        init(self, "recompiled", len(self.profiles) if recompiled is None else recompiled)
+        # 寬鬆編譯時被停用 / 略過的項目 (訊息)
+        init(self, "errors", tuple(errors))
+        # False 代表內容不是使用者的設定檔 (例如讀取失敗改用預設值、略過了整個 Profile)，
+        # ConfigWriter 不會把它寫回檔案
+        init(self, "persistable", persistable)
+        init(self, "_extra", copy.deepcopy(extra or {}))
+
+    def resolve(self, app_name):
+        """App 名稱 -> Profile (沒有符合且無預設 Profile 時回傳 None)"""
+        index = self.matcher.match(app_name)
+        return self.profiles[index] if index is not None else None
+
+    def find(self, name):
+        """依名稱取得 Profile (找不到回傳 None)"""
+        for p in self.profiles:
+            if p.name == name:
+                return p
+        return None
+
+    def index_of(self, profile):
+        """找出 profile 在此快照中的位置 (先比對物件本身，再比對名稱)"""
+        for i, p in enumerate(self.profiles):
+            if p is profile:
+                return i
+        for i, p in enumerate(self.profiles):
+            if p.name == profile.name:
+                return i
+        return None
+
+    def setting(self, key, default=None):
+        """設定檔最外層 (profiles 以外) 的設定值"""
+        return self._extra.get(key, default)
+
+    def to_dict(self):
+        config = copy.deepcopy(self._extra)
+        config["profiles"] = [p.to_dict() for p in self.profiles]
+        return config
+
+
+def compile_config(config, version=0, previous=None, strict=True, persistable=True):
+    """
+    JSON dict -> ConfigSnapshot，內容無效時丟出 ConfigError。
+    strict=False 時只停用無效的項目 (按鈕、速度...)，無法編譯的 Profile 整個略過
+    (此時快照不可寫回檔案)，訊息記在 snapshot.errors；最外層結構錯誤仍丟出 ConfigError。
+    有 previous 快照時，內容完全相同的 Profile 沿用原物件；
+    所有 apps 都沒變時也沿用原本的 matcher (連同 LRU cache)。
+    """
+    if not isinstance(config, dict):
+        raise ConfigError("設定檔最外層必須是物件")
+    raw_profiles = config.get("profiles", [])
+    if not isinstance(raw_profiles, list):
+        raise ConfigError("profiles 必須是陣列")
+
+    reusable = {}
+    if previous is not None:
+        for p in previous.profiles:
+            reusable.setdefault(p.name, []).append(p)
+
+    profiles = []
+    compiled_raw = []
+    errors = []
+    recompiled = 0
+    for raw in raw_profiles:
+        if not isinstance(raw, dict):
+            if strict:
+                raise ConfigError("profiles 的每一項必須是物件")
+            errors.append("profiles 的每一項必須是物件 (已略過)")
+            persistable = False
+            continue
+        candidates = reusable.get(raw.get("name", "Unknown"), ())
+        for i, p in enumerate(candidates):
+            if p._raw == raw:
+                profile = candidates.pop(i)
+                break
+        else:
+            try:
+                profile = Profile(raw, strict)
+            except ConfigError as e:
+                if strict:
+                    raise
+                errors.append(f"{e} (已略過此 Profile)")
+                persistable = False
+                continue
+            recompiled += 1
+        profiles.append(profile)
+        compiled_raw.append(raw)
+        errors.extend(profile.errors)
+
+    if previous is not None and [p.apps for p in profiles] == [p.apps for p in previous.profiles]:
+        matcher = previous.matcher
+    else:
+        matcher = ProfileMatcher({"profiles": compiled_raw})
+    extra = {k: v for k, v in config.items() if k != "profiles"}
+    return ConfigSnapshot(profiles, matcher, version, extra, recompiled, errors, persistable)
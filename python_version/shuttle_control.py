@@ -0,0 +1,370 @@
+"""
+本機控制 socket
+Unix socket 上一行一個 JSON 請求 / 回應，讓腳本不必點選單就能控制執行中的 MacShuttle：
+  {"cmd": "status"}                               目前 App、Profile、Shuttle 段數、啟用狀態與計數
+  {"cmd": "profile", "name": "Chrome / Browser"}  強制使用 Profile ("name": null 回到依前景 App 切換)
+  {"cmd": "enable"} / {"cmd": "disable"} / {"cmd": "toggle"}
+  {"cmd": "press", "buttons": [1, 13]}            虛擬按鍵 (依目前 Profile 執行)
+  {"cmd": "ping"}
+回應 {"ok": true, ...} 或 {"ok": false, "error": "..."}；請求帶 "id" 時原樣帶回。
+
+status / ping 在 socket 執行緒直接讀取核心屬性；會改變狀態的指令透過 dispatch 排入
+控制器的工作佇列 (選單列 App 為 callAfter，daemon 為 call_soon)，執行完才回應。
+兩者都不經過 HID 執行緒，也不等待 HID 讀取。
+
+命令列: python shuttle_control.py status | profile [NAME] | enable | disable | toggle | press N [N ...]
+"""
+import json
+import os
+import selectors
+import socket
+import stat
+import sys
+import threading
+
+from shuttle_config import ConfigError
+from shuttle_log import log
+
+CONTROL_SOCKET = f"/tmp/macshuttle-{os.getuid()}.sock"
+
+# 排入控制器的指令等待執行完成的上限 (秒)
+COMMAND_TIMEOUT = 1.0
+# 單一請求行的長度上限 (bytes)
+MAX_LINE = 65536
+
+BUTTON_COUNT = 15
+
+
+class ControlError(Exception):
+    """請求格式錯誤或指令無法執行 (訊息會回傳給 client)"""
+
+
+class _Connection:
+    """一條連線的讀取緩衝與尚未送出的回應"""
+    __slots__ = ("inbuf", "outbuf")
+
+    def __init__(self):
+        self.inbuf = bytearray()
+        self.outbuf = bytearray()
+
+
+class ControlServer:
+    """
+    單一背景執行緒以 selectors 處理所有連線，請求依收到順序逐一執行。
+    回應以非阻塞方式寫出，client 不讀回應時先暫停讀它的請求，不會卡住其他連線。
+    dispatch(func) 把 func 交給控制器的執行緒；None 代表直接在 socket 執行緒執行。
+    """
+
+    def __init__(self, core, path=CONTROL_SOCKET, dispatch=None, timeout=COMMAND_TIMEOUT):
+        self.core = core
+        self.path = path
+        self.dispatch = dispatch
+        self.timeout = timeout
+        self._listener = None
+        self._wake_r = self._wake_w = None
+        self._running = False
+        self._thread = None
+
+        self.requests = 0
+        self.errors = 0
+        self.connections = 0
+
+        self.commands = {
+            "ping": self.cmd_ping,
+            "status": self.cmd_status,
+            "profile": self.cmd_profile,
+            "enable": self.cmd_enable,
+            "disable": self.cmd_disable,
+            "toggle": self.cmd_toggle,
+            "press": self.cmd_press,
+        }
+
+    # --- 生命週期 ---
+
+    def start(self):
+        """建立只有自己可連線的 socket 並啟動背景執行緒；已有其他行程在使用時丟出 OSError"""
+        self._remove_stale()
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # listen() 之前無法連線，先 chmod 再 listen 就沒有其他使用者可連線的空檔
+        # (不改 umask：umask 是整個行程共用的，會影響其他執行緒建立的檔案)
+        try:
+            listener.bind(self.path)
+            os.chmod(self.path, 0o600)
+            listener.listen(8)
+        except OSError:
+            listener.close()
+            raise
+        listener.setblocking(False)
+        self._listener = listener
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="ControlServer")
+        self._thread.daemon = True
+        self._thread.start()
+        log.info("🔌 控制 socket: {}", self.path)
+
+    def stop(self):
+        if not self._running: return
+        self._running = False
+        try: self._wake_w.send(b"x")
+        except OSError: pass
+        self._thread.join(timeout=1.0)
+        try: os.remove(self.path)
+        except OSError: pass
+
+    def stats(self):
+        return {"requests": self.requests, "errors": self.errors, "connections": self.connections}
+
+    def _remove_stale(self):
+        """上次沒有正常結束留下的 socket 檔：是自己的 socket 且連不上才刪除"""
+        try:
+            st = os.lstat(self.path)
+        except FileNotFoundError:
+            return
+        if not stat.S_ISSOCK(st.st_mode) or st.st_uid != os.getuid():
+            # 別人放的檔案 (或 symlink) 不刪除，避免被誘導刪掉其他檔案
+            raise OSError(f"控制 socket 路徑已被其他檔案佔用: {self.path}")
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.path)
+        except OSError:
+            os.remove(self.path)
+            return
+        finally:
+            probe.close()
+        raise OSError(f"控制 socket 已被其他行程使用: {self.path}")
+
+    # --- 背景執行緒 ---
+
+    def _run(self):
+        sel = selectors.DefaultSelector()
+        sel.register(self._listener, selectors.EVENT_READ)
+        sel.register(self._wake_r, selectors.EVENT_READ)
+        try:
+            while self._running:
+                for key, mask in sel.select():
+                    sock = key.fileobj
+                    if sock is self._listener:
+                        self._accept(sel)
+                    elif sock is self._wake_r:
+                        self._wake_r.recv(64)
+                    elif mask & selectors.EVENT_WRITE:
+                        self._flush(sel, sock, key.data)
+                    else:
+                        self._serve(sel, sock, key.data)
+        finally:
+            for key in list(sel.get_map().values()):
+                key.fileobj.close()
+            sel.close()
+            self._wake_w.close()
+
+    def _accept(self, sel):
+        try:
+            conn, _ = self._listener.accept()
+        except BlockingIOError:
+            return
+        conn.setblocking(False)
+        self.connections += 1
+        sel.register(conn, selectors.EVENT_READ, _Connection())
+
+    def _close(self, sel, conn):
+        sel.unregister(conn)
+        conn.close()
+
+    def _serve(self, sel, conn, state):
+        try:
+            chunk = conn.recv(MAX_LINE)
+        except BlockingIOError:
+            return
+        except OSError:
+            chunk = b""
+        if not chunk:
+            self._close(sel, conn)
+            return
+        buf = state.inbuf
+        buf += chunk
+        replies = []
+        while True:
+            end = buf.find(b"\n")
+            if end < 0: break
+            line = bytes(buf[:end])
+            del buf[:end + 1]
+            if line.strip():
+                replies.append(self.handle_line(line))
+        if len(buf) > MAX_LINE:
+            replies.append(self._encode({"ok": False, "error": "請求過長"}))
+            buf.clear()
+        if not replies: return
+        state.outbuf += b"".join(replies)
+        self._flush(sel, conn, state)
+
+    def _flush(self, sel, conn, state):
+        """送出能送的回應；送不完時改等可寫入，送完之前不再讀這條連線的請求"""
+        out = state.outbuf
+        try:
+            sent = conn.send(out)
+        except BlockingIOError:
+            sent = 0
+        except OSError:
+            # client 已離開
+            self._close(sel, conn)
+            return
+        del out[:sent]
+        sel.modify(conn, selectors.EVENT_WRITE if out else selectors.EVENT_READ, state)
+
+    # --- 請求處理 ---
+
+    def handle_line(self, line):
+        """一行 JSON 請求 -> 一行 JSON 回應 (bytes，含換行)"""
+        self.requests += 1
+        request_id = None
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                raise ControlError(f"JSON 格式錯誤: {e}")
+            if not isinstance(request, dict):
+                raise ControlError("請求必須是 JSON 物件")
+            request_id = request.get("id")
+            handler = self.commands.get(request.get("cmd"))
+            if handler is None:
+                raise ControlError(f"未知的指令: {request.get('cmd')!r}")
+            reply = handler(request)
+            reply["ok"] = True
+        except (ControlError, ConfigError) as e:
+            self.errors += 1
+            reply = {"ok": False, "error": str(e)}
+        except Exception as e:
+            self.errors += 1
+            log.error("Control error: {}", e)
+            reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        if request_id is not None:
+            reply["id"] = request_id
+        return self._encode(reply)
+
+    def _encode(self, reply):
+        return (json.dumps(reply, ensure_ascii=False) + "\n").encode("utf-8")
+
+    def call(self, func, *args):
+        """在控制器的執行緒執行 func 並等待結果 (例外會轉到 socket 執行緒丟出)"""
+        if self.dispatch is None:
+            return func(*args)
+        done = threading.Event()
+        box = {}
+
+        def run():
+            try:
+                box["result"] = func(*args)
+            except Exception as e:
+                box["error"] = e
+            finally:
+                done.set()
+
+        self.dispatch(run)
+        if not done.wait(self.timeout):
+            raise ControlError("控制器沒有回應")
+        if "error" in box:
+            raise box["error"]
+        return box.get("result")
+
+    # --- 指令 ---
+
+    def cmd_ping(self, request):
+        return {}
+
+    def cmd_status(self, request):
+        return self.core.status()
+
+    def cmd_profile(self, request):
+        name = request.get("name")
+        if name is not None and not isinstance(name, str):
+            raise ControlError("name 必須是字串或 null")
+        self.call(self.core.force_profile, name)
+        return self.core.status()
+
+    def cmd_enable(self, request):
+        self.call(self.core.set_enabled, True)
+        return {"enabled": self.core.is_enabled}
+
+    def cmd_disable(self, request):
+        self.call(self.core.set_enabled, False)
+        return {"enabled": self.core.is_enabled}
+
+    def cmd_toggle(self, request):
+        self.call(lambda: self.core.set_enabled(not self.core.is_enabled))
+        return {"enabled": self.core.is_enabled}
+
+    def cmd_press(self, request):
+        buttons = request.get("buttons")
+        if buttons is None and "button" in request:
+            buttons = [request["button"]]
+        if not isinstance(buttons, list) or not buttons:
+            raise ControlError("buttons 必須是非空的按鍵編號列表")
+        mask = 0
+        for button in buttons:
+            # JSON 的 true / false 在 Python 是 int 的子類別，不可當成按鍵 1 / 0
+            if isinstance(button, bool) or not isinstance(button, int) or not 1 <= button <= BUTTON_COUNT:
+                raise ControlError(f"按鍵編號必須是 1-{BUTTON_COUNT}: {button!r}")
+            mask |= 1 << (button - 1)
+        if not self.core.is_enabled:
+            raise ControlError("目前為停用狀態")
+        self.call(self.core.press_buttons, mask)
+        return {"pressed": sorted(set(buttons))}
+
+
+class ControlClient:
+    """同步 client (一條連線，可重複送出請求)"""
+
+    def __init__(self, path=CONTROL_SOCKET, timeout=2.0):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(path)
+        self._reader = self.sock.makefile("rb")
+
+    def request(self, cmd, **fields):
+        fields["cmd"] = cmd
+        self.sock.sendall((json.dumps(fields) + "\n").encode("utf-8"))
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("控制 socket 已關閉")
+        return json.loads(line)
+
+    def close(self):
+        self._reader.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print(__doc__.strip().splitlines()[-1])
+        return 2
+    path = os.environ.get("MACSHUTTLE_SOCKET", CONTROL_SOCKET)
+    cmd, args = argv[0], argv[1:]
+    fields = {}
+    if cmd == "profile":
+        fields["name"] = " ".join(args) or None
+    elif cmd == "press":
+        try:
+            fields["buttons"] = [int(a) for a in args]
+        except ValueError:
+            print("按鍵編號必須是整數")
+            return 2
+    try:
+        with ControlClient(path) as client:
+            reply = client.request(cmd, **fields)
+    except OSError as e:
+        print(f"❌ 無法連線到 {path}: {e}")
+        return 1
+    print(json.dumps(reply, ensure_ascii=False, indent=2))
+    return 0 if reply.get("ok") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,249 +1,286 @@
-import hid
-import time
-import subprocess  # 用於執行 AppleScript
-from pynput.mouse import Controller as MouseController
-from pynput.keyboard import Controller as KeyboardController, Key
-from AppKit import NSWorkspace
-
-# ================= 硬體設定區 =================
-
-VID = 0x0b33
-PID = 0x0030
-
-# Byte 索引 (根據先前的診斷結果)
-SHUTTLE_INDEX = 0
-JOG_INDEX = 1
-
-# 預設按鍵位置
-BUTTON_LOW_INDEX = 3   # 控制按鍵 1-8
-BUTTON_HIGH_INDEX = 4  # 控制按鍵 9-15
-
-# ================= 使用者設定區 =================
-
-# 轉盤速度映射 (單位: 秒)
-SPEED_MAP = {
-    1: 0.8, 2: 0.6, 3: 0.333, 4: 0.2, 5: 0.1, 6: 0.05, 7: 0.02
-}
-
-# Mac 硬體鍵碼表 (Key Code) - 用於模擬最底層的按鍵訊號，解決 RDP 不吃字元的問題
-MAC_KEY_CODES = {
-    "a": 0, "s": 1, "d": 2, "f": 3, "h": 4, "g": 5, "z": 6, "x": 7, "c": 8, "v": 9,
-    "b": 11, "q": 12, "w": 13, "e": 14, "r": 15, "y": 16, "t": 17, "1": 18, "2": 19,
-    "3": 20, "4": 21, "6": 22, "5": 23, "=": 24, "9": 25, "7": 26, "-": 27, "8": 28,
-    "0": 29, "]": 30, "o": 31, "u": 32, "[": 33, "i": 34, "p": 35, "l": 37, "j": 38,
-    "'": 39, "k": 40, ";": 41, "\\": 42, ",": 43, "/": 44, "n": 45, "m": 46, ".": 47,
-    "tab": 48, "space": 49, "`": 50, "delete": 51, "enter": 36, "escape": 53,
-    "down": 125, "up": 126, "left": 123, "right": 124
-}
-
-# 定義按鍵功能 (對應 Windows App)
-# 這裡定義你希望送出的 "字元"，程式會自動查上面的表轉成 code
-BUTTON_MAP_WINDOWS = {
-    1: "q", 2: "7", 3: "5", 4: "6", 5: "d",
-    6: "8", 7: "1", 8: "9", 9: "4", 10: "x",
-    11: "f", 13: "w", 14: "o", 15: "down"
-}
-
-# ================= 核心邏輯 =================
-
-mouse = MouseController()
-keyboard = KeyboardController()
-current_app = ""
-
-# 狀態變數
-last_shuttle_val = 0
-shuttle_active = False
-next_scroll_time = 0
-last_jog_val = None
-last_button_mask = 0
-last_raw_data = None
-
-def get_active_app():
-    """獲取當前 App 名稱"""
-    try:
-        app = NSWorkspace.sharedWorkspace().activeApplication()
-        return app.get('NSApplicationName', "Unknown")
-    except:
-        return "Unknown"
-
-def to_signed(n):
-    return n - 256 if n > 127 else n
-
-def perform_scroll(direction, multiplier):
-    dy = -1 if direction > 0 else 1
-    mouse.scroll(0, dy * multiplier)
-
-def perform_key(key_def):
-    """執行按鍵 (使用 AppleScript Key Code 強制注入)"""
-    print(f"   └── 嘗試執行按鍵: {key_def}")
-
-    # 1. 嘗試轉換為 Mac Key Code (最底層模擬)
-    key_code = None
-    if isinstance(key_def, str) and key_def.lower() in MAC_KEY_CODES:
-        key_code = MAC_KEY_CODES[key_def.lower()]
-    elif key_def == Key.down: # 兼容舊設定
-        key_code = 125
-
-    if key_code is not None:
+"""
+Headless daemon (不需要 rumps / 選單列 / pynput)
+與 mac_shuttle.ShuttleController 共用輸入核心、Profile 與同一份 JSON 設定檔，
+適合用 launchd 在背景執行。
+預設以 lsappinfo 輪詢前景 App，不載入任何 GUI 套件 (每次啟動兩個短命行程，因此間隔較長，
+切換 App 最慢延遲一個間隔)；指定 --nsworkspace 時改用 NSWorkspace 通知 (需要 PyObjC，
+會載入 AppKit / Foundation，主執行緒跑 NSRunLoop)。
+
+控制方式 (signals):
+  SIGHUP         重新載入設定檔
+  SIGUSR1        切換 啟用 / 停用
+  SIGUSR2        把目前狀態與計數寫到事件紀錄
+  SIGTERM/SIGINT 結束
+以及本機控制 socket (見 shuttle_control.py)：強制 Profile、啟用 / 停用、虛擬按鍵、查詢狀態
+
+執行: python shuttle_controller_cli.py [--config PATH] [--app NAME | --nsworkspace | --poll-interval SEC]
+                                    [--pidfile PATH]
+"""
+import argparse
+import json
+import os
+import signal
+import threading
+from collections import deque
+
+from shuttle_core import ShuttleInputCore
+from shuttle_config import ConfigError
+from shuttle_control import ControlServer, CONTROL_SOCKET
+from shuttle_focus import (FixedFocusProvider, NSWorkspaceFocusProvider, PollingFocusProvider,
+                           appkit_available, lsappinfo_front_app)
+from shuttle_inject import PersistentOsascriptSink, QuartzScrollSink
+from shuttle_output import OutputDispatcher, PRIORITY_KEY, PRIORITY_SCROLL
+from shuttle_persist import CONFIG_FILE, DEFAULT_CONFIG, load_config_safe
+from shuttle_watch import ConfigWatcher
+from shuttle_log import log
+
+# 以 lsappinfo 輪詢前景 App 的預設間隔 (秒)；指定 --app / --nsworkspace 時不輪詢
+FOCUS_POLL_INTERVAL = 3.0
+
+# 控制執行緒 (主執行緒) 沒有工作時的最長等待，只用來回頭檢查結束旗標
+CONTROL_IDLE_TIMEOUT = 5.0
+# 跑 NSRunLoop 時每段的最長等待 (秒)：signal handler 要等 run loop 返回才會執行
+# (run loop 沒有任何來源時 runMode_beforeDate_ 會立即回傳 NO，改用 control_wake 等待)
+RUN_LOOP_SLICE = 0.5
+
+
+class ShuttleDaemon(ShuttleInputCore):
+    """
+    輸入核心 + 輸出佇列，沒有 GUI。
+    signal handler、設定檔監看、前景 App 輪詢都只把工作排進 call_soon()，
+    由主執行緒 (run()) 依序執行，角色相當於 mac_shuttle 的 callAfter。
+    """
+
+    def __init__(self, config_path=CONFIG_FILE, backend_factory=None, key_sink=None, scroll_sink=None):
+        ShuttleInputCore.__init__(self, backend_factory)
+        self.config_path = config_path
+
+        # 無效的項目只停用該項 (寫入事件紀錄)，讀取失敗時暫用預設設定
+        self.load_initial_config(load_config_safe(config_path), DEFAULT_CONFIG)
+        self.apply_log_settings()
+
+        self.key_sink = key_sink or PersistentOsascriptSink()
+        self.scroll_sink = scroll_sink or QuartzScrollSink()
+        self.output = OutputDispatcher()
+        self.config_watcher = ConfigWatcher(config_path, self.on_config_file_changed)
+        self.metrics = None
+        self.control = None
+
+        # 主執行緒的工作佇列 (deque 的 append / popleft 為原子操作)
+        self.control_calls = deque()
+        self.control_wake = threading.Event()
+        self.stopping = False
+        # focus provider 需要時由 start_services() 取得主執行緒的 NSRunLoop
+        self.run_loop = None
+
+    # --- 主執行緒 ---
+
+    def call_soon(self, func, *args):
+        """[任何執行緒 / signal handler] 排入 func，由主執行緒執行"""
+        self.control_calls.append((func, args))
+        self.control_wake.set()
+        if self.run_loop is not None:
+            # 讓主執行緒的 run loop 立即返回 (performSelectorOnMainThread)
+            from PyObjCTools.AppHelper import callAfter
+            callAfter(lambda: None)
+
+    def install_signal_handlers(self):
+        """[主執行緒] handler 只排入工作，不在 signal 中斷點直接改狀態"""
+        signal.signal(signal.SIGHUP, lambda signum, frame: self.call_soon(self.reload_config))
+        signal.signal(signal.SIGUSR1, lambda signum, frame: self.call_soon(self.toggle_enabled))
+        signal.signal(signal.SIGUSR2, lambda signum, frame: self.call_soon(self.log_status))
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda signum, frame: self.call_soon(self.request_stop))
+
+    def start_services(self, focus_provider, metrics_port=0, control_socket=CONTROL_SOCKET):
+        """啟動輸出、HID 執行緒、前景 App 來源、設定檔監看與控制 socket"""
+        self.output.start()
+        self.update_active_profile()
+        self.start()
+        if focus_provider.needs_run_loop:
+            from Foundation import NSRunLoop
+            self.run_loop = NSRunLoop.currentRunLoop()
+        self.attach_focus_provider(focus_provider)
+        self.config_watcher.start()
+        if control_socket:
+            # 會改變狀態的指令排進主執行緒的工作佇列
+            try:
+                self.control = ControlServer(self, control_socket, dispatch=self.call_soon)
+                self.control.start()
+            except OSError as e:
+                log.warning("⚠️ 控制 socket 無法啟動: {}", e)
+                self.control = None
+        if metrics_port:
+            # http.server 只有要開監控端點時才載入；True 使用預設 port
+            from shuttle_metrics import MetricsServer, DEFAULT_METRICS_PORT
+            if metrics_port is True:
+                metrics_port = DEFAULT_METRICS_PORT
+            try:
+                self.metrics = MetricsServer(self, metrics_port)
+                self.metrics.start()
+            except OSError as e:
+                log.warning("⚠️ Metrics 端點無法啟動 (port {}): {}", metrics_port, e)
+                self.metrics = None
+        log.info("🎛️ MacShuttle daemon 已啟動 (pid {}, 設定檔 {})", os.getpid(), self.config_path)
+
+    def run(self):
+        """[主執行緒] 執行排入的工作直到 request_stop()"""
+        calls = self.control_calls
+        while not self.stopping:
+            self.wait_for_calls()
+            while calls:
+                func, args = calls.popleft()
+                try:
+                    func(*args)
+                except Exception as e:
+                    log.error("Control call error: {}", e)
+        self.shutdown()
+
+    def wait_for_calls(self):
+        """[主執行緒] 等待 call_soon()；有 NSRunLoop 時同時處理 NSWorkspace 通知"""
+        if self.run_loop is None:
+            self.control_wake.wait(CONTROL_IDLE_TIMEOUT)
+        else:
+            from Foundation import NSDate, NSDefaultRunLoopMode
+            if not self.control_wake.is_set():
+                ran = self.run_loop.runMode_beforeDate_(NSDefaultRunLoopMode,
+                                                        NSDate.dateWithTimeIntervalSinceNow_(RUN_LOOP_SLICE))
+                if not ran:
+                    # 沒有可等待的來源：不要空轉
+                    self.control_wake.wait(CONTROL_IDLE_TIMEOUT)
+        self.control_wake.clear()
+
+    def request_stop(self):
+        self.stopping = True
+        self.control_wake.set()
+
+    def shutdown(self):
+        self.stop()
+        if self.focus: self.focus.stop()
+        self.config_watcher.stop()
+        if self.control: self.control.stop()
+        self.output.stop()
+        self.key_sink.close()
+        if self.metrics: self.metrics.stop()
+        log.info("👋 MacShuttle daemon 已結束")
+        log.close()
+
+    # --- 控制指令 (主執行緒) ---
+
+    def attach_focus_provider(self, provider):
+        # 輪詢執行緒的回呼轉到主執行緒，與設定重載不會同時執行
+        self.focus = provider
+        provider.start(lambda app: self.call_soon(self.on_app_activated, app))
+        self.on_app_activated(provider.current())
+
+    def on_profile_changed(self):
+        profile = self.active_profile
+        log.info("🔄 App: [{}] -> Profile: {}", self.current_app, profile.name if profile else "(無)")
+
+    def toggle_enabled(self):
+        self.set_enabled(not self.is_enabled)
+
+    def reload_config(self):
+        """SIGHUP：重新讀取設定檔 (內容無效時保留原設定)"""
         try:
-            # 使用 key code 指令，這比 keystroke 更容易穿透 RDP
-            cmd = f'tell application "System Events" to key code {key_code}'
-            subprocess.run(["osascript", "-e", cmd], check=False)
-            print(f"      🍎 AppleScript (Key Code {key_code}) 發送成功")
+            with open(self.config_path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except OSError as e:
+            log.error("❌ 無法讀取設定檔: {}", e)
             return
-        except Exception as e:
-            print(f"      ⚠️ AppleScript 執行失敗: {e}")
-
-    # 2. Fallback: 如果找不到 Code 或執行失敗，回退到 pynput
-    try:
-        print("      ⚠️ 無法使用 Key Code，嘗試使用 pynput...")
-        if key_def == "down" or key_def == Key.down:
-             target_key = Key.down
-        else:
-             target_key = key_def
-
-        if target_key:
-            keyboard.press(target_key)
-            time.sleep(0.15)
-            keyboard.release(target_key)
-    except Exception as e:
-        print(f"   ❌ 按鍵錯誤: {e}")
-
-def detect_button_bytes(data):
-    """診斷用：偵測哪些 Byte 發生了變化 (排除 Shuttle/Jog)"""
-    global last_raw_data
-    if last_raw_data is None:
-        last_raw_data = list(data)
-        return
-    for i in range(2, min(len(data), 8)):
-        if data[i] != last_raw_data[i]:
-            print(f"🔍 診斷: Byte {i} 數值改變 -> {data[i]} (0x{data[i]:02x})")
-    last_raw_data = list(data)
-
-def handle_buttons(data):
-    """處理按鍵邏輯"""
-    global last_button_mask
-    if len(data) <= BUTTON_HIGH_INDEX: return
-
-    try:
-        current_mask = (data[BUTTON_HIGH_INDEX] << 8) | data[BUTTON_LOW_INDEX]
-    except IndexError:
-        return
-
-    pressed_mask = current_mask & ~last_button_mask
-    last_button_mask = current_mask
-
-    if pressed_mask == 0: return
+        self.reload_config_text(text, force=True)
 
-    # App 判定邏輯
-    target_apps = ["Windows App", "Microsoft Remote Desktop", "WindowsApp"]
-    is_target_app = any(app in current_app for app in target_apps)
+    def on_config_file_changed(self, text):
+        """[監看執行緒] 設定檔內容已改變 (已去抖動並比對過 hash)"""
+        self.call_soon(self.reload_config_text, text)
 
-    print(f"🔘 偵測到按鍵訊號 (Mask: {bin(pressed_mask)})")
-
-    for i in range(16):
-        if (pressed_mask >> i) & 1:
-            button_id = i + 1
-            print(f"   ▶ 按下按鈕 ID: {button_id}")
-
-            if is_target_app:
-                print(f"   ✅ App 符合 ({current_app})，準備發送按鍵...")
-                action = BUTTON_MAP_WINDOWS.get(button_id)
-                if action:
-                    perform_key(action)
-                else:
-                    print(f"   ⚠️ ID {button_id} 在設定表中未定義功能")
+    def reload_config_text(self, text, force=False):
+        try:
+            new_config = json.loads(text)
+        except ValueError as e:
+            self.on_config_error(ConfigError(f"JSON 格式錯誤: {e}"))
+            return
+        if not force and new_config == self.snapshot.to_dict(): return
+        log.info("偵測到設定檔變更，正在重新載入...")
+        if self.apply_config(new_config):
+            self.apply_log_settings()
+            log.info("已重新編譯 {}/{} 個 Profile", self.snapshot.recompiled, len(self.snapshot.profiles))
+
+    def status(self):
+        status = ShuttleInputCore.status(self)
+        status["output_depth"] = self.output.depth()
+        return status
+
+    def log_status(self):
+        log.info("📊 {}", " ".join(f"{k}={v}" for k, v in self.status().items()))
+
+    # --- 輸出 ---
+
+    def perform_scroll(self, direction, multiplier):
+        """[HID 執行緒] 排入一個滾動 tick"""
+        dy = -1 if direction > 0 else 1
+        self.output.submit(PRIORITY_SCROLL, self.scroll_sink.scroll, dy * multiplier)
+
+    def perform_action(self, action):
+        """[HID 執行緒] 排入按鍵動作，優先於滾動執行"""
+        log.info("   └── 執行按鍵: {}", action.key_def)
+        self.output.submit(PRIORITY_KEY, self._send_action, action)
+
+    def _send_action(self, action):
+        """[輸出執行緒] Key Code 用 key code，其他單一字元用 keystroke (沒有 pynput 備援)"""
+        try:
+            if action.key_code is not None:
+                self.key_sink.send_key(action.key_code, action.modifiers)
             else:
-                print(f"   ⛔ App 不符合 (目前: {current_app})，略過按鍵功能")
-
-def handle_shuttle(value):
-    global shuttle_active, next_scroll_time, last_shuttle_val
-    s_val = to_signed(value)
-    last_shuttle_val = s_val
-
-    if s_val == 0:
-        shuttle_active = False
-        return
-
-    target_apps = ["Windows App", "Microsoft Remote Desktop", "WindowsApp"]
-    is_target_app = any(app in current_app for app in target_apps)
-
-    shuttle_active = True
-    abs_val = abs(s_val)
-    interval = SPEED_MAP.get(abs_val, 0.1)
-
-    if time.time() >= next_scroll_time:
-        multiplier = 2 if is_target_app else 1
-        perform_scroll(s_val, multiplier)
-        next_scroll_time = time.time() + interval
-
-def handle_jog(current_val):
-    global last_jog_val
-    if last_jog_val is None:
-        last_jog_val = current_val
-        return
-
-    diff = current_val - last_jog_val
-    if diff > 127: diff -= 256
-    elif diff < -127: diff += 256
-    last_jog_val = current_val
-
-    if diff == 0: return
-
-    direction = 1 if diff > 0 else -1
-    steps = abs(diff)
-    for _ in range(steps):
-        perform_scroll(direction, 3)
-
-def main():
-    global current_app, shuttle_active, last_shuttle_val
-    print("啟動 ShuttlePro v2 控制器 (Key Code 模式)...")
-    print("---------------------------------------------------")
-    print("💡 操作說明:")
-    print("1. 請先點擊你的 'Windows App' 視窗。")
-    print("2. 按下按鍵，現在使用 AppleScript 'key code' 發送硬體訊號。")
-    print("---------------------------------------------------")
-
+                self.key_sink.send_text(action.char)
+        except Exception:
+            self.injection_failures += 1
+            raise
+        self.key_injections += 1
+
+
+def write_pidfile(path):
+    with open(path, "w") as f:
+        f.write(f"{os.getpid()}\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MacShuttle headless daemon")
+    parser.add_argument("--config", default=CONFIG_FILE, help="JSON 設定檔 (預設與選單列 App 相同)")
+    focus_group = parser.add_mutually_exclusive_group()
+    focus_group.add_argument("--app", help="固定視為前景的 App 名稱 (不偵測前景 App)")
+    focus_group.add_argument("--nsworkspace", action="store_true",
+                             help="以 NSWorkspace 通知偵測前景 App (需要 PyObjC，會載入 AppKit)")
+    focus_group.add_argument("--poll-interval", type=float, default=FOCUS_POLL_INTERVAL,
+                             help=f"以 lsappinfo 輪詢前景 App 的間隔 (秒，預設 {FOCUS_POLL_INTERVAL:.0f})")
+    parser.add_argument("--pidfile", help="寫入 pid，方便 kill -HUP / -USR1")
+    parser.add_argument("--metrics-port", type=int,
+                        help="本機監控端點的 port (預設開啟並使用 shuttle_metrics 的預設 port，0 關閉)")
+    parser.add_argument("--control-socket", default=CONTROL_SOCKET, help="控制 socket 路徑 (空字串關閉)")
+    args = parser.parse_args(argv)
+
+    if args.app:
+        focus = FixedFocusProvider(args.app)
+    elif args.nsworkspace:
+        if not appkit_available():
+            parser.error("--nsworkspace 需要 PyObjC (pip install pyobjc-framework-Cocoa)")
+        focus = NSWorkspaceFocusProvider()
+    else:
+        focus = PollingFocusProvider(lsappinfo_front_app, args.poll_interval)
+
+    daemon = ShuttleDaemon(args.config)
+    daemon.install_signal_handlers()
+    if args.pidfile:
+        write_pidfile(args.pidfile)
     try:
-        h = hid.device()
-        h.open(VID, PID)
-        h.set_nonblocking(1)
-        print(f"✅ 裝置已連接: {h.get_product_string()}")
-
-        app_check_timer = 0
-
-        while True:
-            data = h.read(64)
-            if data:
-                detect_button_bytes(data)
-                handle_buttons(data)
-                if len(data) > SHUTTLE_INDEX:
-                    handle_shuttle(data[SHUTTLE_INDEX])
-                if len(data) > JOG_INDEX:
-                    handle_jog(data[JOG_INDEX])
-
-            if shuttle_active and last_shuttle_val != 0:
-                handle_shuttle(last_shuttle_val)
-
-            if time.time() - app_check_timer > 1.0:
-                new_app = get_active_app()
-                if new_app != current_app:
-                    print(f"🔄 App 切換: [{new_app}]")
-                    current_app = new_app
-                    shuttle_active = False
-                app_check_timer = time.time()
-
-            time.sleep(0.005)
-
-    except IOError:
-        print("❌ 找不到裝置")
-    except KeyboardInterrupt:
-        print("\n程式結束")
+        metrics_port = True if args.metrics_port is None else args.metrics_port
+        daemon.start_services(focus, metrics_port, args.control_socket)
+        daemon.run()
     finally:
-        try:
-            h.close()
-        except:
-            pass
+        if args.pidfile:
+            try: os.remove(args.pidfile)
+            except OSError: pass
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
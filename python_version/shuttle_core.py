@@ -0,0 +1,617 @@
+"""
+ShuttlePro 輸入核心 (不依賴任何 GUI / 注入模組)
+負責 HID 報告讀取、合併、Shuttle / Jog / 按鍵邏輯，
+實際的滾動與按鍵輸出由子類別 (例如 mac_shuttle.ShuttleController) 實作。
+"""
+import threading
+import time
+from collections import deque
+
+from shuttle_hid import HidapiBackend
+from shuttle_engine import ShuttleEngine, DEFAULT_SPEEDS, EVENT_SCROLL
+from shuttle_timer import TimerHeap
+from shuttle_config import ConfigError, DEFAULT_JOG_MULTIPLIER, Profile, compile_config
+from shuttle_jog import JogVelocity
+from shuttle_focus import IGNORED_APPS
+from shuttle_trace import LatencyTracer, TRACE_CAPACITY
+from shuttle_log import log
+
+VID = 0x0b33
+PID = 0x0030
+
+SHUTTLE_INDEX = 0
+JOG_INDEX = 1
+BUTTON_LOW_INDEX = 3
+BUTTON_HIGH_INDEX = 4
+
+# Shuttle 每次滾動的量
+SHUTTLE_SCROLL_AMOUNT = 2
+
+# 無任何待處理期限時，阻塞讀取的最長等待 (秒)
+# 只用來定期回頭檢查 停用/重連/離開 等旗標，不影響回應速度
+IDLE_READ_TIMEOUT = 0.5
+
+# 每次喚醒最多合併的報告數 (避免極端情況下一直讀不完)
+MAX_DRAIN_REPORTS = 64
+
+# ================= HID 報告合併 =================
+
+class ReportBatch:
+    """一次喚醒內讀到的所有 HID 報告合併結果"""
+    __slots__ = ("count", "pressed_mask", "shuttle_raw", "jog_delta")
+
+    def __init__(self):
+        self.count = 0           # 本批次合併的報告數
+        self.pressed_mask = 0    # 所有「按下」邊緣 OR 在一起
+        self.shuttle_raw = None  # 只保留最後一個 Shuttle 原始值
+        self.jog_delta = 0       # Jog 差值總和 (已處理 0/255 繞回)
+
+# ================= 輸入核心 =================
+
+class ShuttleInputCore:
+    def __init__(self, backend_factory=None, clock=time.monotonic):
+        # 每次 (重新) 連線時呼叫，回傳一個 HidBackend
+        self.backend_factory = backend_factory or HidapiBackend
+        self.clock = clock
+
+        # 狀態變數
+        self.is_running = True
+        self.is_enabled = True
+        self.device = None
+        self.reconnect_requested = False
+
+        # 喚醒背景執行緒用 (啟用/停用、重新連接、離開)
+        self.wake_event = threading.Event()
+        self.loop_wakeups = 0  # 迴圈被喚醒次數 (量測閒置 CPU 用)
+        # 其他執行緒要求在 HID 執行緒上執行的 callable (deque 的 append / popleft 為原子操作)
+        self.hid_calls = deque()
+
+        # 目前的設定快照 (shuttle_config.ConfigSnapshot，不可變)
+        # 讀取端 (HID 執行緒) 直接讀這個參考，不上鎖；
+        # 寫入端建立新快照後以一次指派替換，config_lock 只用來序列化寫入端
+        self.snapshot = compile_config({"profiles": []})
+        self.config_lock = threading.Lock()
+
+        # 前景 App 與 Profile 切換
+        self.focus = None
+        self.current_app = ""
+        self.profile_switches = 0
+        self.last_switch_latency = 0.0  # 收到切換通知 -> Profile 套用完成 (秒)
+
+        # 目前套用的 Profile (shuttle_config.Profile，不可變)
+        self.active_profile = None
+        # 以名稱強制使用的 Profile (控制 socket 設定)，None 代表依前景 App 自動切換
+        self.forced_profile = None
+
+        # 所有延後動作 (Shuttle 啟動 / 過渡 / tick、Jog 合併) 共用一個 Timer Heap
+        self.timers = TimerHeap(clock)
+
+        # Shuttle 滾動引擎 (速度表隨 Profile 切換)
+        self.shuttle = ShuttleEngine(clock=clock, listener=self._on_shuttle_event, timers=self.timers)
+
+        self.last_jog_val = None
+        self.last_button_mask = 0
+
+        # Jog 批次滾動 (超過 jog_max_rate 的部分累積到下一次一起送出)
+        self.jog_pending = 0
+        self.next_jog_time = 0
+        self.jog_timer = None
+        self.jog_events = 0  # 實際送出的 Jog 滾動次數
+        # 速度感應加速 (Profile 有 jog_curve 時)：已乘上倍率、尚未送出的滾動量 (含小數餘數)
+        self.jog_velocity = JogVelocity()
+        self.jog_amount = 0.0
+
+        # 報告合併統計 (merged = 被併入同一批次而省下的 handler 執行次數)
+        self.batch_count = 0
+        self.reports_read = 0
+        self.reports_merged = 0
+        self.max_batch_size = 0
+
+        # 運作計數 (shuttle_metrics 讀取；每個計數只有一個執行緒寫入)
+        self.shuttle_scrolls = 0     # Shuttle 送出的滾動次數 (Jog 見 jog_events)
+        self.key_injections = 0      # [輸出執行緒] 完成的按鍵注入
+        self.injection_failures = 0  # [輸出執行緒] 注入失敗 (含改用備援方式)
+        self.connects = 0            # 成功連線次數 (第二次起即為重新連線)
+        self.connect_failures = 0
+        self.read_errors = 0         # 讀取失敗 (通常是裝置被拔除)
+        self.config_reloads = 0      # apply_config 成功次數
+        self.config_errors = 0
+
+        # HID 報告錄製 (shuttle_record.TraceRecorder)，None 代表停用
+        self.recorder = None
+
+        # 延遲追蹤 (shuttle_trace.LatencyTracer)，None 代表停用
+        self.tracer = None
+        self.trace_read = None    # 目前批次的 HID read 時間
+        self.trace_decode = None  # 目前批次的解碼完成時間
+
+        self.thread = None
+
+    def start(self):
+        """啟動背景執行緒 (只處理 HID 邏輯)"""
+        self.thread = threading.Thread(target=self.run_logic_loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.is_running = False
+        self.wake_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=IDLE_READ_TIMEOUT * 2)
+
+    def call_on_hid_thread(self, func):
+        """
+        [任何執行緒] 排入 func，由 HID 執行緒在下一次迴圈開頭執行
+        (最慢約 IDLE_READ_TIMEOUT 後；停用 / 未連線時會被立即喚醒)
+        """
+        self.hid_calls.append(func)
+        self.wake_event.set()
+
+    def stop_scrolling(self):
+        """[任何執行緒] 停止持續滾動；ShuttleEngine 與 TimerHeap 只能在 HID 執行緒操作"""
+        self.call_on_hid_thread(self.shuttle.stop)
+
+    def run_hid_calls(self):
+        calls = self.hid_calls
+        while calls:
+            func = calls.popleft()
+            try:
+                func()
+            except Exception as e:
+                log.error("HID call error: {}", e)
+
+    # --- 輸出 (由子類別實作) ---
+
+    def perform_scroll(self, direction, multiplier):
+        raise NotImplementedError
+
+    def perform_action(self, action):
+        """執行一個已編譯的 KeyAction"""
+        raise NotImplementedError
+
+    # --- 延遲追蹤 ---
+
+    def enable_tracing(self, capacity=TRACE_CAPACITY):
+        if self.tracer is None:
+            self.tracer = LatencyTracer(capacity, self.clock)
+        return self.tracer
+
+    def disable_tracing(self):
+        self.tracer = None
+
+    def trace_dispatch(self, kind):
+        """[HID 執行緒] 輸出排入佇列時呼叫，回傳追蹤序號 (停用時為 None)"""
+        tracer = self.tracer
+        if tracer is None: return None
+        # 虛擬按鍵等由其他執行緒送出的輸出不追蹤 (tracer 只有 HID 執行緒寫入)
+        if threading.current_thread() is not self.thread: return None
+        return tracer.record(kind, self.trace_read, self.trace_decode, self.clock())
+
+    def trace_mark(self, seq, stage):
+        """[輸出執行緒] 記錄注入開始 / 結束"""
+        tracer = self.tracer
+        if tracer is not None and seq is not None:
+            tracer.mark(seq, stage)
+
+    # --- 輸入邏輯 ---
+
+    def to_signed(self, n):
+        return n - 256 if n > 127 else n
+
+    def handle_buttons(self, pressed_mask):
+        if pressed_mask == 0: return
+
+        profile = self.active_profile
+        if profile is None: return
+
+        buttons = profile.buttons
+        for i in range(16):
+            if (pressed_mask >> i) & 1:
+                action = buttons[i]
+                if action: self.perform_action(action)
+
+    def press_buttons(self, pressed_mask):
+        """[控制執行緒] 虛擬按鍵：與實體按鍵相同，依目前 Profile 執行 (bit 0 = Button 1)"""
+        self.handle_buttons(pressed_mask & 0xFFFF)
+
+    def set_enabled(self, enabled):
+        """[控制執行緒] 啟用 / 停用，喚醒 HID 執行緒套用"""
+        self.is_enabled = bool(enabled)
+        self.wake_event.set()
+        log.info("功能開關: {}", self.is_enabled)
+
+    def set_profile(self, profile):
+        """
+        切換目前 Profile (按鍵表、速度表都取自同一個不可變物件)。
+        兩者都是單一參考的替換，HID 執行緒每次使用時才讀取，任何執行緒都可呼叫
+        """
+        self.active_profile = profile
+        self.shuttle.speeds = profile.speeds if profile is not None else DEFAULT_SPEEDS
+
+    # --- App 感知 ---
+
+    def attach_focus_provider(self, provider):
+        """訂閱前景 App 切換 (shuttle_focus.AppFocusProvider)，並立即套用目前的 App"""
+        self.focus = provider
+        provider.start(self.on_app_activated)
+        self.on_app_activated(provider.current())
+
+    def on_app_activated(self, app_name):
+        """前景 App 切換時呼叫 (由 focus provider 回呼)"""
+        if app_name == self.current_app or app_name in IGNORED_APPS: return
+        t0 = self.clock()
+        self.current_app = app_name
+        self.stop_scrolling() # 切換軟體時重置滾動
+        self.update_active_profile()
+        self.last_switch_latency = self.clock() - t0
+
+    def update_active_profile(self):
+        """依目前快照重新比對 Profile (快照替換後也要呼叫，才會套用編輯結果)"""
+        previous = self.active_profile
+        matched = None
+        if self.forced_profile is not None:
+            # 強制的 Profile 在重載後不存在時，改回依前景 App 比對
+            matched = self.snapshot.find(self.forced_profile)
+        if matched is None:
+            matched = self.snapshot.resolve(self.current_app)
+        if matched is previous: return
+
+        self.set_profile(matched)
+        # 同一個 Profile 的新版本 (編輯後) 不算切換
+        if previous is None or matched is None or matched.name != previous.name:
+            self.profile_switches += 1
+        self.on_profile_changed()
+
+    def force_profile(self, name):
+        """[控制執行緒] 不論前景 App 都使用指定名稱的 Profile；None 回到自動切換"""
+        if name is not None and self.snapshot.find(name) is None:
+            raise ConfigError(f"找不到 Profile: {name}")
+        if name == self.forced_profile: return
+        self.forced_profile = name
+        self.stop_scrolling()
+        self.update_active_profile()
+
+    def status(self):
+        """目前狀態與主要計數 (只讀屬性，任何執行緒都可呼叫，不碰 HID 執行緒)"""
+        profile = self.active_profile
+        return {
+            "enabled": self.is_enabled,
+            "connected": self.device is not None,
+            "app": self.current_app,
+            "profile": profile.name if profile else None,
+            "forced_profile": self.forced_profile,
+            "shuttle_level": self.shuttle.last_val,
+            "shuttle_active": self.shuttle.active,
+            "config_version": self.snapshot.version,
+            "reports_read": self.reports_read,
+            "shuttle_scrolls": self.shuttle_scrolls,
+            "jog_scrolls": self.jog_events,
+            "key_injections": self.key_injections,
+            "injection_failures": self.injection_failures,
+        }
+
+    def load_initial_config(self, config, fallback):
+        """
+        啟動時編譯設定檔 (config 為 None 代表無法讀取)。
+        無效的按鈕 / 速度只停用該項，無法編譯的 Profile 略過，其餘照常使用；
+        設定檔整個無法使用時改用 fallback，該快照標記為不可寫回，不會蓋掉使用者的檔案。
+        回傳問題訊息 (沒有問題時為空 list)。
+        """
+        problems = []
+        if config is not None:
+            try:
+                self.snapshot = compile_config(config, strict=False)
+                problems.extend(self.snapshot.errors)
+            except ConfigError as e:
+                problems.append(str(e))
+                config = None
+        else:
+            problems.append("無法讀取設定檔")
+        if config is None:
+            problems.append("暫時使用預設設定，修改不會寫回設定檔")
+            self.snapshot = compile_config(fallback, persistable=False)
+        for message in problems:
+            log.error("❌ Config Error: {}", message)
+        self.config_errors += len(problems)
+        return problems
+
+    def apply_config(self, new_config):
+        """
+        編譯並套用新設定，無效的項目只停用該項 (on_config_problems)；
+        最外層結構無效時保留原設定並回傳 False
+        """
+        try:
+            with self.config_lock:
+                self.snapshot = compile_config(new_config, self.snapshot.version + 1, self.snapshot,
+                                               strict=False)
+        except ConfigError as e:
+            self.config_errors += 1
+            self.on_config_error(e)
+            return False
+        self.config_reloads += 1
+        if self.snapshot.errors:
+            self.config_errors += len(self.snapshot.errors)
+            self.on_config_problems(self.snapshot.errors)
+        self.update_active_profile()
+        return True
+
+    def edit_config(self, mutate):
+        """
+        以目前快照的 dict 複本呼叫 mutate(config)，編譯成新快照後替換並回傳。
+        這次修改造成新的無效項目時丟出 ConfigError，原快照不受影響；
+        設定檔原本就有的無效項目維持停用，不妨礙編輯其他項目。
+        只替換快照，Profile 要由呼叫端 (主執行緒) 呼叫 update_active_profile() 套用。
+        """
+        with self.config_lock:
+            current = self.snapshot
+            config = current.to_dict()
+            mutate(config)
+            snapshot = compile_config(config, current.version + 1, current, strict=False,
+                                      persistable=current.persistable)
+            for message in snapshot.errors:
+                if message not in current.errors:
+                    raise ConfigError(message)
+            self.snapshot = snapshot
+        return snapshot
+
+    def edit_profile(self, profile, mutate):
+        """edit_config 的單一 Profile 版本：mutate(profile_dict)"""
+        def mutate_config(config):
+            index = self.snapshot.index_of(profile)
+            if index is None:
+                raise ConfigError(f"找不到 Profile: {profile.name}")
+            mutate(config["profiles"][index])
+        return self.edit_config(mutate_config)
+
+    def apply_log_settings(self):
+        """設定檔的 "log_level" ("debug" / "info" / ...) 與 "log_sampling" ({"info": 10} = 每 10 筆留 1 筆)"""
+        try:
+            log.configure(self.snapshot.setting("log_level", "info"), self.snapshot.setting("log_sampling", {}))
+        except (KeyError, AttributeError, TypeError, ValueError) as e:
+            log.warning("⚠️ 事件紀錄設定無效: {}", e)
+
+    def on_profile_changed(self):
+        """Profile 改變時的 hook (GUI 用來更新選單)"""
+        pass
+
+    def on_config_error(self, error):
+        log.error("❌ Config Error: {}", error)
+
+    def on_config_problems(self, problems):
+        """設定已套用，但部分項目無效而被停用 / 略過"""
+        for message in problems:
+            log.error("❌ Config Error: {}", message)
+
+    def handle_shuttle(self, value):
+        self.shuttle.update(self.to_signed(value))
+
+    def _on_shuttle_event(self, kind, t, value):
+        if kind == EVENT_SCROLL:
+            self.shuttle_scrolls += 1
+            self.perform_scroll(value, SHUTTLE_SCROLL_AMOUNT)
+
+    def handle_jog(self, diff):
+        """每批次最多送出一個合併後的滾動量"""
+        if diff:
+            profile = self.active_profile
+            curve = profile.jog_curve if profile is not None else None
+            if curve is not None:
+                self.accelerate_jog(diff, profile.jog_multiplier, curve)
+        self.jog_pending += diff
+        # 加速模式下正反轉互相抵消時，jog_amount 仍可能有整數的量要送出
+        if self.jog_pending == 0 and -1 < self.jog_amount < 1: return
+
+        # 受 jog_max_rate 限制時先累積，由 timer 到期後一起送出
+        if self.jog_timer is not None: return
+        now = self.clock()
+        if now < self.next_jog_time:
+            self.jog_timer = self.timers.call_at(self.next_jog_time, self._on_jog_timer)
+            return
+        self.flush_jog(now)
+
+    def accelerate_jog(self, diff, multiplier, curve):
+        """以收到報告時的轉速換算倍率，累積到 jog_amount (不排任何 timer)"""
+        if (diff > 0) != (self.jog_amount > 0):
+            self.jog_amount = 0.0  # 反轉方向時捨棄另一個方向的餘數
+        velocity = self.jog_velocity.update(self.clock(), diff, curve.window)
+        self.jog_amount += diff * multiplier * curve.gain(velocity)
+
+    def _on_jog_timer(self, when):
+        self.jog_timer = None
+        self.flush_jog(self.clock())
+
+    def flush_jog(self, now):
+        delta = self.jog_pending
+        self.jog_pending = 0
+
+        profile = self.active_profile
+        if profile is not None:
+            multiplier, max_rate = profile.jog_multiplier, profile.jog_max_rate
+        else:
+            multiplier, max_rate = DEFAULT_JOG_MULTIPLIER, 0
+
+        if profile is not None and profile.jog_curve is not None:
+            # 只送出整數部分 (向零取整)，餘數留到下一次，慢速時每格可少於 1 行
+            amount = self.jog_amount
+            steps = int(amount)
+            self.jog_amount = amount - steps
+            if steps == 0: return
+            self.perform_scroll(steps, abs(steps))
+        else:
+            self.jog_amount = 0.0  # 切換到沒有加速的 Profile 前留下的量
+            if delta == 0: return
+            self.perform_scroll(delta, abs(delta) * multiplier)
+        self.jog_events += 1
+        self.next_jog_time = now + 1.0 / max_rate if max_rate > 0 else 0
+
+    def merge_report(self, batch, data):
+        """將單一 HID 報告解碼並合併進 batch"""
+        batch.count += 1
+
+        if len(data) > BUTTON_HIGH_INDEX:
+            current_mask = (data[BUTTON_HIGH_INDEX] << 8) | data[BUTTON_LOW_INDEX]
+            batch.pressed_mask |= current_mask & ~self.last_button_mask
+            self.last_button_mask = current_mask
+
+        if len(data) > SHUTTLE_INDEX:
+            batch.shuttle_raw = data[SHUTTLE_INDEX]
+
+        if len(data) > JOG_INDEX:
+            current_val = data[JOG_INDEX]
+            if self.last_jog_val is not None:
+                diff = current_val - self.last_jog_val
+                if diff > 127: diff -= 256
+                elif diff < -127: diff += 256
+                batch.jog_delta += diff
+            self.last_jog_val = current_val
+
+    def drain_reports(self, first_data):
+        """讀出所有已排隊的報告並合併成一個 batch"""
+        batch = ReportBatch()
+        recorder = self.recorder
+        if recorder is not None: recorder.record(first_data)
+        self.merge_report(batch, first_data)
+
+        # 不等待 (timeout 0)，把 queue 內剩下的報告一次讀完
+        while batch.count < MAX_DRAIN_REPORTS:
+            data = self.device.read(64, 0)
+            if not data: break
+            if recorder is not None: recorder.record(data)
+            self.merge_report(batch, data)
+
+        self.batch_count += 1
+        self.reports_read += batch.count
+        self.reports_merged += batch.count - 1
+        if batch.count > self.max_batch_size:
+            self.max_batch_size = batch.count
+        return batch
+
+    def process_reports(self, data):
+        """讀到第一個報告後：合併所有排隊中的報告並處理 (HID 迴圈與重播共用)"""
+        if self.tracer is None:
+            self.handle_batch(self.drain_reports(data))
+            return
+        self.trace_read = self.clock()
+        batch = self.drain_reports(data)
+        self.trace_decode = self.clock()
+        self.handle_batch(batch)
+        # Timer 觸發的輸出沒有對應的 HID 報告
+        self.trace_read = self.trace_decode = None
+
+    def handle_batch(self, batch):
+        """每批次只執行一次各 handler"""
+        self.handle_buttons(batch.pressed_mask)
+        if batch.shuttle_raw is not None:
+            self.handle_shuttle(batch.shuttle_raw)
+        self.handle_jog(batch.jog_delta)
+
+    def _connect_hid_backend(self):
+        """[背景執行緒] 嘗試連接 HID 裝置"""
+        try:
+            device = self.backend_factory()
+            device.open(VID, PID)
+            self.device = device
+            self.connects += 1
+            log.info("✅ HID 裝置已連接")
+        except IOError:
+            self.connect_failures += 1
+            self.device = None
+
+    def _close_device(self):
+        try: self.device.close()
+        except: pass
+        self.device = None
+
+    def next_deadline(self):
+        """取得最近一個待處理期限 (self.clock 時間)，沒有則回傳 None"""
+        return self.timers.next_deadline()
+
+    def run_due_timers(self):
+        """執行已到期的 啟動緩衝 / 持續滾動 / 過渡 / Jog Timer"""
+        self.timers.run_due()
+
+    def run_logic_loop(self):
+        """
+        [背景執行緒] 主邏輯迴圈
+        以阻塞讀取等待 HID 報告，timeout 設為最近的期限，
+        閒置時幾乎不喚醒，報告一到立即處理。
+        """
+        while self.is_running:
+            if self.hid_calls:
+                self.run_hid_calls()
+
+            if not self.is_enabled:
+                # 等待 toggle_active 喚醒
+                self.wake_event.wait()
+                self.wake_event.clear()
+                continue
+
+            if self.reconnect_requested:
+                self.reconnect_requested = False
+                if self.device:
+                    self._close_device()
+
+            # 裝置連線邏輯
+            if not self.device:
+                self._connect_hid_backend()
+                if not self.device:
+                    # 可被「重新連接裝置」立即喚醒
+                    self.wake_event.wait(2.0)
+                    self.wake_event.clear()
+                    continue
+
+            deadline = self.next_deadline()
+            if deadline is None:
+                timeout = IDLE_READ_TIMEOUT
+            else:
+                timeout = min(max(deadline - self.clock(), 0.0), IDLE_READ_TIMEOUT)
+            # timeout_ms=0 代表不等待，因此至少 1ms
+            timeout_ms = max(1, int(timeout * 1000 + 0.999))
+
+            try:
+                # 讀取 HID
+                data = self.device.read(64, timeout_ms)
+                self.loop_wakeups += 1
+                if self.hid_calls:
+                    # 讀取期間排入的工作 (例如切換 App 時停止滾動) 先於這次的報告與 timer 執行
+                    self.run_hid_calls()
+                if data:
+                    self.process_reports(data)
+
+                self.run_due_timers()
+
+            except Exception as e:
+                self.read_errors += 1
+                log.error("Read Error: {}", e)
+                self._close_device()
+                self.wake_event.wait(1.0)
+                self.wake_event.clear()
+                continue
+
+
+class RecordingCore(ShuttleInputCore):
+    """
+    測試 / 基準用：不注入任何東西，只記錄滾動與按鍵 (時間取自 self.clock)。
+    profile 可為 Profile 或原始 dict；record=False 時只計數，不保留紀錄 (長時間壓測用)
+    """
+
+    def __init__(self, backend_factory=None, clock=time.monotonic, profile=None, record=True):
+        ShuttleInputCore.__init__(self, backend_factory, clock)
+        if profile is not None:
+            self.set_profile(profile if isinstance(profile, Profile) else Profile(profile))
+        self.record = record
+        self.scrolls = []  # [(時間, direction, multiplier)]
+        self.actions = []  # [(時間, key_def)]
+        self.scroll_count = 0
+        self.scroll_lines = 0
+
+    def perform_scroll(self, direction, multiplier):
+        self.scroll_count += 1
+        self.scroll_lines += multiplier
+        if self.record:
+            self.scrolls.append((self.clock(), direction, multiplier))
+
+    def perform_action(self, action):
+        self.key_injections += 1
+        if self.record:
+            self.actions.append((self.clock(), action.key_def))
@@ -1,55 +1,321 @@
-import hid
+"""
+ShuttlePro 數值診斷
+  python shuttle_diag.py                      互動模式：只顯示數值有變化的報告
+  python shuttle_diag.py --capture 60         高速擷取 60 秒後分析回報率 (需要 NumPy)
+  python shuttle_diag.py --analyze x.shtr     分析既有的錄製檔 (需要 NumPy)
+
+擷取模式不 sleep：以阻塞讀取等待下一個報告，每個報告讀到後立即以 time.monotonic_ns 記錄時間，
+擷取期間只把資料附加到預先配置的 array / bytearray，分析全部在擷取結束後以 NumPy 向量化計算。
+"""
+import argparse
 import time
+from array import array
+
+from shuttle_record import TraceRecorder, TraceFile, HEADER, MAX_REPORT_BYTES
 
 VID = 0x0b33
 PID = 0x0030
 
+SHUTTLE_INDEX = 0
+JOG_INDEX = 1
+
+# 擷取時每次阻塞讀取的最長等待 (毫秒)，只用來定期檢查是否到時間
+CAPTURE_TIMEOUT_MS = 100
+# 間隔直方圖的上界 (毫秒)
+INTERVAL_BUCKETS_MS = (1, 2, 4, 8, 12, 16, 24, 32, 64, 128)
+# Jog 每個報告的步數直方圖顯示到幾步
+JOG_STEP_BUCKETS = 8
+
+
 def to_signed(n):
     """將 0-255 轉為 -128 到 127"""
     return n - 256 if n > 127 else n
 
-try:
-    h = hid.device()
-    h.open(VID, PID)
-    h.set_nonblocking(1)
-
-    print(f"✅ 已連接: {h.get_product_string()}")
-    print("=" * 60)
-    print("請依照以下指令操作，觀察數值變化：")
-    print("1. 將外圈 (Shuttle) 慢慢往右轉到底")
-    print("2. 將外圈 (Shuttle) 慢慢往左轉到底")
-    print("3. 轉動內圈 (Jog)")
-    print("4. 按下任意按鍵")
-    print("=" * 60)
-    print(f"{'RAW (Hex)':<30} | {'Byte 0 (Signed)':<15} | {'Byte 1 (Signed)':<15}")
-    print("-" * 60)
-
-    last_data = None
-
-    while True:
-        data = h.read(64)
-        if data:
-            # 只有當數據改變時才顯示 (忽略重複訊號)
-            if data != last_data:
-                # 轉成 Hex 字串供參考
-                hex_str = " ".join([f"{x:02x}" for x in data[:5]])
-
-                # 將前兩個 Byte 轉成有號整數 (-1, -5, +5...)
-                b0_signed = to_signed(data[0])
-                b1_signed = to_signed(data[1])
-
-                print(f"[{hex_str:<20}]   |   Val: {b0_signed:<10} |   Val: {b1_signed:<10}")
-
-                last_data = data
-
-        time.sleep(0.01)
-
-except IOError:
-    print("❌ 找不到裝置，請確認 USB 連接或是否有其他程式佔用。")
-except KeyboardInterrupt:
-    print("\n程式結束")
-finally:
+
+# ================= 互動模式 =================
+
+def run_interactive(recorder):
+    import hid
+    try:
+        h = hid.device()
+        h.open(VID, PID)
+        h.set_nonblocking(1)
+
+        print(f"✅ 已連接: {h.get_product_string()}")
+        print("=" * 60)
+        print("請依照以下指令操作，觀察數值變化：")
+        print("1. 將外圈 (Shuttle) 慢慢往右轉到底")
+        print("2. 將外圈 (Shuttle) 慢慢往左轉到底")
+        print("3. 轉動內圈 (Jog)")
+        print("4. 按下任意按鍵")
+        print("=" * 60)
+        print(f"{'RAW (Hex)':<30} | {'Byte 0 (Signed)':<15} | {'Byte 1 (Signed)':<15}")
+        print("-" * 60)
+
+        last_data = None
+
+        while True:
+            data = h.read(64)
+            if data:
+                if recorder: recorder.record(data)
+                # 只有當數據改變時才顯示 (忽略重複訊號)
+                if data != last_data:
+                    # 轉成 Hex 字串供參考
+                    hex_str = " ".join([f"{x:02x}" for x in data[:5]])
+
+                    # 將前兩個 Byte 轉成有號整數 (-1, -5, +5...)
+                    b0_signed = to_signed(data[0])
+                    b1_signed = to_signed(data[1])
+
+                    print(f"[{hex_str:<20}]   |   Val: {b0_signed:<10} |   Val: {b1_signed:<10}")
+
+                    last_data = data
+
+            time.sleep(0.01)
+
+    except IOError:
+        print("❌ 找不到裝置，請確認 USB 連接或是否有其他程式佔用。")
+    except KeyboardInterrupt:
+        print("\n程式結束")
+    finally:
+        try:
+            h.close()
+        except:
+            pass
+
+
+# ================= 高速擷取 =================
+
+def capture(device, duration, clock_ns=time.monotonic_ns):
+    """
+    擷取 duration 秒 (Ctrl+C 可提前結束)。
+    回傳 (times: array('q') 奈秒, reports: bytearray 每筆 MAX_REPORT_BYTES bytes, 空讀取次數)
+    """
+    times = array("q")
+    reports = bytearray()
+    pad = bytes(MAX_REPORT_BYTES)
+    empty_reads = 0
+    read = device.read
+    deadline = clock_ns() + int(duration * 1e9)
     try:
-        h.close()
-    except:
+        while True:
+            data = read(64, CAPTURE_TIMEOUT_MS)
+            t = clock_ns()
+            if data:
+                times.append(t)
+                chunk = bytes(data[:MAX_REPORT_BYTES])
+                reports += chunk
+                if len(chunk) < MAX_REPORT_BYTES:
+                    reports += pad[len(chunk):]
+            else:
+                empty_reads += 1
+            if t >= deadline: break
+    except KeyboardInterrupt:
         pass
+    return times, reports, empty_reads
+
+
+def save_capture(path, times, reports):
+    """存成 shuttle_record 的 .shtr 格式 (可再用 --analyze 或 shuttle_record.py replay)"""
+    recorder = TraceRecorder(path, clock_ns=lambda: times[0] if times else 0)
+    for i, t in enumerate(times):
+        recorder.record(reports[i * MAX_REPORT_BYTES:(i + 1) * MAX_REPORT_BYTES], t)
+    recorder.close()
+    return recorder.count
+
+
+def load_trace_arrays(path):
+    """以 mmap 直接把 .shtr 紀錄對應成 NumPy 陣列 (不逐筆解碼)"""
+    import numpy as np
+    trace = TraceFile(path)  # 檢查檔頭與版本
+    count = len(trace)
+    trace.close()
+    dtype = np.dtype([("t", "<u8"), ("length", "u1"), ("report", "u1", (MAX_REPORT_BYTES,))])
+    if count == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, MAX_REPORT_BYTES), dtype=np.uint8)
+    records = np.memmap(path, dtype=dtype, mode="r", offset=HEADER.size, shape=(count,))
+    return records["t"].astype(np.int64), np.array(records["report"])
+
+
+# ================= 分析 (NumPy) =================
+
+def analyze(times_ns, reports):
+    """
+    times_ns: int64 (N,)；reports: uint8 (N, >=2)。回傳統計 dict (毫秒)。
+    全部以陣列運算完成，不對每個報告跑 Python 迴圈。
+    """
+    import numpy as np
+    times_ns = np.asarray(times_ns, dtype=np.int64)
+    reports = np.asarray(reports, dtype=np.uint8)
+    n = len(times_ns)
+    result = {"reports": n}
+    if n < 2:
+        return result
+    duration_ms = (times_ns[-1] - times_ns[0]) / 1e6
+    result["duration_s"] = duration_ms / 1000.0
+
+    # --- 報告間隔 ---
+    intervals = np.diff(times_ns) / 1e6
+    p = np.percentile(intervals, [1, 5, 50, 95, 99])
+    median = p[2]
+    bounds = np.asarray(INTERVAL_BUCKETS_MS, dtype=np.float64)
+    result["interval_ms"] = {
+        "min": float(intervals.min()), "p1": float(p[0]), "p5": float(p[1]), "median": float(median),
+        "mean": float(intervals.mean()), "p95": float(p[3]), "p99": float(p[4]),
+        "max": float(intervals.max()), "std": float(intervals.std()),
+        # 各區間的數量：<= bounds[i]，最後一格為超過最大上界
+        "histogram": np.bincount(np.searchsorted(bounds, intervals), minlength=len(bounds) + 1).tolist(),
+    }
+    result["report_rate_hz"] = float(1000.0 / median) if median > 0 else 0.0
+    result["mean_rate_hz"] = float((n - 1) / (duration_ms / 1000.0)) if duration_ms > 0 else 0.0
+    # 超過兩倍中位數的間隔 (漏掉的報告或裝置靜止)
+    result["gaps"] = int(np.count_nonzero(intervals > 2 * median))
+
+    # --- 重複報告 (與前一個報告完全相同) ---
+    same = np.all(reports[1:] == reports[:-1], axis=1)
+    result["duplicates"] = int(same.sum())
+    result["duplicate_ratio"] = float(same.mean())
+
+    # --- Jog 每個報告的步數 (處理 0/255 繞回) ---
+    jog = reports[:, JOG_INDEX].astype(np.int16)
+    steps = (np.diff(jog) + 128) % 256 - 128
+    moving = steps[steps != 0]
+    abs_steps = np.abs(moving)
+    result["jog"] = {
+        "total_steps": int(steps.sum()),
+        "abs_steps": int(abs_steps.sum()),
+        "moving_reports": int(len(moving)),
+        "mean_steps_per_moving_report": float(abs_steps.mean()) if len(moving) else 0.0,
+        "max_steps_per_report": int(abs_steps.max()) if len(moving) else 0,
+        # index i = |步數| 為 i 的報告數，最後一格為 >= JOG_STEP_BUCKETS
+        "histogram": np.bincount(np.minimum(abs_steps, JOG_STEP_BUCKETS),
+                                 minlength=JOG_STEP_BUCKETS + 1)[1:].tolist(),
+    }
+
+    # --- Shuttle 各段停留時間 ---
+    shuttle = reports[:, SHUTTLE_INDEX].view(np.int8).astype(np.int16)
+    changes = np.flatnonzero(np.diff(shuttle)) + 1
+    starts = np.concatenate(([0], changes))
+    ends = np.concatenate((changes, [n - 1]))   # 下一段第一個報告 (最後一段到最後一個報告)
+    levels = shuttle[starts]
+    dwell = (times_ns[ends] - times_ns[starts]) / 1e6
+    index = levels + 7
+    valid = (index >= 0) & (index <= 14)
+    counts = np.bincount(index[valid], minlength=15)
+    totals = np.bincount(index[valid], weights=dwell[valid], minlength=15)
+    maxima = np.zeros(15)
+    np.maximum.at(maxima, index[valid], dwell[valid])
+    result["shuttle_dwell"] = [
+        {"level": int(i - 7), "entries": int(counts[i]), "total_ms": float(totals[i]),
+         "mean_ms": float(totals[i] / counts[i]), "max_ms": float(maxima[i])}
+        for i in np.flatnonzero(counts)
+    ]
+    result["shuttle_changes"] = int(len(changes))
+    return result
+
+
+def format_analysis(result):
+    lines = [f"報告數: {result['reports']}"]
+    if result["reports"] < 2:
+        lines.append("報告太少，無法分析")
+        return "\n".join(lines)
+    iv = result["interval_ms"]
+    lines.append(f"擷取時間: {result['duration_s']:.2f} 秒, 平均 {result['mean_rate_hz']:.1f} 報告/秒")
+    lines.append(f"回報率 (依間隔中位數): {result['report_rate_hz']:.1f} Hz")
+    lines.append(f"間隔 ms: min {iv['min']:.3f} | p1 {iv['p1']:.3f} | p5 {iv['p5']:.3f} | "
+                 f"p50 {iv['median']:.3f} | p95 {iv['p95']:.3f} | p99 {iv['p99']:.3f} | "
+                 f"max {iv['max']:.3f} | std {iv['std']:.3f}")
+    labels = [f"<={b}" for b in INTERVAL_BUCKETS_MS] + [f">{INTERVAL_BUCKETS_MS[-1]}"]
+    lines.append("間隔分布: " + ", ".join(f"{l}: {c}" for l, c in zip(labels, iv["histogram"]) if c))
+    lines.append(f"大於 2 倍中位數的間隔: {result['gaps']}")
+    lines.append(f"重複報告: {result['duplicates']} ({result['duplicate_ratio'] * 100:.1f}%)")
+
+    jog = result["jog"]
+    lines.append(f"Jog: 淨步數 {jog['total_steps']}, 總步數 {jog['abs_steps']}, "
+                 f"有轉動的報告 {jog['moving_reports']}, 平均 {jog['mean_steps_per_moving_report']:.2f} 步/報告, "
+                 f"最多 {jog['max_steps_per_report']} 步")
+    if jog["moving_reports"]:
+        labels = [str(i) for i in range(1, JOG_STEP_BUCKETS)] + [f">={JOG_STEP_BUCKETS}"]
+        lines.append("  步數分布: " + ", ".join(f"{l}: {c}" for l, c in zip(labels, jog["histogram"]) if c))
+
+    lines.append(f"Shuttle: 變化 {result['shuttle_changes']} 次")
+    lines.append(f"  {'Level':>5} | {'次數':>6} | {'總停留 ms':>10} | {'平均 ms':>9} | {'最長 ms':>9}")
+    for row in result["shuttle_dwell"]:
+        lines.append(f"  {row['level']:>5} | {row['entries']:>6} | {row['total_ms']:>10.1f} | "
+                     f"{row['mean_ms']:>9.1f} | {row['max_ms']:>9.1f}")
+    return "\n".join(lines)
+
+
+def require_numpy():
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        print("❌ 分析需要 NumPy: pip install numpy")
+        return False
+    return True
+
+
+def run_capture(duration, record_path):
+    from shuttle_hid import HidapiBackend
+    if not require_numpy(): return
+    device = HidapiBackend()
+    try:
+        device.open(VID, PID)
+    except IOError:
+        print("❌ 找不到裝置，請確認 USB 連接或是否有其他程式佔用。")
+        return
+    print(f"✅ 已連接: {device.get_product_string()}")
+    print(f"⏺️ 擷取 {duration:g} 秒 (Ctrl+C 提前結束)，請轉動 Shuttle / Jog ...")
+    try:
+        times, reports, empty_reads = capture(device, duration)
+    finally:
+        device.close()
+    print(f"擷取完成: {len(times)} 筆, 空讀取 {empty_reads} 次")
+    if record_path:
+        print(f"已錄製 {save_capture(record_path, times, reports)} 筆 -> {record_path}")
+
+    import numpy as np
+    t0 = time.perf_counter()
+    result = analyze(np.frombuffer(times, dtype=np.int64),
+                     np.frombuffer(bytes(reports), dtype=np.uint8).reshape(-1, MAX_REPORT_BYTES))
+    elapsed = time.perf_counter() - t0
+    print(format_analysis(result))
+    print(f"(分析耗時 {elapsed * 1000:.1f} ms)")
+
+
+def run_analyze(path):
+    if not require_numpy(): return
+    t0 = time.perf_counter()
+    times, reports = load_trace_arrays(path)
+    result = analyze(times, reports)
+    elapsed = time.perf_counter() - t0
+    print(format_analysis(result))
+    print(f"(讀取 + 分析耗時 {elapsed * 1000:.1f} ms)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ShuttlePro 數值診斷")
+    parser.add_argument("--record", metavar="FILE", help="同時把原始報告錄製成 .shtr 檔")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--capture", metavar="SECONDS", type=float, help="高速擷取並分析回報率")
+    mode.add_argument("--analyze", metavar="FILE", help="分析 .shtr 錄製檔")
+    args = parser.parse_args(argv)
+
+    if args.analyze:
+        run_analyze(args.analyze)
+        return
+    if args.capture:
+        run_capture(args.capture, args.record)
+        return
+
+    recorder = TraceRecorder(args.record) if args.record else None
+    try:
+        run_interactive(recorder)
+    finally:
+        if recorder:
+            recorder.close()
+            print(f"已錄製 {recorder.count} 筆 -> {recorder.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+Shuttle (外圈) 滾動引擎
+純邏輯，不讀 HID、不直接滾動：時間來源由外部注入 (預設 time.monotonic)，
+Shuttle 數值變化與每一次滾動都以事件通知 listener。
+另附 ManualClock 與 simulate()，可用比實際時間快的速度重播手勢。
+"""
+import time
+
+from shuttle_timer import TimerHeap
+
+# 預設速度表 (毫秒)，設定檔缺少 speeds 時使用
+DEFAULT_SPEEDS = [800, 600, 333, 200, 100, 50, 20]
+
+STARTUP_DELAY = 0.08        # 啟動觀察期秒數 (對應 AHK 的 80ms)
+TRANSITION_THRESHOLD = 0.04 # 人類感知閾值 (約 40ms)，低於此值的過渡直接執行
+MIN_PERIOD = 0.005          # 最短滾動週期；速度表 <= 0 時不會讓 timer 原地重排而空轉
+
+# listener(kind, t, value) 的事件種類
+EVENT_VALUE = "value"    # Shuttle 數值改變 (value = -7 ~ 7)
+EVENT_SCROLL = "scroll"  # 送出一次滾動 (value = 當下 Shuttle 數值，正負代表方向)
+
+
+class ShuttleEngine:
+    def __init__(self, clock=time.monotonic, speeds=None, listener=None,
+                 startup_delay=STARTUP_DELAY, timers=None):
+        self.clock = clock
+        self.speeds = speeds if speeds is not None else DEFAULT_SPEEDS
+        self.listener = listener
+        self.startup_delay = startup_delay
+        # 可與其他元件共用同一個 TimerHeap (例如輸入核心)
+        self.timers = timers if timers is not None else TimerHeap(clock)
+
+        self.last_val = 0
+        self.active = False              # 是否處於持續滾動
+        self.is_transitioning = False    # 下一次 tick 是否為加減速過渡
+        self.is_startup_pending = False  # 是否正處於「剛起步觀察期」
+        self._timer = None               # 目前排定的 啟動 / 過渡 / tick timer
+
+    def _emit(self, kind, t, value):
+        if self.listener is not None:
+            self.listener(kind, t, value)
+
+    def _schedule(self, when, callback, *args):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = self.timers.call_at(when, callback, *args)
+
+    def _cancel(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def period_for(self, s_val):
+        """根據速度值 (1-7) 取得週期時間 (秒)"""
+        idx = min(max(abs(s_val) - 1, 0), 6)
+        return max(self.speeds[idx] / 1000.0, MIN_PERIOD)
+
+    def stop(self):
+        """停止持續滾動 (例如切換 App)，直到下一次數值改變"""
+        self._cancel()
+        self.active = False
+        self.is_transitioning = False
+        self.is_startup_pending = False
+
+    def next_deadline(self):
+        """最近一個待處理期限，沒有則回傳 None"""
+        return self.timers.next_deadline()
+
+    def run_due(self):
+        """執行已到期的 啟動緩衝 / 過渡 / 持續滾動 timer"""
+        return self.timers.run_due()
+
+    def update(self, s_val):
+        """
+        Shuttle 數值輸入 (對應 AHK: HandleOuterRing)
+        數值沒變時不做事，持續滾動由 timer 負責。
+        """
+        if s_val == self.last_val:
+            return
+        now = self.clock()
+        self._emit(EVENT_VALUE, now, s_val)
+
+        # [Step A] 歸零處理：立刻停止
+        if s_val == 0:
+            self.stop()
+            self.last_val = s_val
+            return
+
+        # [Step B] 啟動緩衝邏輯
+
+        # 情況 1: 正在觀察期內 (例如 0->1 剛發生，尚未觸發，馬上又變成 2)
+        if self.is_startup_pending:
+            # 只更新數值，不執行動作，等待 execute_startup 抓取最新值
+            self.last_val = s_val
+            return
+
+        # 情況 2: 從靜止啟動 (0 -> X)
+        if self.last_val == 0:
+            self.is_startup_pending = True
+            self._schedule(now + self.startup_delay, self.execute_startup)
+            self.last_val = s_val
+            return
+
+        # 以下為「已經在轉動中」的變速邏輯 (1 -> 2 或 2 -> 1)
+        self.is_transitioning = False
+
+        new_period = self.period_for(s_val)
+        old_period = self.period_for(self.last_val)
+
+        current_abs = abs(s_val)
+        old_abs = abs(self.last_val)
+
+        if current_abs > old_abs:
+            # 加速：延遲 = 差值的一半 (避免太快暴衝)
+            wait_delay = abs(old_period - new_period) / 2.0
+        elif current_abs < old_abs:
+            # 減速：延遲 = 兩者平均值 (填補時間空隙，模擬慣性)
+            wait_delay = (old_period + new_period) / 2.0
+        else:
+            # 同速反向
+            wait_delay = 0.0
+
+        self.last_val = s_val
+        self.active = True
+
+        # [Step C] 執行過渡 Timer 設定
+        if wait_delay < TRANSITION_THRESHOLD:
+            self._emit(EVENT_SCROLL, now, s_val)
+            self._schedule(now + new_period, self._tick)
+        else:
+            self.is_transitioning = True
+            self._schedule(now + wait_delay, self._tick)
+
+    def execute_startup(self, when):
+        """啟動緩衝結束 (對應 AHK: ExecuteStartup)"""
+        self._timer = None
+        self.is_startup_pending = False
+
+        # 等待期間使用者又停下來了
+        s_val = self.last_val
+        if s_val == 0:
+            return
+
+        final_period = self.period_for(s_val)
+        # 立即執行第一槍 (達成無延遲感的啟動)，再進入穩定循環
+        self._emit(EVENT_SCROLL, self.clock(), s_val)
+        self.active = True
+        self.is_transitioning = False
+        self._schedule(when + final_period, self._tick)
+
+    def _tick(self, when):
+        """持續滾動 (對應 AHK: AutoScroll Timer)；過渡 tick 執行完後回到穩定週期"""
+        self._timer = None
+        now = self.clock()
+        self._emit(EVENT_SCROLL, now, self.last_val)
+        self.is_transitioning = False
+
+        # 從排定時間往後排，避免每次喚醒延遲累積成漂移；
+        # 落後超過一個週期時 (例如系統睡眠) 從現在重新起算，不補發
+        period = self.period_for(self.last_val)
+        next_time = when + period
+        if next_time <= now:
+            next_time = now + period
+        self._schedule(next_time, self._tick)
+
+
+# ================= 模擬 =================
+
+class ManualClock:
+    """手動推進的時鐘，讓模擬不需要真的等待"""
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance_to(self, t):
+        if t > self.now:
+            self.now = t
+
+
+def simulate(gesture, speeds=None, tick_resolution=0.001, duration=None):
+    """
+    以離散事件方式重播手勢，不實際等待。
+    gesture: [(秒, shuttle 值), ...]，例如 [(0, 3), (1.0, 7), (2.0, 2), (3.0, 0)]
+    tick_resolution: 模擬 HID 迴圈把 timeout 進位到整數毫秒造成的延遲
+    回傳事件清單 [(kind, t, value), ...]
+    """
+    clock = ManualClock()
+    events = []
+    engine = ShuttleEngine(clock=clock, speeds=speeds,
+                           listener=lambda kind, t, value: events.append((kind, t, value)))
+    gesture = sorted(gesture)
+    end = duration if duration is not None else (gesture[-1][0] if gesture else 0.0)
+    i = 0
+    while True:
+        next_input = gesture[i][0] if i < len(gesture) else None
+        deadline = engine.next_deadline()
+        if deadline is not None and tick_resolution:
+            # 迴圈以整數毫秒等待，實際喚醒時間會往後進位
+            steps = -(-(deadline - clock.now) // tick_resolution)
+            deadline = clock.now + max(steps, 1) * tick_resolution
+        candidates = [t for t in (next_input, deadline) if t is not None]
+        if not candidates:
+            break
+        t = min(candidates)
+        if t > end and next_input is None:
+            break
+        clock.advance_to(t)
+        if next_input is not None and t >= next_input:
+            engine.update(gesture[i][1])
+            i += 1
+        engine.run_due()
+    return events
+
+
+def analyze(events, speeds=None):
+    """
+    依模擬事件計算：
+    - 每段穩定速度的實際滾動間隔 vs 設定週期 (平均誤差 / 最大誤差)
+    - 每次數值改變到該速度第一次滾動的延遲
+    """
+    speeds = speeds if speeds is not None else DEFAULT_SPEEDS
+    segments = []
+    current = None
+    for kind, t, value in events:
+        if kind == EVENT_VALUE:
+            current = {"value": value, "changed_at": t, "scrolls": []}
+            segments.append(current)
+        elif kind == EVENT_SCROLL and current is not None:
+            current["scrolls"].append(t)
+
+    report = []
+    for seg in segments:
+        value = seg["value"]
+        if value == 0:
+            continue
+        expected = speeds[min(max(abs(value) - 1, 0), 6)] / 1000.0
+        scrolls = seg["scrolls"]
+        intervals = [b - a for a, b in zip(scrolls, scrolls[1:])]
+        # 第一個間隔可能是過渡期，穩定間隔從第二個開始算
+        steady = intervals[1:] if len(intervals) > 1 else intervals
+        errors = [iv - expected for iv in steady]
+        report.append({
+            "value": value,
+            "expected_ms": expected * 1000.0,
+            "first_scroll_delay_ms": (scrolls[0] - seg["changed_at"]) * 1000.0 if scrolls else None,
+            "scrolls": len(scrolls),
+            "mean_interval_ms": (sum(steady) / len(steady) * 1000.0) if steady else None,
+            "mean_jitter_ms": (sum(abs(e) for e in errors) / len(errors) * 1000.0) if errors else None,
+            "max_jitter_ms": (max(abs(e) for e in errors) * 1000.0) if errors else None,
+        })
+    return report
@@ -0,0 +1,166 @@
+"""
+前景 App 偵測
+macOS 上訂閱 NSWorkspace 的 App 啟用通知，切換 App 時立即回呼，
+不再每秒輪詢；FixedFocusProvider 固定回報同一個 App，
+FakeFocusProvider 讓沒有 AppKit 的環境也能推送切換事件 (測試用)。
+"""
+import threading
+import time
+
+# 這些系統程式取得焦點時不切換 Profile
+IGNORED_APPS = ("System Events", "loginwindow", "Control Center", "Notification Center")
+
+
+class AppFocusProvider:
+    """前景 App 來源介面：callback(app_name) 在 App 切換時被呼叫"""
+
+    # 通知要靠主執行緒的 NSRunLoop 送達 (沒有 rumps 的 daemon 要自己跑 run loop)
+    needs_run_loop = False
+
+    def current(self):
+        """目前前景 App 名稱"""
+        raise NotImplementedError
+
+    def start(self, callback):
+        raise NotImplementedError
+
+    def stop(self):
+        pass
+
+
+_observer_class = None
+
+
+def _get_observer_class():
+    """Objective-C 類別只能註冊一次，第一次使用時才建立"""
+    global _observer_class
+    if _observer_class is None:
+        from Foundation import NSObject
+
+        class ShuttleFocusObserver(NSObject):
+            def appActivated_(self, notification):
+                app = notification.userInfo().get("NSWorkspaceApplicationKey")
+                name = app.localizedName() if app is not None else None
+                self.callback(str(name) if name else "Unknown")
+
+        _observer_class = ShuttleFocusObserver
+    return _observer_class
+
+
+class NSWorkspaceFocusProvider(AppFocusProvider):
+    """訂閱 NSWorkspaceDidActivateApplicationNotification (回呼在主執行緒)"""
+
+    needs_run_loop = True
+
+    def __init__(self):
+        self._observer = None
+
+    def current(self):
+        try:
+            from AppKit import NSWorkspace
+            app = NSWorkspace.sharedWorkspace().activeApplication()
+            return app.get('NSApplicationName', "Unknown")
+        except:
+            return "Unknown"
+
+    def start(self, callback):
+        from AppKit import NSWorkspace
+        observer = _get_observer_class().alloc().init()
+        observer.callback = callback
+        NSWorkspace.sharedWorkspace().notificationCenter().addObserver_selector_name_object_(
+            observer, "appActivated:", "NSWorkspaceDidActivateApplicationNotification", None)
+        self._observer = observer
+
+    def stop(self):
+        if self._observer is None: return
+        from AppKit import NSWorkspace
+        NSWorkspace.sharedWorkspace().notificationCenter().removeObserver_(self._observer)
+        self._observer = None
+
+
+class PollingFocusProvider(AppFocusProvider):
+    """備援：以固定間隔呼叫 get_app() 比對 (回呼在輪詢執行緒)"""
+
+    def __init__(self, get_app, interval=1.0):
+        self.get_app = get_app
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def current(self):
+        return self.get_app()
+
+    def start(self, callback):
+        self._stop_event.clear()
+
+        def run():
+            last = None
+            while not self._stop_event.wait(self.interval):
+                app = self.get_app()
+                if app != last:
+                    last = app
+                    callback(app)
+
+        self._thread = threading.Thread(target=run, name="FocusPoller")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class FixedFocusProvider(AppFocusProvider):
+    """永遠回報同一個 App (daemon 的 --app)，不偵測也不回呼"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def current(self):
+        return self.app
+
+    def start(self, callback):
+        pass
+
+
+def appkit_available():
+    """是否可使用 NSWorkspaceFocusProvider (有安裝 PyObjC，只檢查不載入)"""
+    import importlib.util
+    return importlib.util.find_spec("AppKit") is not None
+
+
+def lsappinfo_front_app():
+    """
+    以 lsappinfo 取得前景 App 名稱 (不載入 AppKit，給 headless daemon 搭配 PollingFocusProvider)
+    每次呼叫啟動兩個短命行程，失敗時回傳 "Unknown"
+    """
+    import subprocess
+    try:
+        asn = subprocess.run(["lsappinfo", "front"], capture_output=True, text=True, timeout=1.0).stdout.strip()
+        if not asn:
+            return "Unknown"
+        out = subprocess.run(["lsappinfo", "info", "-only", "name", asn],
+                             capture_output=True, text=True, timeout=1.0).stdout
+    except (OSError, subprocess.SubprocessError):
+        return "Unknown"
+    # 輸出格式: "LSDisplayName"="Safari"
+    _, sep, value = out.strip().partition("=")
+    return value.strip().strip('"') if sep and value.strip('" ') else "Unknown"
+
+
+class FakeFocusProvider(FixedFocusProvider):
+    """測試用：push() 立即在呼叫端執行緒回呼，並記錄推送時間"""
+
+    def __init__(self, app="Unknown", clock=time.monotonic):
+        FixedFocusProvider.__init__(self, app)
+        self.clock = clock
+        self.callback = None
+        self.pushed = []  # [(時間, app)]
+
+    def start(self, callback):
+        self.callback = callback
+
+    def push(self, app):
+        self.app = app
+        self.pushed.append((self.clock(), app))
+        if self.callback is not None:
+            self.callback(app)
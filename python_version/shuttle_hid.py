@@ -0,0 +1,134 @@
+"""
+HID 後端
+ShuttleController 透過這裡的介面存取裝置，
+可替換成 FakeHidBackend 在沒有實體 ShuttlePro 的環境 (例如 Linux CI) 測試與量測。
+"""
+import threading
+import time
+
+
+class HidBackend:
+    """HID 後端介面：open / read (含 timeout) / close / product string"""
+
+    def open(self, vid, pid):
+        """開啟裝置，失敗時丟出 IOError"""
+        raise NotImplementedError
+
+    def read(self, max_length, timeout_ms=0):
+        """
+        讀取一個報告 (list of int)，沒有資料回傳空 list。
+        timeout_ms = 0 代表不等待，> 0 代表最多等待的毫秒數。
+        """
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+    def get_product_string(self):
+        raise NotImplementedError
+
+
+class HidapiBackend(HidBackend):
+    """使用 hidapi (hid.device) 的實體裝置後端"""
+
+    def __init__(self):
+        self._dev = None
+
+    def open(self, vid, pid):
+        import hid
+        dev = hid.device()
+        dev.open(vid, pid)
+        # 非阻塞模式下 read(n) 立即返回；read(n, timeout_ms>0) 則走 hid_read_timeout 等待
+        dev.set_nonblocking(1)
+        self._dev = dev
+
+    def read(self, max_length, timeout_ms=0):
+        if timeout_ms > 0:
+            return self._dev.read(max_length, timeout_ms)
+        return self._dev.read(max_length)
+
+    def close(self):
+        if self._dev is not None:
+            try: self._dev.close()
+            finally: self._dev = None
+
+    def get_product_string(self):
+        return self._dev.get_product_string()
+
+
+class FakeHidBackend(HidBackend):
+    """
+    記憶體內的假裝置，依照腳本在指定時間點送出報告。
+    script: [(相對 open 的秒數, report), ...]，也可以執行中用 push() 插入報告。
+    """
+
+    def __init__(self, script=None, product="Fake ShuttlePro v2", clock=time.monotonic):
+        self.product = product
+        self.clock = clock
+        self.connected = True      # 設為 False 模擬裝置拔除 (open / read 會失敗)
+        self.is_open = False
+        self.open_count = 0
+        self.read_calls = 0
+        self.start_time = None
+        self._queue = []           # [(絕對時間, report)]，依時間排序
+        self._cond = threading.Condition()
+        self._script = list(script or [])
+
+    def open(self, vid, pid):
+        if not self.connected:
+            raise IOError("fake device disconnected")
+        with self._cond:
+            self.is_open = True
+            self.open_count += 1
+            if self.start_time is None:
+                self.start_time = self.clock()
+                for offset, report in self._script:
+                    self._queue.append((self.start_time + offset, list(report)))
+                self._queue.sort(key=lambda item: item[0])
+
+    def push(self, report, delay=0.0):
+        """插入一個報告，在 delay 秒後變成可讀取"""
+        with self._cond:
+            self._queue.append((self.clock() + delay, list(report)))
+            self._queue.sort(key=lambda item: item[0])
+            self._cond.notify_all()
+
+    def disconnect(self):
+        """模擬拔除裝置，讓正在等待的 read 立即失敗"""
+        with self._cond:
+            self.connected = False
+            self._cond.notify_all()
+
+    def pending(self):
+        with self._cond:
+            return len(self._queue)
+
+    def read(self, max_length, timeout_ms=0):
+        self.read_calls += 1
+        deadline = self.clock() + timeout_ms / 1000.0
+        with self._cond:
+            while True:
+                if not self.connected or not self.is_open:
+                    raise IOError("fake device disconnected")
+                now = self.clock()
+                if self._queue and self._queue[0][0] <= now:
+                    return self._queue.pop(0)[1][:max_length]
+                if now >= deadline:
+                    return []
+                wait = deadline - now
+                if self._queue:
+                    wait = min(wait, self._queue[0][0] - now)
+                self._cond.wait(wait)
+
+    def close(self):
+        with self._cond:
+            self.is_open = False
+            self._cond.notify_all()
+
+    def get_product_string(self):
+        return self.product
+
+
+def make_report(shuttle=0, jog=0, buttons=0):
+    """組出 ShuttlePro v2 格式的 5 bytes 報告 (shuttle 為 -7 ~ 7)"""
+    return [shuttle & 0xFF, jog & 0xFF, 0, buttons & 0xFF, (buttons >> 8) & 0xFF]
@@ -0,0 +1,213 @@
+"""
+按鍵注入
+把 "command+t" 之類的按鍵定義轉成 Mac Key Code，再交給長駐的 sink 送出，
+避免每按一次就啟動一個 osascript 行程。
+"""
+import threading
+import time
+
+MAC_KEY_CODES = {
+    "a": 0, "s": 1, "d": 2, "f": 3, "h": 4, "g": 5, "z": 6, "x": 7, "c": 8, "v": 9,
+    "b": 11, "q": 12, "w": 13, "e": 14, "r": 15, "y": 16, "t": 17, "1": 18, "2": 19,
+    "3": 20, "4": 21, "6": 22, "5": 23, "=": 24, "9": 25, "7": 26, "-": 27, "8": 28,
+    "0": 29, "]": 30, "o": 31, "u": 32, "[": 33, "i": 34, "p": 35, "l": 37, "j": 38,
+    "'": 39, "k": 40, ";": 41, "\\": 42, ",": 43, "/": 44, "n": 45, "m": 46, ".": 47,
+    "tab": 48, "space": 49, "`": 50, "delete": 51, "enter": 36, "escape": 53,
+    "down": 125, "up": 126, "left": 123, "right": 124, "f1": 122, "f2": 120, "f3": 99,
+    "f4": 118, "f5": 96, "f6": 97, "f7": 98, "f8": 100, "f9": 101, "f10": 109,
+    "f11": 103, "f12": 111, "command": 55, "shift": 56, "capslock": 57, "option": 58,
+    "control": 59, "right_command": 54, "right_shift": 60, "right_option": 61,
+    "right_control": 62, "fn": 63
+}
+
+# 修飾鍵別名 -> 標準名稱 (順序即 AppleScript "using {...}" 的輸出順序)
+MODIFIER_ALIASES = {
+    "command": "command", "cmd": "command",
+    "shift": "shift",
+    "control": "control", "ctrl": "control",
+    "option": "option", "alt": "option",
+}
+MODIFIER_ORDER = ("command", "shift", "control", "option")
+
+
+def parse_key_def(key_def):
+    """
+    "command+shift+t" -> (17, ("command", "shift"))
+    無法對應 Key Code 時回傳 None
+    """
+    key_lower = key_def.lower()
+    base_key = key_lower
+    modifiers = ()
+
+    if "+" in key_lower:
+        parts = key_lower.split("+")
+        base_key = parts[-1]
+        names = {MODIFIER_ALIASES[p] for p in parts if p in MODIFIER_ALIASES}
+        modifiers = tuple(m for m in MODIFIER_ORDER if m in names)
+
+    if base_key in MAC_KEY_CODES:
+        return MAC_KEY_CODES[base_key], modifiers
+    if key_def == "Key.down":  # 兼容舊設定
+        return 125, modifiers
+    return None
+
+
+def applescript_key_command(key_code, modifiers):
+    mod_str = ""
+    if modifiers:
+        mod_str = " using {" + ", ".join(f"{m} down" for m in modifiers) + "}"
+    return f'tell application "System Events" to key code {key_code}{mod_str}'
+
+
+def applescript_keystroke_command(text):
+    """不在 Key Code 表內的字元 (例如 "!") 改用 keystroke 輸入"""
+    escaped = text.replace("\\", "\\\\").replace('"', '\\"')
+    return f'tell application "System Events" to keystroke "{escaped}"'
+
+
+# ================= Sinks =================
+
+class KeySink:
+    """按鍵輸出介面"""
+
+    def send_key(self, key_code, modifiers=()):
+        raise NotImplementedError
+
+    def send_text(self, text):
+        """輸入沒有 Key Code 的字元 (不支援的 sink 丟出 NotImplementedError)"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SubprocessOsascriptSink(KeySink):
+    """舊作法：每次按鍵都啟動一個 osascript (保留作為基準比較與備援)"""
+
+    def __init__(self, command=("osascript", "-e")):
+        self.command = list(command)
+
+    def send_key(self, key_code, modifiers=()):
+        import subprocess
+        cmd = applescript_key_command(key_code, modifiers)
+        subprocess.run(self.command + [cmd], check=False)
+
+
+class PersistentOsascriptSink(KeySink):
+    """
+    長駐的 osascript 互動模式 (osascript -i)，每次按鍵只寫一行到 pipe。
+    行程意外結束時會在下一次按鍵自動重啟。
+    """
+
+    def __init__(self, command=("osascript", "-i")):
+        self.command = list(command)
+        self.proc = None
+        self.lock = threading.Lock()
+
+    def _spawn(self):
+        # subprocess 只有 sink 真的要送出按鍵時才載入 (縮短啟動時間)
+        import subprocess
+        self.proc = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def send_key(self, key_code, modifiers=()):
+        self._write_line(applescript_key_command(key_code, modifiers))
+
+    def send_text(self, text):
+        self._write_line(applescript_keystroke_command(text))
+
+    def _write_line(self, command):
+        line = (command + "\n").encode("utf-8")
+        with self.lock:
+            for attempt in range(2):
+                if self.proc is None or self.proc.poll() is not None:
+                    self._spawn()
+                try:
+                    self.proc.stdin.write(line)
+                    self.proc.stdin.flush()
+                    return
+                except (BrokenPipeError, OSError):
+                    self.proc = None
+                    if attempt: raise
+
+    def close(self):
+        with self.lock:
+            if self.proc is None: return
+            try:
+                self.proc.stdin.close()
+                self.proc.wait(timeout=1.0)
+            except Exception:
+                self.proc.kill()
+            self.proc = None
+
+
+class QuartzEventSink(KeySink):
+    """
+    直接以 CGEventPost 送出鍵盤事件 (需要 pyobjc-framework-Quartz)。
+    沒有經過 System Events，RDP 穿透效果請自行確認。
+    """
+
+    FLAG_MASKS = {"command": 1 << 20, "shift": 1 << 17, "control": 1 << 18, "option": 1 << 19}
+
+    def __init__(self):
+        import Quartz
+        self.Quartz = Quartz
+
+    def send_key(self, key_code, modifiers=()):
+        q = self.Quartz
+        flags = 0
+        for m in modifiers:
+            flags |= self.FLAG_MASKS[m]
+        for is_down in (True, False):
+            event = q.CGEventCreateKeyboardEvent(None, key_code, is_down)
+            if flags:
+                q.CGEventSetFlags(event, flags)
+            q.CGEventPost(q.kCGHIDEventTap, event)
+
+
+class QuartzScrollSink:
+    """
+    以 CGEventCreateScrollWheelEvent 送出滾動 (headless daemon 用，不需要 pynput)。
+    Quartz 在第一次滾動時才載入。
+    """
+
+    # 每一格滾動的像素數 (與 pynput 在 macOS 上的換算相同)
+    PIXELS_PER_STEP = 10
+
+    def __init__(self):
+        self.Quartz = None
+
+    def scroll(self, dy):
+        q = self.Quartz
+        if q is None:
+            import Quartz
+            q = self.Quartz = Quartz
+        event = q.CGEventCreateScrollWheelEvent(None, q.kCGScrollEventUnitPixel, 1, int(dy) * self.PIXELS_PER_STEP)
+        q.CGEventPost(q.kCGHIDEventTap, event)
+
+
+class RecordingSink(KeySink):
+    """測試用：只記錄 (時間, key_code, modifiers)；send_text 記錄為 (時間, None, text)，scroll 記錄在 scrolls"""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.events = []
+        self.scrolls = []
+
+    def send_key(self, key_code, modifiers=()):
+        self.events.append((self.clock(), key_code, tuple(modifiers)))
+
+    def send_text(self, text):
+        self.events.append((self.clock(), None, text))
+
+    def scroll(self, dy):
+        self.scrolls.append((self.clock(), dy))
+
+
+def create_default_sink():
+    """預設使用長駐 osascript，維持與原本 key code 注入相同的 RDP 穿透行為"""
+    return PersistentOsascriptSink()
@@ -0,0 +1,134 @@
+"""
+Jog (內圈) 速度感應加速
+以滑動視窗內的格數換算轉速 (格/秒)，再依 Profile 的加速曲線換算倍率：
+慢慢轉時每格滾動量可以比 jog_multiplier 小 (精細)，快速轉時放大 (長距離)。
+轉速只在收到 Jog 報告時以報告的時間計算，不需要額外的 timer 或喚醒。
+
+Profile 設定 "jog_acceleration":
+  {"curve": "linear", "window_ms": 150, "threshold": 10, "slope": 0.1, "max_gain": 8}
+  {"curve": "exponential", "threshold": 10, "factor": 0.05, "max_gain": 8}
+  {"curve": "table", "table": [[0, 0.34], [10, 1], [30, 3], [80, 8]]}
+threshold 以下的倍率為 min_gain (預設 1)；table 為 [格/秒, 倍率] 的線性內插。
+倍率只會隨轉速遞增 (slope / factor 不可為負，table 的倍率不可遞減)。
+"""
+import math
+from collections import deque
+
+DEFAULT_WINDOW = 0.15    # 滑動視窗 (秒)
+DEFAULT_THRESHOLD = 10.0 # 開始加速的轉速 (格/秒)
+DEFAULT_MAX_GAIN = 8.0
+
+CURVES = ("linear", "exponential", "table")
+
+
+def _number(raw, key, default):
+    """有限的數字 (拒絕 NaN / inf)，否則丟出 ValueError"""
+    value = float(raw.get(key, default))
+    if not math.isfinite(value):
+        raise ValueError(f"{key} 必須是有限的數字")
+    return value
+
+
+class JogCurve:
+    """已編譯的加速曲線 (不可變)；參數無效時丟出 ValueError"""
+    __slots__ = ("kind", "window", "threshold", "min_gain", "max_gain", "slope", "factor", "points")
+
+    def __init__(self, raw):
+        init = object.__setattr__
+        kind = raw.get("curve", "linear")
+        if kind not in CURVES:
+            raise ValueError(f"curve 必須是 {' / '.join(CURVES)}: {kind!r}")
+        window = _number(raw, "window_ms", DEFAULT_WINDOW * 1000) / 1000.0
+        if window <= 0:
+            raise ValueError("window_ms 必須大於 0")
+        max_gain = _number(raw, "max_gain", DEFAULT_MAX_GAIN)
+        min_gain = _number(raw, "min_gain", 1.0)
+        if not 0 < min_gain <= max_gain:
+            raise ValueError("必須 0 < min_gain <= max_gain")
+        threshold = _number(raw, "threshold", DEFAULT_THRESHOLD)
+        slope = _number(raw, "slope", 0.1)
+        factor = _number(raw, "factor", 0.05)
+        if threshold < 0 or slope < 0 or factor < 0:
+            raise ValueError("threshold / slope / factor 不可為負")
+
+        points = ()
+        if kind == "table":
+            table = raw.get("table")
+            if (not isinstance(table, list) or not table
+                    or not all(isinstance(p, (list, tuple)) and len(p) == 2 for p in table)):
+                raise ValueError("table 必須是 [[格/秒, 倍率], ...]")
+            points = tuple(sorted((float(v), float(g)) for v, g in table))
+            if not all(math.isfinite(v) and math.isfinite(g) for v, g in points):
+                raise ValueError("table 必須是有限的數字")
+            if points[0][0] < 0:
+                raise ValueError("table 的轉速不可為負")
+            if any(g <= 0 for _, g in points):
+                raise ValueError("table 的倍率必須大於 0")
+            for (v0, g0), (v1, g1) in zip(points, points[1:]):
+                if v0 == v1:
+                    raise ValueError(f"table 的轉速重複: {v0:g}")
+                if g1 < g0:
+                    raise ValueError("table 的倍率不可隨轉速遞減")
+
+        init(self, "kind", kind)
+        init(self, "window", window)
+        init(self, "threshold", threshold)
+        init(self, "min_gain", min_gain)
+        init(self, "max_gain", max_gain)
+        init(self, "slope", slope)
+        init(self, "factor", factor)
+        init(self, "points", points)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("JogCurve 為唯讀")
+
+    def gain(self, velocity):
+        """轉速 (格/秒) -> 每格滾動量的倍率"""
+        if self.kind == "table":
+            points = self.points
+            if velocity <= points[0][0]:
+                return points[0][1]
+            for (v0, g0), (v1, g1) in zip(points, points[1:]):
+                if velocity <= v1:
+                    return g0 + (g1 - g0) * (velocity - v0) / (v1 - v0)
+            return points[-1][1]
+
+        over = velocity - self.threshold
+        if over <= 0:
+            return self.min_gain
+        if self.kind == "linear":
+            gain = 1.0 + self.slope * over
+        else:
+            gain = math.exp(min(self.factor * over, 50.0))
+        return min(max(gain, self.min_gain), self.max_gain)
+
+
+class JogVelocity:
+    """[HID 執行緒] 滑動視窗轉速：視窗內的格數 / 視窗長度，換方向時重新計算"""
+    __slots__ = ("_samples", "_total", "_direction")
+
+    def __init__(self):
+        self._samples = deque()  # (時間, 格數)
+        self._total = 0
+        self._direction = 0
+
+    def reset(self):
+        self._samples.clear()
+        self._total = 0
+        self._direction = 0
+
+    def update(self, now, diff, window):
+        """加入本批次的 diff 格並回傳目前轉速 (格/秒)"""
+        direction = 1 if diff > 0 else -1
+        if direction != self._direction:
+            # 反轉方向通常是在找精確位置，不沿用前一個方向的速度
+            self.reset()
+            self._direction = direction
+        samples = self._samples
+        count = diff if diff > 0 else -diff
+        samples.append((now, count))
+        self._total += count
+        cutoff = now - window
+        while samples[0][0] <= cutoff:
+            self._total -= samples.popleft()[1]
+        return self._total / window
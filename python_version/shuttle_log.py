@@ -0,0 +1,204 @@
+"""
+環狀緩衝事件紀錄 (取代熱路徑上的 print)
+呼叫端 (HID / 輸出執行緒) 只把 (序號, 時間, 等級, 樣板, 參數) 放進預先配置的固定格數緩衝，
+不格式化、不寫檔、不上鎖；由背景執行緒定期格式化並寫到 stdout。
+stdout 被 log daemon 的 pipe 卡住時只有背景執行緒會等待，
+緩衝滿了就覆蓋最舊的紀錄 (計入 lost)，輸入處理不受影響。
+
+用法:
+    from shuttle_log import log
+    log.info("✅ HID 裝置已連接: {}", product)
+"""
+import atexit
+import itertools
+import sys
+import threading
+import time
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARN", ERROR: "ERROR"}
+LEVELS = {"debug": DEBUG, "info": INFO, "warning": WARNING, "warn": WARNING, "error": ERROR}
+
+DEFAULT_CAPACITY = 4096  # 必須是 2 的次方
+FLUSH_INTERVAL = 0.25    # 背景執行緒寫出間隔 (秒)
+
+
+class RingLogger:
+    """
+    多個執行緒可同時寫入：序號來自 itertools.count (next() 在 GIL 下為原子操作)，
+    每筆紀錄寫入自己的格子；讀取端以格子內的序號判斷是否尚未寫入或已被覆蓋。
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, stream=None, level=INFO, sampling=None,
+                 flush_interval=FLUSH_INTERVAL, clock=time.time):
+        if capacity & (capacity - 1):
+            raise ValueError("capacity 必須是 2 的次方")
+        self.capacity = capacity
+        self._mask = capacity - 1
+        self._slots = [None] * capacity
+        self._seq = itertools.count()
+        self.head = 0      # 下一個序號 (約略值，只供讀取端判斷範圍)
+        self.flushed = 0   # 已寫出到 stream 的序號
+        self.lost = 0      # 寫出前就被覆蓋的紀錄
+        self.sampled_out = 0
+        self.stream = stream
+        self.clock = clock
+        self.flush_interval = flush_interval
+
+        # 各等級的取樣：每 N 筆保留 1 筆 (以 level // 10 為 index)
+        self.level = level
+        self._sample = [1] * (ERROR // 10 + 1)
+        self._seen = [0] * (ERROR // 10 + 1)
+        if sampling:
+            self.set_sampling(sampling)
+
+        self._lock = threading.Lock()  # 只保護背景執行緒的啟動與 flush
+        self._thread = None
+        self._stop = threading.Event()
+        self._closed = False  # close() 之後不再啟動背景執行緒 (例如程式結束中)
+
+    # --- 設定 ---
+
+    def set_sampling(self, sampling):
+        """{"info": 10} 或 {INFO: 10}：該等級每 10 筆只保留 1 筆 (ERROR 不建議取樣)"""
+        for level, every in sampling.items():
+            if isinstance(level, str):
+                level = LEVELS[level.lower()]
+            self._sample[level // 10] = max(1, int(every))
+
+    def configure(self, level=None, sampling=None):
+        if level is not None:
+            self.level = LEVELS[level.lower()] if isinstance(level, str) else level
+        if sampling is not None:
+            self._sample = [1] * len(self._sample)
+            self.set_sampling(sampling)
+
+    # --- 寫入 (熱路徑) ---
+
+    def log(self, level, template, *args):
+        if level < self.level: return
+        index = level // 10
+        every = self._sample[index]
+        if every != 1:
+            # 計數不上鎖：多執行緒同時寫入時取樣比例只是近似值
+            seen = self._seen[index]
+            self._seen[index] = seen + 1
+            if seen % every:
+                self.sampled_out += 1
+                return
+        seq = next(self._seq)
+        self._slots[seq & self._mask] = (seq, self.clock(), level, template, args)
+        if seq >= self.head:
+            self.head = seq + 1
+        if self._thread is None and not self._closed:
+            self._start()
+
+    def debug(self, template, *args):
+        self.log(DEBUG, template, *args)
+
+    def info(self, template, *args):
+        self.log(INFO, template, *args)
+
+    def warning(self, template, *args):
+        self.log(WARNING, template, *args)
+
+    def error(self, template, *args):
+        self.log(ERROR, template, *args)
+
+    # --- 背景寫出 ---
+
+    def _start(self):
+        with self._lock:
+            if self._thread is not None: return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="RingLogger")
+            self._thread.daemon = True
+            self._thread.start()
+            atexit.register(self.close)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def _collect(self, start, end):
+        """回傳 (紀錄, 下一個要讀的序號)；遇到尚未寫入完成的格子就停下"""
+        records = []
+        slots, mask = self._slots, self._mask
+        seq = start
+        while seq < end:
+            rec = slots[seq & mask]
+            if rec is None or rec[0] < seq:
+                break  # 序號已分配但還沒寫入
+            if rec[0] == seq:
+                records.append(rec)
+            seq += 1
+        return records, seq
+
+    def flush(self):
+        """[背景執行緒] 格式化並寫出尚未寫出的紀錄"""
+        with self._lock:
+            head = self.head
+            start = self.flushed
+            if head - start > self.capacity:
+                self.lost += head - self.capacity - start
+                start = head - self.capacity
+            records, self.flushed = self._collect(start, head)
+            # 讀取期間被覆蓋的格子 (格子內序號比預期新)
+            self.lost += (self.flushed - start) - len(records)
+        if not records: return
+        text = "".join(format_record(rec) + "\n" for rec in records)
+        stream = self.stream or sys.stdout
+        try:
+            stream.write(text)
+            stream.flush()
+        except (OSError, ValueError):
+            pass
+
+    def close(self):
+        """停止背景執行緒並寫出剩下的紀錄"""
+        self._closed = True
+        thread = self._thread
+        if thread is not None:
+            self._stop.set()
+            thread.join(timeout=1.0)
+            self._thread = None
+        self.flush()
+
+    # --- 查詢 ---
+
+    def last(self, n):
+        """最近 n 筆紀錄 (已格式化，不論是否已寫出)"""
+        head = self.head
+        start = max(0, head - min(n, self.capacity))
+        records, _ = self._collect(start, head)
+        return [format_record(rec) for rec in records]
+
+    def dump(self, path, n):
+        lines = self.last(n)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        return len(lines)
+
+    def stats(self):
+        return {"written": self.head, "flushed": self.flushed, "lost": self.lost,
+                "sampled_out": self.sampled_out}
+
+
+def format_record(rec):
+    _, t, level, template, args = rec
+    stamp = time.strftime("%H:%M:%S", time.localtime(t)) + f".{int(t * 1000) % 1000:03d}"
+    if args:
+        try:
+            message = template.format(*args)
+        except (IndexError, KeyError, ValueError):
+            message = f"{template} {args!r}"
+    else:
+        message = template
+    return f"{stamp} {LEVEL_NAMES.get(level, level)} {message}"
+
+
+# 整個程式共用的紀錄器
+log = RingLogger()
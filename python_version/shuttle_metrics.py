@@ -0,0 +1,148 @@
+"""
+本機監控端點
+在 127.0.0.1 提供 HTTP：
+  GET /metrics       Prometheus 文字格式
+  GET /metrics.json  JSON
+只讀取輸入核心的計數屬性 (int 讀取不需上鎖)，不會呼叫或等待 HID 執行緒。
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_METRICS_PORT = 9477
+METRIC_PREFIX = "macshuttle_"
+
+# (名稱, 核心屬性, 類型, 說明)
+COUNTERS = (
+    ("reports_read_total", "reports_read", "counter", "HID reports read"),
+    ("reports_merged_total", "reports_merged", "counter", "Reports merged into an earlier report of the same batch"),
+    ("batches_total", "batch_count", "counter", "Report batches handled"),
+    ("shuttle_scrolls_total", "shuttle_scrolls", "counter", "Scroll events emitted by the shuttle ring"),
+    ("jog_scrolls_total", "jog_events", "counter", "Scroll events emitted by the jog wheel"),
+    ("key_injections_total", "key_injections", "counter", "Key actions injected"),
+    ("injection_failures_total", "injection_failures", "counter", "Key injections that failed or fell back"),
+    ("connects_total", "connects", "counter", "Successful HID connects (reconnects = connects - 1)"),
+    ("connect_failures_total", "connect_failures", "counter", "Failed HID connect attempts"),
+    ("read_errors_total", "read_errors", "counter", "HID read errors (device lost)"),
+    ("config_reloads_total", "config_reloads", "counter", "Configs applied"),
+    ("config_errors_total", "config_errors", "counter", "Configs rejected as invalid plus invalid entries disabled when applying a config"),
+    ("profile_switches_total", "profile_switches", "counter", "Active profile switches"),
+    ("loop_wakeups_total", "loop_wakeups", "counter", "HID loop wakeups"),
+    ("max_batch_size", "max_batch_size", "gauge", "Largest report batch seen"),
+)
+
+# 報告速率以兩次取樣的差值計算，取樣間隔至少這麼久 (秒)
+RATE_MIN_INTERVAL = 1.0
+
+
+class MetricsCollector:
+    """從核心讀取計數並計算 reports/s (呼叫端執行緒，不碰 HID 執行緒)"""
+
+    def __init__(self, core, clock=time.monotonic):
+        self.core = core
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._sample = None  # (時間, reports_read)
+        self._rate = 0.0
+
+    def collect(self):
+        core = self.core
+        values = {name: getattr(core, attr, 0) for name, attr, _, _ in COUNTERS}
+
+        now = self.clock()
+        reports = values["reports_read_total"]
+        with self._lock:
+            if self._sample is None:
+                self._sample = (now, reports)
+            elif now - self._sample[0] >= RATE_MIN_INTERVAL:
+                t, count = self._sample
+                self._rate = (reports - count) / (now - t)
+                self._sample = (now, reports)
+            values["reports_per_second"] = self._rate
+
+        values["device_connected"] = int(core.device is not None)
+        values["enabled"] = int(bool(core.is_enabled))
+        values["config_version"] = core.snapshot.version
+        output = getattr(core, "output", None)
+        if output is not None:
+            values["output_queue_depth"] = output.depth()
+            values["output_errors_total"] = output.errors
+        return values
+
+
+GAUGE_HELP = {
+    "reports_per_second": "HID reports read per second since the previous sample",
+    "device_connected": "1 while the HID device is open",
+    "enabled": "1 while input handling is enabled",
+    "config_version": "Version of the active config snapshot",
+    "output_queue_depth": "Pending outputs in the dispatcher queue",
+    "output_errors_total": "Exceptions raised by output callbacks",
+}
+
+
+def format_prometheus(values):
+    types = {name: kind for name, _, kind, _ in COUNTERS}
+    helps = {name: text for name, _, _, text in COUNTERS}
+    helps.update(GAUGE_HELP)
+    lines = []
+    for name, value in values.items():
+        kind = types.get(name, "counter" if name.endswith("_total") else "gauge")
+        lines.append(f"# HELP {METRIC_PREFIX}{name} {helps.get(name, name)}")
+        lines.append(f"# TYPE {METRIC_PREFIX}{name} {kind}")
+        lines.append(f"{METRIC_PREFIX}{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    collector = None
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/metrics":
+            body = format_prometheus(self.collector.collect()).encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif path == "/metrics.json":
+            body = json.dumps(self.collector.collect()).encode("utf-8")
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer:
+    """只綁定 loopback 的 HTTP 伺服器，在自己的執行緒處理請求"""
+
+    def __init__(self, core, port=DEFAULT_METRICS_PORT, host="127.0.0.1"):
+        self.collector = MetricsCollector(core)
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    @property
+    def address(self):
+        return self._server.server_address if self._server else None
+
+    def start(self):
+        handler = type("MetricsHandler", (_MetricsHandler,), {"collector": self.collector})
+        self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="MetricsServer")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        if self._server is None: return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        self._thread = None
@@ -0,0 +1,145 @@
+"""
+輸出佇列
+按鍵注入與滾動改由獨立的 dispatcher 執行緒依優先序執行，
+HID 執行緒只負責排入佇列，不會被緩慢的注入卡住。
+"""
+import heapq
+import itertools
+import threading
+import time
+
+from shuttle_timer import TimerHeap
+from shuttle_log import log
+
+# 數字越小越優先
+PRIORITY_KEY = 0     # 按鍵動作
+PRIORITY_SCROLL = 1  # 滾動 tick
+
+PRIORITY_NAMES = {PRIORITY_KEY: "key", PRIORITY_SCROLL: "scroll"}
+
+
+class WaitStats:
+    """單一優先序的等待時間統計 (排入 -> 開始執行)"""
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, wait):
+        self.count += 1
+        self.total += wait
+        if wait > self.max:
+            self.max = wait
+
+    def as_dict(self):
+        avg = self.total / self.count if self.count else 0.0
+        return {"count": self.count, "avg_ms": avg * 1000.0, "max_ms": self.max * 1000.0}
+
+
+class OutputDispatcher:
+    """
+    具優先序的輸出佇列 + 單一工作執行緒。
+    submit() 立即可執行，submit_later() 在指定秒數後才可執行 (例如按鍵放開)。
+    同時可執行的項目中，優先序高的先做；同優先序依排入順序。
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._ready = []    # (priority, seq, enqueue_time, func, args)
+        self._delayed = TimerHeap(clock)  # 到期後轉入 _ready (例如按鍵放開)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+        self.max_depth = 0
+        self.errors = 0
+        self.wait_stats = {p: WaitStats() for p in PRIORITY_NAMES}
+
+    def start(self):
+        with self._cond:
+            if self._running: return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="OutputDispatcher")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, drain=True, timeout=1.0):
+        """
+        停止工作執行緒。drain=True 時先把所有項目做完，
+        尚未到期的延遲項目 (例如按鍵放開) 也提前執行，避免按鍵停在按下狀態
+        """
+        with self._cond:
+            self._running = False
+            if drain:
+                self._delayed.run_all()
+            else:
+                self._ready.clear()
+                self._delayed.clear()
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, priority, func, *args):
+        now = self.clock()
+        with self._cond:
+            heapq.heappush(self._ready, (priority, next(self._seq), now, func, args))
+            self._update_depth()
+            self._cond.notify()
+
+    def submit_later(self, delay, priority, func, *args):
+        with self._cond:
+            self._delayed.call_later(delay, self._promote, priority, func, args)
+            self._update_depth()
+            self._cond.notify()
+
+    def _update_depth(self):
+        depth = len(self._ready) + len(self._delayed)
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def depth(self):
+        with self._cond:
+            return len(self._ready) + len(self._delayed)
+
+    def stats(self):
+        with self._cond:
+            result = {
+                "depth": len(self._ready) + len(self._delayed),
+                "max_depth": self.max_depth,
+                "errors": self.errors,
+            }
+            for p, name in PRIORITY_NAMES.items():
+                result[name] = self.wait_stats[p].as_dict()
+            return result
+
+    def _promote(self, due, priority, func, args):
+        """[持有 _cond] 把到期的延遲項目移到可執行佇列 (以到期時間當作排入時間)"""
+        heapq.heappush(self._ready, (priority, next(self._seq), due, func, args))
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    now = self.clock()
+                    self._delayed.run_due(now)
+                    if self._ready:
+                        break
+                    if not self._running:
+                        return
+                    timeout = None
+                    deadline = self._delayed.next_deadline()
+                    if deadline is not None:
+                        timeout = deadline - now
+                    self._cond.wait(timeout)
+                priority, seq, enqueued, func, args = heapq.heappop(self._ready)
+                self.wait_stats[priority].add(now - enqueued)
+
+            try:
+                func(*args)
+            except Exception as e:
+                self.errors += 1
+                log.warning("⚠️ Output Error: {}", e)
@@ -0,0 +1,221 @@
+"""
+設定檔寫入
+寫入先寫到同目錄的暫存檔，fsync 後再 rename 覆蓋，寫到一半當掉也不會截斷原檔；
+ConfigWriter 在背景執行緒延遲寫入，短時間內的多次編輯只寫最後一次。
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+
+from shuttle_log import log
+
+# 最後一次編輯後等待多久才寫入 (秒)
+WRITE_DELAY = 0.5
+
+# GUI (mac_shuttle) 與 headless daemon (shuttle_controller_cli) 共用的設定檔
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "shuttle_config.json")
+
+
+def dump_config(config):
+    """與原本 save_config_safe 相同的 JSON 格式"""
+    return json.dumps(config, indent=4, ensure_ascii=False)
+
+
+def write_atomic(path, text):
+    """寫入暫存檔 -> fsync -> os.replace，讀取端只會看到舊檔或完整的新檔"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        # 保留原檔權限 (mkstemp 預設為 0600)
+        try:
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o777)
+        except OSError:
+            pass
+        os.replace(tmp_path, path)
+    except BaseException:
+        try: os.unlink(tmp_path)
+        except OSError: pass
+        raise
+
+
+class ConfigWriter:
+    """
+    延遲 + 合併的設定寫入執行緒。
+    save() 只記下最新的設定 (dict 或有 to_dict() 的 ConfigSnapshot) 就返回，
+    最後一次 save() 之後 delay 秒才序列化並寫入；序列化也在寫入執行緒進行。
+    """
+
+    def __init__(self, path, delay=WRITE_DELAY, on_error=None, clock=time.monotonic):
+        self.path = path
+        self.delay = delay
+        self.on_error = on_error  # on_error(exception)，在寫入執行緒呼叫
+        self.clock = clock
+
+        self._pending = None
+        self._deadline = None
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()  # flush() 與寫入執行緒不會同時寫
+        self._running = False
+        self._thread = None
+
+        self.saves = 0      # save() 呼叫次數
+        self.writes = 0     # 實際寫入次數
+        self.coalesced = 0  # 被後來的 save() 取代而省下的寫入次數
+        self.errors = 0
+
+    def start(self):
+        with self._cond:
+            if self._running: return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="ConfigWriter")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        """停止寫入執行緒，尚未寫入的設定立即寫入 (離開程式時呼叫)"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def save(self, config):
+        """
+        排入寫入並回傳 True；persistable 為 False 的快照 (例如讀取失敗時的預設設定)
+        不寫入，回傳 False，避免以預設值蓋掉使用者的設定檔
+        """
+        if not getattr(config, "persistable", True):
+            log.warning("⚠️ 目前的設定不是完整的設定檔內容，不寫回 {}", self.path)
+            return False
+        with self._cond:
+            self.saves += 1
+            if self._pending is not None:
+                self.coalesced += 1
+            self._pending = config
+            self._deadline = self.clock() + self.delay
+            self._cond.notify()
+        return True
+
+    def pending(self):
+        """是否有尚未寫入的設定"""
+        with self._cond:
+            return self._pending is not None
+
+    def flush(self):
+        """立即寫入尚未寫入的設定 (呼叫端執行緒)，成功或無待寫入時回傳 True"""
+        with self._write_lock:
+            with self._cond:
+                config = self._pending
+                self._pending = None
+                self._deadline = None
+            if config is None:
+                return True
+            return self._write(config)
+
+    def stats(self):
+        with self._cond:
+            return {"saves": self.saves, "writes": self.writes,
+                    "coalesced": self.coalesced, "errors": self.errors,
+                    "pending": self._pending is not None}
+
+    def _write(self, config):
+        try:
+            if hasattr(config, "to_dict"):
+                config = config.to_dict()
+            write_atomic(self.path, dump_config(config))
+            self.writes += 1
+            return True
+        except Exception as e:
+            self.errors += 1
+            log.error("Save Error: {}", e)
+            if self.on_error is not None:
+                self.on_error(e)
+            return False
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if not self._running:
+                        return
+                    if self._deadline is not None:
+                        timeout = self._deadline - self.clock()
+                        if timeout <= 0:
+                            break
+                    else:
+                        timeout = None
+                    self._cond.wait(timeout)
+            self.flush()
+
+
+# ================= 設定檔管理 =================
+
+# 新版預設設定
+DEFAULT_CONFIG = {
+    "profiles": [
+        {
+            "name": "Windows Remote",
+            "apps": ["Windows App", "Microsoft Remote Desktop", "WindowsApp", "rdp"],
+            "speeds": [800, 600, 333, 200, 100, 50, 20],
+            "buttons": {
+                "1": "q", "2": "7", "3": "5", "4": "6", "5": "d",
+                "6": "8", "7": "1", "8": "9", "9": "4", "10": "x",
+                "11": "f", "12": "", "13": "w", "14": "o", "15": "down"
+            }
+        },
+        {
+            "name": "Chrome / Browser",
+            "apps": ["Google Chrome", "Safari", "Microsoft Edge", "Arc"],
+            "speeds": [500, 300, 150, 80, 40, 20, 10],
+            "buttons": {
+                "1": "command+t",
+                "2": "command+w",
+                "3": "command+r",
+                "13": "space"
+            }
+        },
+        {
+            "name": "Default (Global)",
+            "apps": ["*"],
+            "speeds": [800, 600, 333, 200, 100, 50, 20],
+            "buttons": {}
+        }
+    ]
+}
+
+
+def load_config_safe(path=CONFIG_FILE):
+    """讀取設定檔；檔案存在但無法讀取 / 解析時回傳 None (不以預設值取代)"""
+    if not os.path.exists(path):
+        save_config_safe(DEFAULT_CONFIG, path)
+        return DEFAULT_CONFIG
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+            if "profiles" not in config:
+                new_config = {"profiles": DEFAULT_CONFIG["profiles"]}
+                os.rename(path, path + ".bak")
+                save_config_safe(new_config, path)
+                return new_config
+            return config
+    except Exception as e:
+        log.error("❌ Config Error: {}", e)
+        return None
+
+
+def save_config_safe(config, path=CONFIG_FILE):
+    """同步寫入 (暫存檔 + rename)；選單編輯改用 ConfigWriter 延遲寫入"""
+    try:
+        write_atomic(path, dump_config(config))
+        return True
+    except Exception as e:
+        log.error("Save Error: {}", e)
+        return False
@@ -0,0 +1,192 @@
+"""
+執行中的效能分析 (不需重新啟動)
+  - CPU：cProfile，結束時寫出 .pstats (可用 python -m pstats 或 snakeviz 開啟)
+  - 記憶體：tracemalloc 快照，與上一次快照比較後寫出差異報告
+
+Python 3.12 起 cProfile 改用 sys.monitoring，同一時間只能有一個分析器，
+且會涵蓋所有執行緒，因此只寫一個檔案；較舊版本則在主執行緒與 HID 執行緒
+各啟用一個分析器，分別寫出 -main / -hid 檔案。
+
+cProfile / tracemalloc 在第一次開始分析時才載入，App 啟動時只需要 install_signal_handlers()。
+"""
+import os
+import sys
+import threading
+import time
+
+from shuttle_log import log
+
+# 3.12 起一個分析器涵蓋所有執行緒
+GLOBAL_PROFILER = sys.version_info >= (3, 12)
+
+# 等待 HID 執行緒啟用 / 停用分析器的最長時間 (秒)
+HID_CALL_TIMEOUT = 2.0
+
+# tracemalloc 每個配置保留的堆疊深度 (越深越準，記憶體與 CPU 成本也越高)
+TRACEMALLOC_FRAMES = 5
+# 差異報告列出的項目數
+MEMORY_TOP = 30
+
+
+class ProfilerError(RuntimeError):
+    """無法開始 / 結束分析 (例如已有其他分析器在執行)"""
+
+
+class CpuProfiler:
+    """
+    start() / stop() 由主執行緒呼叫；HID 執行緒上的分析器透過
+    core.call_on_hid_thread() 在該執行緒啟用與停用。
+    """
+
+    def __init__(self, core, directory):
+        self.core = core
+        self.directory = directory
+        self.started_at = None
+        self._profiles = {}  # 檔名後綴 -> cProfile.Profile
+        self._stamp = None
+
+    @property
+    def running(self):
+        return self.started_at is not None
+
+    def _on_hid_thread(self, func):
+        """在 HID 執行緒執行 func 並等待完成，回傳 func 的結果 (逾時丟出 ProfilerError)"""
+        done = threading.Event()
+        result = {}
+
+        def call():
+            try:
+                result["value"] = func()
+            except Exception as e:
+                result["error"] = e
+            done.set()
+
+        self.core.call_on_hid_thread(call)
+        if not done.wait(HID_CALL_TIMEOUT):
+            raise ProfilerError("HID 執行緒沒有回應")
+        if "error" in result:
+            raise result["error"]
+        return result.get("value")
+
+    def start(self):
+        if self.running:
+            raise ProfilerError("CPU 分析已在執行中")
+        import cProfile
+        profiles = {}
+        try:
+            main = cProfile.Profile()
+            main.enable()
+        except ValueError as e:
+            raise ProfilerError(str(e))
+        profiles["all" if GLOBAL_PROFILER else "main"] = main
+
+        if not GLOBAL_PROFILER and self.core.thread is not None:
+            hid = cProfile.Profile()
+            try:
+                self._on_hid_thread(hid.enable)
+                profiles["hid"] = hid
+            except ProfilerError:
+                log.warning("⚠️ HID 執行緒沒有回應，只分析主執行緒")
+
+        self._profiles = profiles
+        self._stamp = time.strftime("%Y%m%d-%H%M%S")
+        self.started_at = time.monotonic()
+
+    def stop(self):
+        """停止分析並寫出 .pstats，回傳 (秒數, [檔案路徑])"""
+        if not self.running:
+            raise ProfilerError("CPU 分析尚未開始")
+        profiles = self._profiles
+        profiles[next(iter(profiles))].disable()
+        hid = profiles.get("hid")
+        if hid is not None:
+            try:
+                self._on_hid_thread(hid.disable)
+            except ProfilerError:
+                # 分析器會留在 HID 執行緒上，仍寫出目前收集到的資料
+                log.warning("⚠️ 無法在 HID 執行緒停用分析器")
+
+        elapsed = time.monotonic() - self.started_at
+        self.started_at = None
+        self._profiles = {}
+
+        os.makedirs(self.directory, exist_ok=True)
+        paths = []
+        for suffix, profile in profiles.items():
+            path = os.path.join(self.directory, f"cpu-{self._stamp}-{suffix}.pstats")
+            profile.dump_stats(path)
+            paths.append(path)
+        return elapsed, paths
+
+    def toggle(self):
+        """開始或停止，回傳 None (剛開始) 或 stop() 的結果"""
+        if self.running:
+            return self.stop()
+        self.start()
+        return None
+
+
+class MemorySnapshots:
+    """
+    第一次呼叫 take() 時才啟用 tracemalloc (之後的配置才會被追蹤)，
+    每次快照都與上一次比較，差異報告與快照檔寫到 directory。
+    """
+
+    def __init__(self, directory, frames=TRACEMALLOC_FRAMES, top=MEMORY_TOP):
+        self.directory = directory
+        self.frames = frames
+        self.top = top
+        self.previous = None
+        self.count = 0
+
+    def take(self):
+        """回傳 (摘要文字, 報告路徑)"""
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ))
+        self.count += 1
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        os.makedirs(self.directory, exist_ok=True)
+        snapshot.dump(os.path.join(self.directory, f"mem-{stamp}.snapshot"))
+
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"快照 #{self.count}: 追蹤中 {current / 1024:.1f} KiB (峰值 {peak / 1024:.1f} KiB)"]
+        if self.previous is None:
+            lines.append("第一次快照只作為基準，下次快照時會列出增加的配置")
+            stats = snapshot.statistics("lineno")[:self.top]
+            lines += [str(s) for s in stats]
+        else:
+            diff = snapshot.compare_to(self.previous, "lineno")[:self.top]
+            growth = sum(s.size_diff for s in diff)
+            lines.append(f"與上次快照相比 (前 {len(diff)} 項合計 {growth / 1024:+.1f} KiB):")
+            lines += [str(s) for s in diff]
+        self.previous = snapshot
+
+        report = os.path.join(self.directory, f"mem-{stamp}.txt")
+        with open(report, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        # 摘要只取前幾行 (對話框放不下完整報告)
+        return "\n".join(lines[:8]), report
+
+    def stop(self):
+        """停止追蹤並丟棄基準 (tracemalloc 本身會佔用不少記憶體)"""
+        self.previous = None
+        tracemalloc = sys.modules.get("tracemalloc")  # 沒有拍過快照就不必載入
+        if tracemalloc is not None and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def install_signal_handlers(on_cpu, on_memory):
+    """
+    SIGUSR1 -> on_cpu() (開始 / 停止 CPU 分析)，SIGUSR2 -> on_memory() (記憶體快照)。
+    必須在主執行緒呼叫；Python 的 signal handler 會在主執行緒下一次執行 Python 程式碼時觸發。
+    """
+    import signal
+    if not hasattr(signal, "SIGUSR1"): return False
+    signal.signal(signal.SIGUSR1, lambda signum, frame: on_cpu())
+    signal.signal(signal.SIGUSR2, lambda signum, frame: on_memory())
+    return True
@@ -0,0 +1,282 @@
+"""
+HID 報告錄製與重播
+錄製：把每個原始報告連同 monotonic_ns 時間寫成固定長度的二進位紀錄，可直接 mmap 讀取。
+重播：透過 ReplayBackend (假裝置) 把紀錄送進輸入核心，輸出動作時間軸；
+可用 1x / Nx 實際時間重播，或以手動時鐘「盡快」重播 (結果完全可重現)。
+
+檔案格式 (little-endian)：
+  header 16 bytes: magic "SHTR", version u16, record_size u16, 8 bytes 保留
+  record 16 bytes: t_ns u64 (相對錄製開始), length u8, report 7 bytes (不足補 0)
+
+執行:
+  python shuttle_record.py info trace.shtr
+  python shuttle_record.py replay trace.shtr [--speed 1|4|max] [--app "Google Chrome"] [--out actions.jsonl]
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+
+from shuttle_hid import HidBackend
+
+MAGIC = b"SHTR"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHH8x")
+RECORD = struct.Struct("<QB7s")
+MAX_REPORT_BYTES = 7  # ShuttlePro v2 的報告為 5 bytes
+
+# 重播到最後一筆之後再繼續的時間 (秒)，讓持續滾動等 Timer 有機會結束
+REPLAY_TAIL = 0.5
+
+
+class TraceFormatError(ValueError):
+    """不是錄製檔或版本不支援"""
+
+
+# ================= 錄製 =================
+
+class TraceRecorder:
+    """
+    [HID 執行緒] record() 只做 struct 打包 + 緩衝寫入；
+    close() 可由其他執行緒呼叫，之後的 record() 直接忽略。
+    """
+
+    def __init__(self, path, clock_ns=time.monotonic_ns):
+        self.path = path
+        self.clock_ns = clock_ns
+        self.count = 0
+        self._lock = threading.Lock()
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, FORMAT_VERSION, RECORD.size))
+        self._start = clock_ns()
+
+    def record(self, data, t_ns=None):
+        if t_ns is None:
+            t_ns = self.clock_ns()
+        packed = RECORD.pack(t_ns - self._start, min(len(data), MAX_REPORT_BYTES),
+                             bytes(data[:MAX_REPORT_BYTES]))
+        with self._lock:
+            if self._file is None: return
+            self._file.write(packed)
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            if self._file is None: return
+            self._file.close()
+            self._file = None
+
+
+class TraceFile:
+    """以 mmap 讀取錄製檔，紀錄在使用時才解碼"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < HEADER.size:
+                raise TraceFormatError(f"檔案太小: {path}")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise TraceFormatError(f"不是 HID 錄製檔: {path}")
+        if version != FORMAT_VERSION or record_size != RECORD.size:
+            raise TraceFormatError(f"不支援的錄製檔版本 {version} (record {record_size} bytes)")
+        # 錄製中斷時最後一筆可能不完整，直接忽略
+        self.count = (size - HEADER.size) // RECORD.size
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        """-> (秒, report list)"""
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        t_ns, length, report = RECORD.unpack_from(self._map, HEADER.size + index * RECORD.size)
+        return t_ns / 1e9, list(report[:length])
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self[i]
+
+    def duration(self):
+        return self[self.count - 1][0] if self.count else 0.0
+
+    def close(self):
+        self._map.close()
+
+
+# ================= 重播 =================
+
+class ReplayBackend(HidBackend):
+    """
+    依紀錄時間送出報告的假裝置。clock 為重播時間 (秒，從 0 開始)，
+    speed 只影響實際等待：read 的 timeout 以重播時間計，實際等待 timeout / speed。
+    speed=None 表示不等待 (搭配 ManualClock 由呼叫端推進時間)。
+    """
+
+    def __init__(self, records, clock, speed=None):
+        self.records = records
+        self.clock = clock
+        self.speed = speed
+        self.index = 0
+
+    def open(self, vid, pid):
+        pass
+
+    def finished(self):
+        return self.index >= len(self.records)
+
+    def next_time(self):
+        return self.records[self.index][0] if self.index < len(self.records) else None
+
+    def read(self, max_length, timeout_ms=0):
+        deadline = self.clock() + timeout_ms / 1000.0
+        while True:
+            now = self.clock()
+            t = self.next_time()
+            if t is not None and t <= now:
+                self.index += 1
+                return self.records[self.index - 1][1][:max_length]
+            if self.speed is None or now >= deadline:
+                return []
+            wait = deadline - now if t is None else min(t, deadline) - now
+            time.sleep(max(wait, 0.0) / self.speed)
+
+    def close(self):
+        pass
+
+    def get_product_string(self):
+        return "Replay"
+
+
+class ScaledClock:
+    """從 0 開始、以 speed 倍速前進的時鐘"""
+
+    def __init__(self, speed):
+        self.speed = speed
+        self.origin = time.monotonic()
+
+    def __call__(self):
+        return (time.monotonic() - self.origin) * self.speed
+
+
+def make_replay_core(profile):
+    """建立只記錄動作的輸入核心 (延後 import，讓錄製端不必載入核心)"""
+    from shuttle_core import ShuttleInputCore
+
+    class ReplayCore(ShuttleInputCore):
+        def __init__(self, clock):
+            super().__init__(clock=clock)
+            self.set_profile(profile)
+            self.actions = []  # [(t, "scroll"|"key", 值)]
+
+        def perform_scroll(self, direction, multiplier):
+            dy = -1 if direction > 0 else 1
+            self.actions.append((self.clock(), "scroll", dy * multiplier))
+
+        def perform_action(self, action):
+            self.actions.append((self.clock(), "key", action.key_def))
+
+    return ReplayCore
+
+
+def replay(records, profile, speed=None):
+    """
+    重播 [(秒, report)]，回傳動作清單 [(t, kind, value)]。
+    speed=None: 手動時鐘、盡快執行 (可重現)；speed=1/N: 實際時間 N 倍速，在 HID 執行緒上執行。
+    """
+    core_cls = make_replay_core(profile)
+    if speed is None:
+        from shuttle_engine import ManualClock
+        clock = ManualClock()
+        core = core_cls(clock)
+        device = ReplayBackend(records, clock)
+        core.device = device
+        end = (records[-1][0] if records else 0.0) + REPLAY_TAIL
+        while True:
+            candidates = [t for t in (device.next_time(), core.next_deadline()) if t is not None]
+            if not candidates or min(candidates) > end:
+                break
+            clock.advance_to(min(candidates))
+            data = device.read(64, 0)
+            if data:
+                core.process_reports(data)
+            core.run_due_timers()
+        return core.actions
+
+    clock = ScaledClock(speed)
+    core = core_cls(clock)
+    device = ReplayBackend(records, clock, speed)
+    core.backend_factory = lambda: device
+    core.start()
+    end = (records[-1][0] if records else 0.0) + REPLAY_TAIL
+    while clock() < end:
+        time.sleep(0.01)
+    core.stop()
+    return core.actions
+
+
+def load_profile(config_path, app_name):
+    """與 App 相同以寬鬆模式編譯：無效的項目只停用該項並印出，整份無效時改用預設 Profile"""
+    from shuttle_config import ConfigError, Profile, compile_config
+    if config_path and os.path.exists(config_path):
+        try:
+            with open(config_path, encoding="utf-8") as f:
+                snapshot = compile_config(json.load(f), strict=False)
+        except (ValueError, ConfigError) as e:
+            print(f"❌ Config Error: {e} (改用預設 Profile)", file=sys.stderr)
+        else:
+            for message in snapshot.errors:
+                print(f"❌ Config Error: {message}", file=sys.stderr)
+            profile = snapshot.resolve(app_name)
+            if profile is not None:
+                return profile
+    return Profile({"name": "Replay", "apps": ["*"]})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HID 錄製檔工具")
+    sub = parser.add_subparsers(dest="command", required=True)
+    info = sub.add_parser("info", help="列出錄製檔內容")
+    info.add_argument("path")
+    info.add_argument("--limit", type=int, default=50)
+    rep = sub.add_parser("replay", help="重播並輸出動作時間軸")
+    rep.add_argument("path")
+    rep.add_argument("--speed", default="max", help="1、4 等倍速，或 max (手動時鐘，可重現)")
+    rep.add_argument("--config", default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                      "shuttle_config.json"))
+    rep.add_argument("--app", default="", help="用來選擇 Profile 的 App 名稱")
+    rep.add_argument("--out", help="動作輸出為 JSON lines (預設印在畫面上)")
+    args = parser.parse_args(argv)
+
+    trace = TraceFile(args.path)
+    if args.command == "info":
+        print(f"{len(trace)} 筆, {trace.duration():.3f} 秒")
+        for i, (t, report) in enumerate(trace):
+            if i >= args.limit: break
+            print(f"{t:10.6f}  " + " ".join(f"{b:02x}" for b in report))
+        return
+
+    records = list(trace)
+    profile = load_profile(args.config, args.app)
+    speed = None if args.speed == "max" else float(args.speed)
+    t0 = time.perf_counter()
+    actions = replay(records, profile, speed)
+    elapsed = time.perf_counter() - t0
+
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    for t, kind, value in actions:
+        out.write(json.dumps({"t": round(t, 6), "kind": kind, "value": value}, ensure_ascii=False) + "\n")
+    if args.out:
+        out.close()
+    print(f"Profile: {profile.name}, {len(records)} 筆報告 -> {len(actions)} 個動作, "
+          f"耗時 {elapsed:.3f} 秒", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Timer Heap
+所有延後執行的動作 (啟動緩衝、加減速過渡、持續滾動 tick、Jog 合併、按鍵放開)
+都排在這裡，迴圈只需要等到 next_deadline() 為止。
+"""
+import heapq
+import itertools
+import time
+from array import array
+
+OVERSHOOT_SAMPLES = 1024  # 保留最近幾筆延遲樣本 (預先配置的環狀緩衝)
+
+
+class Timer:
+    """schedule() 回傳的 handle，可用 cancel() 取消"""
+    __slots__ = ("when", "callback", "args", "cancelled")
+
+    def __init__(self, when, callback, args):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TimerHeap:
+    """
+    非執行緒安全，由擁有它的執行緒 (例如 HID 執行緒) 單獨使用。
+    callback 以 callback(when, *args) 呼叫，when 為原本排定的時間。
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._heap = []  # (when, seq, Timer)
+        self._seq = itertools.count()
+
+        # 實際執行時間 - 排定時間 (秒)
+        self._overshoots = array("d", bytes(8 * OVERSHOOT_SAMPLES))
+        self._overshoot_count = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def call_at(self, when, callback, *args):
+        timer = Timer(when, callback, args)
+        heapq.heappush(self._heap, (when, next(self._seq), timer))
+        return timer
+
+    def call_later(self, delay, callback, *args):
+        return self.call_at(self.clock() + delay, callback, *args)
+
+    def next_deadline(self):
+        """最早的未取消期限，沒有則回傳 None"""
+        heap = self._heap
+        while heap and heap[0][2].cancelled:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def run_due(self, now=None):
+        """執行所有已到期的 timer，回傳執行數量"""
+        if now is None:
+            now = self.clock()
+        heap = self._heap
+        fired = 0
+        while heap and heap[0][0] <= now:
+            when, _, timer = heapq.heappop(heap)
+            if timer.cancelled:
+                continue
+            self._overshoots[self._overshoot_count % OVERSHOOT_SAMPLES] = now - when
+            self._overshoot_count += 1
+            timer.callback(when, *timer.args)
+            fired += 1
+        return fired
+
+    def run_all(self):
+        """不論期限，依時間順序執行所有未取消的 timer (結束前用，不計入延遲統計)"""
+        heap = self._heap
+        fired = 0
+        while heap:
+            when, _, timer = heapq.heappop(heap)
+            if timer.cancelled:
+                continue
+            timer.callback(when, *timer.args)
+            fired += 1
+        return fired
+
+    def clear(self):
+        self._heap.clear()
+
+    def overshoot_stats(self):
+        """最近 OVERSHOOT_SAMPLES 筆的延遲 p50 / p99 / max (毫秒)"""
+        n = min(self._overshoot_count, OVERSHOOT_SAMPLES)
+        if n == 0:
+            return {"count": 0, "p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        values = sorted(self._overshoots[:n])
+        return {
+            "count": self._overshoot_count,
+            "p50_ms": values[(n - 1) // 2] * 1000.0,
+            "p99_ms": values[min(n - 1, int(n * 0.99))] * 1000.0,
+            "max_ms": values[-1] * 1000.0,
+        }
@@ -0,0 +1,163 @@
+"""
+延遲追蹤
+記錄每個輸出 (按鍵 / 滾動) 從 HID 讀取到注入完成的各階段時間，
+存在預先配置的環狀緩衝區，查看時才計算各階段的 p50 / p95 / p99 / max。
+未啟用時核心只多一次 None 檢查。
+"""
+import json
+import time
+from array import array
+
+TRACE_CAPACITY = 4096  # 保留最近幾筆輸出
+
+# 階段 (時間戳記欄位)
+STAGE_READ = 0          # HID read 回傳 (Timer 觸發的輸出沒有這一項)
+STAGE_DECODE = 1        # 報告合併 / 解碼完成
+STAGE_DISPATCH = 2      # 排入輸出佇列
+STAGE_INJECT_START = 3  # 輸出執行緒開始注入
+STAGE_INJECT_END = 4    # 注入完成
+STAGE_COUNT = 5
+
+STAGE_NAMES = ("read", "decode", "dispatch", "inject_start", "inject_end")
+
+# 輸出種類
+TRACE_KEY = 1
+TRACE_SCROLL = 2
+KIND_NAMES = {TRACE_KEY: "key", TRACE_SCROLL: "scroll"}
+
+# 統計的區段: (名稱, 起點, 終點)
+SPANS = (
+    ("read->decode", STAGE_READ, STAGE_DECODE),
+    ("decode->dispatch", STAGE_DECODE, STAGE_DISPATCH),
+    ("dispatch->inject", STAGE_DISPATCH, STAGE_INJECT_START),
+    ("inject", STAGE_INJECT_START, STAGE_INJECT_END),
+    ("total", STAGE_READ, STAGE_INJECT_END),
+)
+
+# 直方圖上界 (毫秒)，最後一格為以上
+HISTOGRAM_BOUNDS_MS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0)
+
+
+class LatencyTracer:
+    """
+    record() 由 HID 執行緒呼叫 (讀取 / 解碼 / 排入)，
+    mark() 由輸出執行緒呼叫 (注入開始 / 結束)，以 record() 回傳的序號對應同一筆。
+    時間為 0 代表該階段不存在或尚未發生。
+    """
+
+    def __init__(self, capacity=TRACE_CAPACITY, clock=time.monotonic):
+        self.capacity = capacity
+        self.clock = clock
+        self._times = array("d", bytes(8 * capacity * STAGE_COUNT))
+        self._kinds = array("B", bytes(capacity))
+        self._seqs = array("q", [-1]) * capacity
+        self._next = 0
+
+    def __len__(self):
+        return min(self._next, self.capacity)
+
+    def record(self, kind, t_read, t_decode, t_dispatch):
+        """新增一筆，回傳序號 (傳給 mark)"""
+        seq = self._next
+        self._next = seq + 1
+        slot = seq % self.capacity
+        base = slot * STAGE_COUNT
+        times = self._times
+        times[base] = t_read or 0.0
+        times[base + 1] = t_decode or 0.0
+        times[base + 2] = t_dispatch
+        times[base + 3] = 0.0
+        times[base + 4] = 0.0
+        self._kinds[slot] = kind
+        self._seqs[slot] = seq
+        return seq
+
+    def mark(self, seq, stage, t=None):
+        """記錄注入階段；該筆已被新紀錄覆蓋時忽略"""
+        slot = seq % self.capacity
+        if self._seqs[slot] != seq:
+            return
+        self._times[slot * STAGE_COUNT + stage] = self.clock() if t is None else t
+
+    def clear(self):
+        self._next = 0
+        for i in range(self.capacity):
+            self._seqs[i] = -1
+
+    def records(self):
+        """[(kind, (t_read, ..., t_inject_end)), ...] 依時間先後"""
+        count = len(self)
+        start = self._next - count
+        result = []
+        for seq in range(start, self._next):
+            slot = seq % self.capacity
+            if self._seqs[slot] != seq:
+                continue
+            base = slot * STAGE_COUNT
+            result.append((self._kinds[slot], tuple(self._times[base:base + STAGE_COUNT])))
+        return result
+
+    def span_samples(self, kind=None):
+        """各區段的耗時樣本 (毫秒)，缺少任一端點的紀錄不計"""
+        samples = {name: [] for name, _, _ in SPANS}
+        for k, times in self.records():
+            if kind is not None and k != kind:
+                continue
+            for name, a, b in SPANS:
+                if times[a] and times[b] and times[b] >= times[a]:
+                    samples[name].append((times[b] - times[a]) * 1000.0)
+        return samples
+
+    def summary(self, kind=None):
+        """{區段: {count, p50_ms, p95_ms, p99_ms, max_ms, histogram}}"""
+        result = {}
+        for name, values in self.span_samples(kind).items():
+            result[name] = summarize(values)
+        return result
+
+    def format_report(self):
+        """選單顯示用的文字報告"""
+        lines = []
+        for kind, kind_name in KIND_NAMES.items():
+            summary = self.summary(kind)
+            if not summary["dispatch->inject"]["count"]:
+                continue
+            lines.append(f"[{kind_name}]")
+            for name, st in summary.items():
+                if not st["count"]:
+                    continue
+                lines.append(f"{name}: n={st['count']} p50 {st['p50_ms']:.3f} / p95 {st['p95_ms']:.3f} / "
+                             f"p99 {st['p99_ms']:.3f} / max {st['max_ms']:.3f} ms")
+        return "\n".join(lines) if lines else "尚無紀錄"
+
+    def dump(self, path):
+        """統計與原始紀錄寫成 JSON"""
+        data = {
+            "stages": STAGE_NAMES,
+            "histogram_bounds_ms": HISTOGRAM_BOUNDS_MS,
+            "summary": {KIND_NAMES[k]: self.summary(k) for k in KIND_NAMES},
+            "records": [{"kind": KIND_NAMES.get(k, k), "t": times} for k, times in self.records()],
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1)
+        return len(data["records"])
+
+
+def summarize(values):
+    if not values:
+        return {"count": 0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0,
+                "histogram": [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)}
+    values = sorted(values)
+    n = len(values)
+    histogram = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+    bucket = 0
+    for v in values:
+        while bucket < len(HISTOGRAM_BOUNDS_MS) and v > HISTOGRAM_BOUNDS_MS[bucket]:
+            bucket += 1
+        histogram[bucket] += 1
+
+    def pct(p):
+        return values[min(n - 1, int(n * p))]
+
+    return {"count": n, "p50_ms": values[(n - 1) // 2], "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99), "max_ms": values[-1], "histogram": histogram}
@@ -0,0 +1,265 @@
+"""
+設定檔監看
+以作業系統的檔案事件 (Linux inotify / macOS kqueue) 監看設定檔所在目錄，
+不支援時退回 stat 輪詢。事件經過去抖動後讀取內容比對 hash，
+只有內容真的改變才通知 (編輯器 rename 覆蓋、多次寫入都只算一次)。
+"""
+import hashlib
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from shuttle_log import log
+
+# 最後一個事件之後等待多久才讀檔 (秒)
+DEBOUNCE = 0.2
+
+# 每次等待事件的最長時間，只用來定期檢查是否該結束
+IDLE_TIMEOUT = 0.5
+
+POLL_INTERVAL = 1.0
+
+
+class PollingSource:
+    """備援：定期比對 (mtime_ns, size, inode)"""
+    name = "polling"
+
+    def __init__(self, path, interval=POLL_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self._next = 0.0
+        self._signature = self._stat()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size, st.st_ino)
+        except OSError:
+            return None
+
+    def wait(self, timeout):
+        now = time.monotonic()
+        if now < self._next:
+            time.sleep(min(timeout, self._next - now))
+            if time.monotonic() < self._next:
+                return False
+        self._next = time.monotonic() + self.interval
+        signature = self._stat()
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        return True
+
+    def close(self):
+        pass
+
+
+class InotifySource:
+    """Linux：監看目錄，只理會檔名相符的事件 (rename 覆蓋會換 inode，不能只監看檔案)"""
+    name = "inotify"
+
+    IN_MODIFY = 0x002
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_FROM = 0x040
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, path):
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.filename = os.fsencode(os.path.basename(path))
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = (self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_FROM |
+                self.IN_MOVED_TO | self.IN_CREATE | self.IN_DELETE)
+        directory = os.path.dirname(os.path.abspath(path))
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, f"inotify_add_watch failed: {directory}")
+
+    def wait(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return False
+        matched = False
+        offset = 0
+        size = self._EVENT.size
+        while offset + size <= len(data):
+            _, _, _, length = self._EVENT.unpack_from(data, offset)
+            name = data[offset + size:offset + size + length].rstrip(b"\0")
+            if name == self.filename:
+                matched = True
+            offset += size + length
+        return matched
+
+    def close(self):
+        try: os.close(self.fd)
+        except OSError: pass
+
+
+class KqueueSource:
+    """
+    macOS / BSD：kqueue 同時監看目錄 (rename 覆蓋、新建) 與檔案本身 (原地寫入)，
+    檔案被取代後重新開啟新的 inode。
+    """
+    name = "kqueue"
+
+    def __init__(self, path):
+        self.path = path
+        self.kq = select.kqueue()
+        self._flags = getattr(os, "O_EVTONLY", os.O_RDONLY)
+        self.dir_fd = os.open(os.path.dirname(os.path.abspath(path)), self._flags)
+        self._register(self.dir_fd, select.KQ_NOTE_WRITE)
+        self.file_fd = None
+        self._open_file()
+
+    def _register(self, fd, fflags):
+        event = select.kevent(fd, filter=select.KQ_FILTER_VNODE,
+                              flags=select.KQ_EV_ADD | select.KQ_EV_CLEAR, fflags=fflags)
+        self.kq.control([event], 0, 0)
+
+    def _open_file(self):
+        if self.file_fd is not None:
+            os.close(self.file_fd)  # 關閉時 kevent 會自動移除
+            self.file_fd = None
+        try:
+            self.file_fd = os.open(self.path, self._flags)
+        except OSError:
+            return
+        self._register(self.file_fd, select.KQ_NOTE_WRITE | select.KQ_NOTE_EXTEND |
+                       select.KQ_NOTE_DELETE | select.KQ_NOTE_RENAME | select.KQ_NOTE_ATTRIB)
+
+    def wait(self, timeout):
+        events = self.kq.control(None, 4, timeout)
+        if not events:
+            return False
+        replaced = any(ev.ident == self.dir_fd or
+                       ev.fflags & (select.KQ_NOTE_DELETE | select.KQ_NOTE_RENAME)
+                       for ev in events)
+        if replaced:
+            self._open_file()
+        return True
+
+    def close(self):
+        if self.file_fd is not None:
+            os.close(self.file_fd)
+        os.close(self.dir_fd)
+        self.kq.close()
+
+
+def create_event_source(path):
+    """依平台選擇檔案事件來源，失敗時退回輪詢"""
+    try:
+        if sys.platform.startswith("linux"):
+            return InotifySource(path)
+        if hasattr(select, "kqueue"):
+            return KqueueSource(path)
+    except OSError as e:
+        log.warning("⚠️ 檔案事件無法使用，改用輪詢: {}", e)
+    return PollingSource(path)
+
+
+class ConfigWatcher:
+    """
+    背景執行緒監看單一檔案，內容改變時呼叫 on_change(text) (在監看執行緒)。
+    連續事件在 debounce 秒內只讀一次檔，內容 hash 相同時不通知。
+    """
+
+    def __init__(self, path, on_change, debounce=DEBOUNCE, source_factory=create_event_source,
+                 clock=time.monotonic):
+        self.path = path
+        self.on_change = on_change
+        self.debounce = debounce
+        self.source_factory = source_factory
+        self.clock = clock
+        self.source = None
+        self._digest = None
+        self._running = False
+        self._thread = None
+
+        self.events = 0     # 收到的檔案事件 (批次)
+        self.checks = 0     # 去抖動後實際讀檔次數
+        self.unchanged = 0  # 讀檔後內容未變 (例如只改 mtime、寫回相同內容)
+        self.changes = 0    # 通知 on_change 的次數
+
+    def start(self):
+        if self._running: return
+        self._digest = self._read()[1]
+        self.source = self.source_factory(self.path)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="ConfigWatcher")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, timeout=IDLE_TIMEOUT * 2):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self.source is not None:
+            self.source.close()
+            self.source = None
+
+    def stats(self):
+        return {"source": self.source.name if self.source else None,
+                "events": self.events, "checks": self.checks,
+                "unchanged": self.unchanged, "changes": self.changes}
+
+    def _read(self):
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None, None
+        return data, hashlib.sha1(data).digest()
+
+    def check(self):
+        """讀檔比對 hash，內容改變時通知；回傳是否改變"""
+        self.checks += 1
+        data, digest = self._read()
+        if data is None:
+            # 編輯器存檔途中檔案可能暫時不存在，等下一個事件
+            return False
+        if digest == self._digest:
+            self.unchanged += 1
+            return False
+        self._digest = digest
+        self.changes += 1
+        try:
+            self.on_change(data.decode("utf-8", errors="replace"))
+        except Exception as e:
+            log.warning("⚠️ Config Watcher Error: {}", e)
+        return True
+
+    def _run(self):
+        deadline = None
+        while self._running:
+            timeout = IDLE_TIMEOUT
+            if deadline is not None:
+                timeout = min(max(deadline - self.clock(), 0.0), IDLE_TIMEOUT)
+            try:
+                changed = self.source.wait(timeout)
+            except OSError as e:
+                log.warning("⚠️ 檔案事件錯誤，改用輪詢: {}", e)
+                self.source.close()
+                self.source = PollingSource(self.path)
+                continue
+            now = self.clock()
+            if changed:
+                self.events += 1
+                deadline = now + self.debounce
+            elif deadline is not None and now >= deadline:
+                deadline = None
+                self.check()
@@ -0,0 +1,34 @@
+"""
+pytest 共用 fixture
+模組在上層目錄，benchmarks/ 也在 pythonpath 上 (pyproject.toml)，測試直接 import 基準腳本的模擬函式；
+假裝置與假核心和 benchmarks/ 共用 shuttle_hid.FakeHidBackend、shuttle_core.RecordingCore。
+"""
+import pytest
+
+from shuttle_core import RecordingCore, VID, PID
+from shuttle_hid import FakeHidBackend
+
+TEST_PROFILE = {"name": "Test", "apps": ["*"], "buttons": {"1": "q", "2": "w"}}
+
+
+@pytest.fixture
+def fake_hid():
+    return FakeHidBackend()
+
+
+@pytest.fixture
+def core(fake_hid):
+    """已連上假裝置、但沒有啟動 HID 執行緒的 RecordingCore (由測試直接呼叫處理函式)"""
+    core = RecordingCore(lambda: fake_hid, profile=TEST_PROFILE)
+    fake_hid.open(VID, PID)
+    core.device = fake_hid
+    return core
+
+
+@pytest.fixture
+def running_core(fake_hid):
+    """HID 執行緒已啟動的 RecordingCore，測試結束時停止"""
+    core = RecordingCore(lambda: fake_hid, profile=TEST_PROFILE)
+    core.start()
+    yield core
+    core.stop()
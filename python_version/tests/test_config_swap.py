@@ -0,0 +1,105 @@
+"""
+設定快照替換：編輯中的設定不會被讀到一半
+使用 benchmarks/stress_config_swap.py 的檢查邏輯，時間縮短並改為斷言。
+"""
+import random
+import threading
+import time
+
+import pytest
+
+from shuttle_config import ConfigError
+from stress_config_swap import CheckingCore, feeder, profile_values, version_of, writer
+
+DURATION = 1.0
+WRITERS = 3
+
+
+def run_threads(targets, duration):
+    stop = threading.Event()
+    threads = [threading.Thread(target=target, args=(stop,)) for target in targets]
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join(5.0)
+
+
+def editor(core, seed, mutate_config):
+    rng = random.Random(seed)
+
+    def run(stop):
+        while not stop.is_set():
+            n = rng.randint(5, 500)
+            core.edit_config(lambda config: mutate_config(config, n))
+            time.sleep(0)
+    return run
+
+
+def set_all_profiles(config, n):
+    for profile in config["profiles"]:
+        profile.update(profile_values(n))
+
+
+def test_hid_thread_never_sees_a_torn_profile(fake_hid):
+    core = CheckingCore(lambda: fake_hid)
+    core.apply_config({"profiles": [dict(name="Stress", apps=["*"], **profile_values(5))]})
+    core.on_app_activated("Stress App")
+    core.start()
+
+    def applier(stop):
+        # 主執行緒的角色：快照替換後重新套用 Profile
+        while not stop.is_set():
+            core.update_active_profile()
+            time.sleep(0.0002)
+
+    counters = [0] * WRITERS
+    writers = [lambda stop, seed=seed: writer(core, stop, counters, seed) for seed in range(WRITERS)]
+    try:
+        run_threads([lambda stop: feeder(fake_hid, stop), applier] + writers, DURATION)
+    finally:
+        core.stop()
+
+    assert sum(counters) > 0
+    assert core.snapshot.version > 0
+    assert core.checks > 0
+    assert core.inconsistent == 0
+
+
+def test_readers_never_see_a_mixed_snapshot(core):
+    # 每次編輯都把兩個 Profile 設成同一個 n：讀到的快照內兩者必須一致
+    core.apply_config({"profiles": [dict(name="A", apps=["A"], **profile_values(5)),
+                                    dict(name="B", apps=["*"], **profile_values(5))]})
+    seen = {"reads": 0, "torn": 0, "mixed": 0}
+
+    def reader(stop):
+        while not stop.is_set():
+            snapshot = core.snapshot
+            versions = [version_of(p) for p in snapshot.profiles]
+            seen["reads"] += 1
+            if None in versions:
+                seen["torn"] += 1
+            elif len(set(versions)) != 1:
+                seen["mixed"] += 1
+
+    writers = [editor(core, seed, set_all_profiles) for seed in range(WRITERS)]
+    run_threads([reader, reader] + writers, DURATION)
+
+    assert seen["reads"] > 0
+    assert core.snapshot.version > 0
+    assert seen["torn"] == 0
+    assert seen["mixed"] == 0
+
+
+def test_rejected_edit_keeps_the_current_snapshot(core):
+    core.apply_config({"profiles": [dict(name="A", apps=["*"], **profile_values(5))]})
+    before = core.snapshot
+
+    def mutate(config):
+        config["profiles"][0]["buttons"]["1"] = "nonsense+key"
+    with pytest.raises(ConfigError):
+        core.edit_config(mutate)
+
+    assert core.snapshot is before
+    assert version_of(core.snapshot.profiles[0]) == 5
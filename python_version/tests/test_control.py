@@ -0,0 +1,66 @@
+"""本機控制 socket：權限、不讀回應的 client、請求驗證"""
+import os
+import socket
+import stat
+import threading
+import time
+
+import pytest
+
+from shuttle_control import ControlClient, ControlServer
+
+
+@pytest.fixture
+def server(core, tmp_path):
+    server = ControlServer(core, str(tmp_path / "control.sock"))
+    server.start()
+    yield server
+    server.stop()
+
+
+def test_socket_is_private_without_touching_umask(core, tmp_path):
+    old = os.umask(0o022)
+    server = ControlServer(core, str(tmp_path / "control.sock"))
+    try:
+        server.start()
+        # umask 是整個行程共用的，啟動後必須維持原值
+        assert os.umask(0o022) == 0o022
+        assert stat.S_IMODE(os.stat(server.path).st_mode) == 0o600
+    finally:
+        server.stop()
+        os.umask(old)
+
+
+def test_client_that_never_reads_does_not_stall_others(server):
+    stalled = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stalled.connect(server.path)
+    flood = b'{"cmd": "status"}\n' * 20000
+
+    def send():
+        try:
+            stalled.sendall(flood)
+        except OSError:
+            pass
+
+    threading.Thread(target=send, daemon=True).start()
+    time.sleep(0.2)  # 讓伺服器的回應塞滿 stalled 的接收緩衝
+    t0 = time.monotonic()
+    with ControlClient(server.path, timeout=1.0) as client:
+        assert client.request("ping")["ok"]
+    assert time.monotonic() - t0 < 0.5
+    stalled.close()
+
+
+@pytest.mark.parametrize("buttons", [[True], [False], [0], [16], ["1"], []])
+def test_press_rejects_invalid_buttons(server, core, buttons):
+    with ControlClient(server.path) as client:
+        reply = client.request("press", buttons=buttons)
+    assert not reply["ok"]
+    assert core.actions == []
+
+
+def test_press_runs_button_action(server, core):
+    with ControlClient(server.path) as client:
+        reply = client.request("press", buttons=[1])
+    assert reply == {"ok": True, "pressed": [1]}
+    assert [key for _, key in core.actions] == ["q"]
@@ -0,0 +1,69 @@
+"""HID 迴圈：閒置時的喚醒次數與同一次喚醒內的報告合併"""
+import time
+
+from shuttle_core import IDLE_READ_TIMEOUT, MAX_DRAIN_REPORTS
+from shuttle_hid import make_report
+
+IDLE_SECONDS = 1.0
+
+
+def wait_until(predicate, timeout=2.0):
+    end = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > end:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def test_idle_loop_only_wakes_on_read_timeout(running_core):
+    assert wait_until(lambda: running_core.device is not None)
+    start = running_core.loop_wakeups
+    time.sleep(IDLE_SECONDS)
+    wakeups = running_core.loop_wakeups - start
+    # 沒有報告也沒有 timer 時只在 IDLE_READ_TIMEOUT 到期時醒來 (舊版輪詢約 200 次/秒)
+    assert wakeups <= IDLE_SECONDS / IDLE_READ_TIMEOUT + 1
+
+
+def test_active_timers_do_not_busy_loop(running_core, fake_hid):
+    assert wait_until(lambda: running_core.device is not None)
+    fake_hid.push(make_report(shuttle=1))  # 最慢一段 (800 ms 週期)
+    assert wait_until(lambda: running_core.shuttle.active)
+    start = running_core.loop_wakeups
+    time.sleep(IDLE_SECONDS)
+    assert running_core.loop_wakeups - start <= 2 * (IDLE_SECONDS / IDLE_READ_TIMEOUT + 1)
+
+
+def test_queued_reports_are_merged_into_one_batch(core, fake_hid):
+    fake_hid.push(make_report(jog=0))
+    for jog in range(1, 10):
+        fake_hid.push(make_report(jog=jog))
+    core.process_reports(fake_hid.read(64, 0))
+
+    assert core.batch_count == 1
+    assert core.reports_read == 10
+    assert core.reports_merged == 9
+    assert core.max_batch_size == 10
+    assert fake_hid.pending() == 0
+
+
+def test_batch_keeps_every_button_press(core, fake_hid):
+    # 同一批次內 Button 1 按下又放開、接著按 Button 2：兩個按下邊緣都要執行
+    for buttons in (0x0001, 0x0000, 0x0002, 0x0000):
+        fake_hid.push(make_report(buttons=buttons))
+    core.process_reports(fake_hid.read(64, 0))
+
+    assert core.batch_count == 1
+    assert [key for _, key in core.actions] == ["q", "w"]
+
+
+def test_drain_is_capped_per_wakeup(core, fake_hid):
+    for i in range(MAX_DRAIN_REPORTS + 10):
+        fake_hid.push(make_report(jog=i & 0xFF))
+    core.process_reports(fake_hid.read(64, 0))
+    assert core.reports_read == MAX_DRAIN_REPORTS
+    core.process_reports(fake_hid.read(64, 0))
+
+    assert core.batch_count == 2
+    assert core.reports_read == MAX_DRAIN_REPORTS + 10
+    assert core.reports_merged == MAX_DRAIN_REPORTS + 10 - 2
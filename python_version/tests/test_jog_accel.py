@@ -0,0 +1,105 @@
+"""
+Jog 速度感應加速 (shuttle_jog) 與 jog_max_rate / jog_multiplier
+以 ManualClock 模擬固定轉速 (benchmarks/sim_jog_accel.py 的 spin())。
+"""
+import pytest
+
+from shuttle_config import ConfigError, DEFAULT_JOG_MULTIPLIER, Profile
+from shuttle_jog import JogCurve
+from sim_jog_accel import DURATION, PROFILES, spin
+
+# 基準腳本比較的三種曲線
+CURVES = {name: raw["jog_acceleration"] for name, raw in PROFILES if "jog_acceleration" in raw}
+
+
+@pytest.mark.parametrize("name", sorted(CURVES))
+def test_gain_never_decreases_with_velocity(name):
+    curve = JogCurve(CURVES[name])
+    gains = [curve.gain(v / 4.0) for v in range(0, 1000)]
+    assert all(b >= a for a, b in zip(gains, gains[1:]))
+    assert gains[0] == pytest.approx(curve.points[0][1] if curve.points else curve.min_gain)
+    assert max(gains) <= (curve.points[-1][1] if curve.points else curve.max_gain)
+
+
+@pytest.mark.parametrize("name", sorted(CURVES))
+def test_faster_spin_scrolls_more_lines_per_detent(name):
+    per_detent = []
+    for rate in (2, 20, 80, 160):
+        core, detents, _ = spin({"jog_acceleration": CURVES[name]}, rate)
+        per_detent.append(core.scroll_lines / detents)
+    assert all(b >= a for a, b in zip(per_detent, per_detent[1:]))
+    assert per_detent[-1] > per_detent[0]
+
+
+def test_without_curve_uses_fixed_multiplier():
+    profile = Profile({"name": "Fixed", "apps": ["*"], "jog_multiplier": 4})
+    assert profile.jog_curve is None
+    for rate in (2, 80):
+        core, detents, _ = spin({"jog_multiplier": 4}, rate)
+        assert core.scroll_lines == detents * 4
+
+    core, detents, _ = spin({}, 20)
+    assert core.scroll_lines == detents * DEFAULT_JOG_MULTIPLIER
+
+
+def test_max_rate_caps_scroll_events_without_losing_lines():
+    core, detents, _ = spin({"jog_max_rate": 10}, 80, record=True)
+    # 2 秒內最多 10 次/秒 (加上第一次)，每次送出累積的量
+    assert core.scroll_count <= 10 * DURATION + 1
+    assert core.scroll_lines == detents * DEFAULT_JOG_MULTIPLIER
+    times = [t for t, _, _ in core.scrolls]
+    assert all(b - a >= 0.1 - 1e-9 for a, b in zip(times, times[1:]))
+
+
+def test_max_rate_zero_means_uncapped():
+    core, detents, _ = spin({"jog_max_rate": 0}, 80)
+    assert core.scroll_count > 10 * DURATION + 1
+    assert core.scroll_lines == detents * DEFAULT_JOG_MULTIPLIER
+
+
+@pytest.mark.parametrize("name", sorted(CURVES))
+def test_acceleration_schedules_no_timers(name):
+    for rate in (20, 160):
+        _, _, timers_scheduled = spin({"jog_acceleration": CURVES[name]}, rate)
+        assert timers_scheduled == 0
+
+
+@pytest.mark.parametrize("raw", [
+    {"curve": "table", "table": []},
+    {"curve": "table", "table": [5, 6]},
+    {"curve": "table", "table": [[0, 1, 2]]},
+    {"curve": "table", "table": [[0, "fast"]]},
+    {"curve": "table", "table": [[0, 1], [10, 0]]},
+    {"curve": "table", "table": [[-5, 1], [10, 2]]},
+    {"curve": "table", "table": [[0, 1], [10, 2], [10, 3]]},
+    {"curve": "table", "table": [[0, 2], [10, 1]]},
+    {"curve": "table", "table": [[0, 1], [float("nan"), 2]]},
+    {"curve": "linear", "slope": -0.1},
+    {"curve": "exponential", "factor": -1},
+    {"curve": "linear", "min_gain": 4, "max_gain": 2},
+    {"curve": "linear", "window_ms": 0},
+    {"curve": "quadratic"},
+])
+def test_bad_curves_are_rejected(raw):
+    with pytest.raises(ValueError):
+        JogCurve(raw)
+    with pytest.raises(ConfigError):
+        Profile({"name": "Bad", "apps": ["*"], "jog_acceleration": raw})
+
+
+@pytest.mark.parametrize("field, value", [
+    ("jog_multiplier", 0),
+    ("jog_multiplier", -3),
+    ("jog_multiplier", "many"),
+    ("jog_max_rate", -1),
+    ("jog_max_rate", float("inf")),
+])
+def test_bad_jog_settings_are_rejected(field, value):
+    with pytest.raises(ConfigError):
+        Profile({"name": "Bad", "apps": ["*"], field: value})
+    # 寬鬆編譯時改用預設值，其餘設定照常
+    profile = Profile({"name": "Bad", "apps": ["*"], field: value, "buttons": {"1": "q"}}, strict=False)
+    assert profile.jog_multiplier == DEFAULT_JOG_MULTIPLIER
+    assert profile.jog_max_rate == 0
+    assert profile.buttons[0] is not None
+    assert profile.errors
@@ -0,0 +1,24 @@
+"""輸出佇列：停止時的收尾"""
+from shuttle_output import OutputDispatcher, PRIORITY_KEY
+
+
+def test_stop_runs_pending_key_release():
+    output = OutputDispatcher()
+    output.start()
+    events = []
+    output.submit(PRIORITY_KEY, events.append, "press")
+    # 放開排在 10 秒後，stop() 不應把它丟掉
+    output.submit_later(10.0, PRIORITY_KEY, events.append, "release")
+    output.stop()
+    assert events == ["press", "release"]
+    assert output.depth() == 0
+
+
+def test_stop_without_drain_discards_pending_items():
+    output = OutputDispatcher()
+    output.start()
+    events = []
+    output.submit_later(10.0, PRIORITY_KEY, events.append, "release")
+    output.stop(drain=False)
+    assert events == []
+    assert output.depth() == 0